@@ -0,0 +1,158 @@
+"""
+Admission control for the CPU-heavy endpoints.
+
+Each guarded group of routes has a limit on how many requests run at once
+and on how many may wait for a slot. Admitted work runs in the thread pool,
+so the event loop stays free to accept, queue and reject requests while the
+models run. A request arriving when every slot is busy and the queue is full
+is shed with ``Overloaded``, a ``503`` carrying a ``Retry-After`` estimated
+from recent service times. Groups in ``heuristic`` overload mode answer such
+requests from the endpoint's fallback logic instead, when it has one.
+
+Limits come from the environment, per group:
+
+    ADMISSION_<GROUP>_CONCURRENCY   requests running at once
+    ADMISSION_<GROUP>_QUEUE         requests waiting for a slot
+    ADMISSION_<GROUP>_OVERLOAD      "shed" or "heuristic"
+"""
+
+import asyncio
+import math
+import os
+import time
+
+from fastapi import HTTPException
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from metrics import registry
+
+OVERLOAD_MODES = ("shed", "heuristic")
+# Weight of the newest sample in the service time average
+SERVICE_TIME_ALPHA = 0.2
+
+ADMISSIONS = registry.counter(
+    "lms_ai_admission_total", "Requests to guarded routes by group and result (admitted/shed/heuristic)",
+    ("group", "result"))
+
+
+class Overloaded(HTTPException):
+    def __init__(self, group, retry_after):
+        super().__init__(status_code=503, detail=f"{group} is over capacity, retry in {retry_after}s",
+                         headers={"Retry-After": str(retry_after)})
+        self.group = group
+        self.retry_after = retry_after
+
+
+class AdmissionGroup:
+    def __init__(self, name, max_concurrency, max_queue, overload="shed"):
+        if overload not in OVERLOAD_MODES:
+            raise ValueError(f"Unknown overload mode {overload!r}; expected one of {', '.join(OVERLOAD_MODES)}")
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.overload = overload
+        self.active = 0
+        self.waiting = 0
+        self.service_time = None
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    @classmethod
+    def from_env(cls, name, max_concurrency, max_queue, overload="shed"):
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            name,
+            int(os.getenv(prefix + "CONCURRENCY", str(max_concurrency))),
+            int(os.getenv(prefix + "QUEUE", str(max_queue))),
+            os.getenv(prefix + "OVERLOAD", overload).strip().lower()
+        )
+
+    def retry_after(self):
+        """Seconds until a slot is likely free: queued work ahead divided over the slots"""
+        service_time = self.service_time or 1.0
+        return max(1, math.ceil(service_time * (self.waiting + 1) / self.max_concurrency))
+
+    def over_capacity(self):
+        return self.active >= self.max_concurrency and self.waiting >= self.max_queue
+
+    def admit(self):
+        """Raise Overloaded (and count the shed) when the queue is full"""
+        if self.over_capacity():
+            ADMISSIONS.inc(self.name, "shed")
+            raise Overloaded(self.name, self.retry_after())
+
+    async def enter(self, shed=True):
+        """Wait for a slot and return its start time
+
+        With shed, raises Overloaded when the queue is full; without, the
+        caller already passed admit() and only waits.
+        """
+        if shed:
+            self.admit()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        ADMISSIONS.inc(self.name, "admitted")
+        return time.perf_counter()
+
+    def leave(self, started):
+        elapsed = time.perf_counter() - started
+        self.service_time = elapsed if self.service_time is None else (
+            SERVICE_TIME_ALPHA * elapsed + (1 - SERVICE_TIME_ALPHA) * self.service_time
+        )
+        self.active -= 1
+        self._slots.release()
+
+    def use_heuristic(self):
+        """True (and counted) when a request should get the heuristic answer instead of queueing"""
+        if self.overload == "heuristic" and self.over_capacity():
+            ADMISSIONS.inc(self.name, "heuristic")
+            return True
+        return False
+
+    async def run(self, func, *args, fallback=None):
+        """func(*args) in the thread pool once admitted
+
+        When over capacity in heuristic mode, fallback() (cheap, run inline)
+        answers instead of shedding.
+        """
+        if fallback is not None and self.use_heuristic():
+            return fallback()
+        started = await self.enter()
+        try:
+            return await run_in_threadpool(func, *args)
+        finally:
+            self.leave(started)
+
+    async def stream(self, iterator):
+        """Iterate a blocking generator in the thread pool, holding a slot while it runs
+
+        Call admit() first so an overloaded group answers 503 before the
+        response starts. The slot is only taken once the body is iterated,
+        so a response that is never sent holds nothing.
+        """
+        started = await self.enter(shed=False)
+        try:
+            async for chunk in iterate_in_threadpool(iterator):
+                yield chunk
+        finally:
+            self.leave(started)
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "overload": self.overload,
+            "service_time_ms": round(self.service_time * 1000, 2) if self.service_time is not None else None
+        }
+
+
+def register_gauges(groups):
+    registry.gauge("lms_ai_admission_active", "Requests running per admission group",
+                   lambda: {(name,): group.active for name, group in groups.items()}, ("group",))
+    registry.gauge("lms_ai_admission_waiting", "Requests waiting for a slot per admission group",
+                   lambda: {(name,): group.waiting for name, group in groups.items()}, ("group",))
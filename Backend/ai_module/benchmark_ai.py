@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark suite for the EnhancedLMSAI hot paths
+
+Times every predict/recommend method against histories of 10 to 10k scores
+per student, every train_* method against 100 to 1M students, request parsing
+(score objects vs columnar JSON vs MessagePack) per history length and
+response serialization for classes of 30 to 3000 students, reporting mean, p50, p99,
+allocations and peak memory. Results are written as JSON so
+runs can be compared:
+
+    python benchmark_ai.py --output before.json
+    python benchmark_ai.py --output after.json --compare before.json
+
+It also compares the model families (random forest, histogram gradient
+boosting) for each task side by side: training time, single-row and batch
+prediction latency, pickled model size and held-out accuracy, to pick the
+family per task under a latency budget (see AI_MODEL_FAMILIES).
+"""
+
+import argparse
+import gc
+import json
+import pickle
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import sklearn
+from fastapi.encoders import jsonable_encoder
+
+import fast_json
+from columnar import decode_columns
+from enhanced_ai import EnhancedLMSAI, MODEL_FAMILIES
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+TOPICS = [
+    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'Computer Science',
+    'English', 'History', 'Geography', 'Literature', 'Economics'
+]
+ASSIGNMENT_TYPES = ['quiz', 'assignment', 'exam', 'lab', 'project']
+
+SCORE_SIZES = [10, 100, 1000, 10000]
+STUDENT_SIZES = [100, 1000, 10000, 100000, 1000000]
+QUICK_SCORE_SIZES = [10, 100, 1000]
+QUICK_STUDENT_SIZES = [100, 1000]
+CLASS_SIZES = [30, 300, 3000]
+QUICK_CLASS_SIZES = [30, 300]
+FAMILY_STUDENTS = 10000
+QUICK_FAMILY_STUDENTS = 1000
+
+TASK_TRAIN_METHODS = {
+    'performance': 'train_performance_model',
+    'risk': 'train_risk_classification_model',
+    'grading': 'train_grading_model',
+    'behavioral': 'train_behavioral_model'
+}
+# Models fit on scaled features; the others take the raw training set
+SCALED_TASKS = ('performance', 'risk')
+
+TRAIN_METHODS = [
+    'train_performance_model',
+    'train_risk_classification_model',
+    'train_content_recommendation_model',
+    'train_grading_model',
+    'train_learning_path_model',
+    'train_behavioral_model'
+]
+
+
+def generate_student_scores(rng, num_scores):
+    """Generate one student's score history in the training data format"""
+    base_date = datetime(2024, 1, 1)
+    base_score = rng.uniform(45, 95)
+    trend = rng.uniform(-1, 1)
+    scores = np.clip(base_score + trend * np.arange(num_scores) + rng.normal(0, 12, num_scores), 0, 100)
+    topics = rng.integers(0, len(TOPICS), num_scores)
+    types = rng.integers(0, len(ASSIGNMENT_TYPES), num_scores)
+    days = np.sort(rng.integers(0, 365, num_scores))
+
+    return [
+        {
+            'topic': TOPICS[topics[i]],
+            'score': round(float(scores[i]), 1),
+            'maxScore': 100,
+            'date': (base_date + timedelta(days=int(days[i]))).strftime('%Y-%m-%d'),
+            'assignmentType': ASSIGNMENT_TYPES[types[i]]
+        }
+        for i in range(num_scores)
+    ]
+
+
+def generate_dataset(num_students, scores_per_student, seed=42):
+    """Generate a training dataset keyed by student id"""
+    rng = np.random.default_rng(seed)
+    return {
+        f"class{i // 30 + 1}_student{i % 30 + 1}": generate_student_scores(rng, scores_per_student)
+        for i in range(num_students)
+    }
+
+
+def measure(func, repeat, warmup=1):
+    """Time func() and measure allocations/peak memory in a separate traced run"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # tracemalloc slows execution down, so it gets its own run
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    base_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, 'filename')
+    timings = np.array(timings)
+    return {
+        "repeat": repeat,
+        "mean_ms": round(float(timings.mean()), 4),
+        "p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "p99_ms": round(float(np.percentile(timings, 99)), 4),
+        "min_ms": round(float(timings.min()), 4),
+        "allocated_blocks": int(sum(max(0, stat.count_diff) for stat in diff)),
+        "allocated_bytes": int(sum(max(0, stat.size_diff) for stat in diff)),
+        "peak_memory_bytes": int(peak - base_current)
+    }
+
+
+def train_reference_models(num_students=1000, scores_per_student=15):
+    """Train every model once so the predict paths have something to run"""
+    ai = EnhancedLMSAI(feature_cache_dir=None)
+    data = generate_dataset(num_students, scores_per_student)
+    for method in TRAIN_METHODS:
+        getattr(ai, method)(data)
+    return ai
+
+
+def benchmark_predict_methods(ai, score_sizes, repeat):
+    """Benchmark every predict/recommend method per history length"""
+    rng = np.random.default_rng(7)
+    grading_request = {'topic': 'Mathematics', 'assignmentType': 'quiz', 'maxScore': 100}
+    results = []
+
+    for num_scores in score_sizes:
+        student_scores = generate_student_scores(rng, num_scores)
+        weak_topic = TOPICS[0]
+        cases = {
+            'predict_performance': lambda: ai.predict_performance(student_scores),
+            'predict_risk_level': lambda: ai.predict_risk_level(student_scores),
+            'recommend_content': lambda: ai.recommend_content(student_scores),
+            'recommend_content[target_topic]': lambda: ai.recommend_content(student_scores, weak_topic),
+            'auto_grade_assignment': lambda: ai.auto_grade_assignment(grading_request),
+            'optimize_learning_path': lambda: ai.optimize_learning_path(student_scores),
+            'optimize_learning_path[target_topics]': lambda: ai.optimize_learning_path(student_scores, ['Physics', 'Advanced Mathematics']),
+            'analyze_behavior': lambda: ai.analyze_behavior(student_scores)
+        }
+
+        for name, func in cases.items():
+            print(f"⏱️  {name} ({num_scores} scores)")
+            result = measure(func, repeat)
+            results.append({"method": name, "kind": "predict", "scores_per_student": num_scores, **result})
+
+    return results
+
+
+def benchmark_train_methods(student_sizes, scores_per_student, repeat):
+    """Benchmark every train_* method per dataset size"""
+    results = []
+
+    for num_students in student_sizes:
+        print(f"📊 Generating {num_students} students x {scores_per_student} scores...")
+        data = generate_dataset(num_students, scores_per_student)
+        # Large datasets take minutes per fit; one timed run is enough there
+        train_repeat = repeat if num_students <= 10000 else 1
+
+        for method in TRAIN_METHODS:
+            print(f"🧠 {method} ({num_students} students)")
+            # A fresh instance per run with no feature cache, since training_features memoizes per
+            # instance: each timing includes building the shared feature matrices
+            result = measure(lambda: getattr(EnhancedLMSAI(feature_cache_dir=None), method)(data),
+                             train_repeat, warmup=0)
+            results.append({
+                "method": method,
+                "kind": "train",
+                "students": num_students,
+                "scores_per_student": scores_per_student,
+                **result
+            })
+
+        del data
+        gc.collect()
+
+    return results
+
+
+def benchmark_model_families(num_students, scores_per_student, families, repeat):
+    """Train and score every model family per task on the same 80/20 student split"""
+    data = generate_dataset(num_students, scores_per_student)
+    student_ids = list(data)
+    split = int(len(student_ids) * 0.8)
+    train_data = {student_id: data[student_id] for student_id in student_ids[:split]}
+    test_data = {student_id: data[student_id] for student_id in student_ids[split:]}
+    results = []
+
+    for task, method in TASK_TRAIN_METHODS.items():
+        for family in families:
+            print(f"🌲 {task} model with {family} ({num_students} students)")
+            ai = EnhancedLMSAI(feature_cache_dir=None, model_families={task: family})
+            # Build features up front so only the fit is timed
+            ai.training_features(train_data)
+            start = time.perf_counter()
+            getattr(ai, method)(train_data)
+            train_ms = (time.perf_counter() - start) * 1000
+            model = getattr(ai, f"{task}_model")
+
+            X, y = ai.training_set(task, test_data)
+            if task in SCALED_TASKS:
+                X = ai.scaler.transform(X)
+            predicted = model.predict(X)
+            if task in ('risk', 'behavioral'):
+                accuracy = {"accuracy": round(float(np.mean(predicted == y)), 4)}
+            else:
+                residual = y - predicted
+                accuracy = {
+                    "mae": round(float(np.mean(np.abs(residual))), 4),
+                    "r2": round(float(1 - np.sum(residual ** 2) / np.sum((y - y.mean()) ** 2)), 4)
+                }
+
+            single = measure(lambda: model.predict(X[:1]), repeat)
+            start = time.perf_counter()
+            model.predict(X)
+            batch_us_per_row = (time.perf_counter() - start) * 1e6 / len(X)
+            results.append({
+                "method": f"{task}[{family}]",
+                "kind": "model_family",
+                "task": task,
+                "family": family,
+                "students": num_students,
+                "scores_per_student": scores_per_student,
+                "train_ms": round(train_ms, 2),
+                "predict_p50_ms": single["p50_ms"],
+                "predict_p99_ms": single["p99_ms"],
+                "batch_predict_us_per_row": round(batch_us_per_row, 3),
+                "model_bytes": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+                "test_rows": len(X),
+                **accuracy
+            })
+
+    print_model_family_table(results)
+    return results
+
+
+def print_model_family_table(results):
+    print("\n🌲 Model families")
+    print(f"{'task':<12} {'family':<24} {'train ms':>10} {'p50 ms':>8} {'p99 ms':>8} {'batch us/row':>13} {'size KB':>9}  accuracy")
+    for r in results:
+        accuracy = f"accuracy {r['accuracy']:.3f}" if "accuracy" in r else f"MAE {r['mae']:.2f}, R² {r['r2']:.3f}"
+        print(f"{r['task']:<12} {r['family']:<24} {r['train_ms']:>10.1f} {r['predict_p50_ms']:>8.3f} "
+              f"{r['predict_p99_ms']:>8.3f} {r['batch_predict_us_per_row']:>13.2f} {r['model_bytes'] / 1024:>9.1f}  {accuracy}")
+
+
+def class_analysis_response(rng, num_students):
+    """Build an /analyze-class-performance response with NumPy values, as the endpoint does"""
+    levels = ['excellent', 'good', 'average', 'struggling']
+    risks = ['low', 'medium', 'high']
+    analyses = []
+    for i in range(num_students):
+        scores = rng.uniform(30, 100, 15)
+        analyses.append({
+            "student_id": f"student{i + 1}",
+            "overall_performance": np.mean(scores),
+            "performance_level": levels[i % len(levels)],
+            "risk_level": risks[i % len(risks)],
+            "weak_topics": [TOPICS[j] for j in rng.choice(len(TOPICS), 2, replace=False)],
+            "strong_topics": [TOPICS[j] for j in rng.choice(len(TOPICS), 2, replace=False)]
+        })
+    return {
+        "total_students": num_students,
+        "student_analyses": analyses,
+        "class_statistics": {
+            "average_performance": np.mean([a["overall_performance"] for a in analyses]),
+            "performance_distribution": {level: num_students // len(levels) for level in levels},
+            "risk_distribution": {risk: num_students // len(risks) for risk in risks}
+        }
+    }
+
+
+def default_json_encode(content):
+    """FastAPI's default path: jsonable_encoder copy, then JSONResponse's json.dumps"""
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def benchmark_serialization(class_sizes, repeat):
+    """Compare the default response encoder with fast_json on class-sized responses"""
+    rng = np.random.default_rng(11)
+    results = []
+
+    for num_students in class_sizes:
+        response = class_analysis_response(rng, num_students)
+        cases = {
+            'serialize[jsonable_encoder+json]': lambda: default_json_encode(response),
+            'serialize[fast_json]': lambda: fast_json.dumps(response)
+        }
+        for name, func in cases.items():
+            print(f"⏱️  {name} ({num_students} students)")
+            result = measure(func, repeat)
+            results.append({
+                "method": name,
+                "kind": "serialize",
+                "students": num_students,
+                "scores_per_student": 15,
+                "response_bytes": len(func()),
+                **result
+            })
+
+    return results
+
+
+def benchmark_request_parsing(score_sizes, repeat):
+    """Compare parsing a score history sent as objects, columnar JSON and MessagePack"""
+    # Imported here because importing main loads the serving models
+    from main import PerformanceRequest
+
+    rng = np.random.default_rng(13)
+    results = []
+
+    for num_scores in score_sizes:
+        history = generate_student_scores(rng, num_scores)
+        objects = json.dumps({
+            "student_id": "student1",
+            "scores": [
+                {"student_id": "student1", "topic": s['topic'], "score": s['score'], "max_score": s['maxScore'],
+                 "date": s['date'], "assignment_type": s['assignmentType']}
+                for s in history
+            ]
+        }).encode("utf-8")
+        columns = {
+            "topic": [s['topic'] for s in history],
+            "score": [s['score'] for s in history],
+            "max_score": [s['maxScore'] for s in history],
+            "date": [s['date'] for s in history],
+            "assignment_type": [s['assignmentType'] for s in history]
+        }
+        columnar = json.dumps({"student_id": "student1", "columns": columns}).encode("utf-8")
+        cases = {
+            # What FastAPI does for a PerformanceRequest body parameter
+            'parse[objects]': lambda: PerformanceRequest.model_validate(json.loads(objects)),
+            'parse[columnar_json]': lambda: decode_columns("student1", json.loads(columnar)["columns"])
+        }
+        if msgpack is not None:
+            packed = msgpack.packb({"student_id": "student1", "columns": columns})
+            cases['parse[msgpack]'] = lambda: decode_columns("student1", msgpack.unpackb(packed)["columns"])
+
+        for name, func in cases.items():
+            print(f"⏱️  {name} ({num_scores} scores)")
+            result = measure(func, repeat)
+            results.append({"method": name, "kind": "parse", "scores_per_student": num_scores, **result})
+
+    return results
+
+
+def result_key(result):
+    return (result["method"], result.get("students"), result["scores_per_student"])
+
+
+def compare_results(baseline_path, results):
+    """Print the change in mean and p99 against a previous run"""
+    with open(baseline_path, 'r') as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+
+    print(f"\n📈 Comparison against {baseline_path}")
+    print(f"{'case':<60} {'mean':>10} {'p99':>10} {'peak mem':>10}")
+    for result in results:
+        old = baseline.get(result_key(result))
+        # Model family rows have their own table
+        if not old or result["kind"] == "model_family":
+            continue
+        size = f"{result['students']} students" if result.get("students") else f"{result['scores_per_student']} scores"
+        ratios = [
+            result[field] / old[field] if old[field] else float('nan')
+            for field in ("mean_ms", "p99_ms", "peak_memory_bytes")
+        ]
+        print(f"{result['method'] + ' (' + size + ')':<60} {ratios[0]:>9.2f}x {ratios[1]:>9.2f}x {ratios[2]:>9.2f}x")
+
+
+def parse_sizes(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EnhancedLMSAI predict and train paths")
+    parser.add_argument('--score-sizes', type=parse_sizes, default=None,
+                        help="Comma-separated scores-per-student sizes for predict benchmarks")
+    parser.add_argument('--student-sizes', type=parse_sizes, default=None,
+                        help="Comma-separated student counts for train benchmarks")
+    parser.add_argument('--train-scores', type=int, default=15,
+                        help="Scores per student in train benchmarks")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed runs per predict case")
+    parser.add_argument('--train-repeat', type=int, default=3, help="Timed runs per train case")
+    parser.add_argument('--quick', action='store_true', help="Use small sizes for a fast smoke run")
+    parser.add_argument('--skip-train', action='store_true')
+    parser.add_argument('--skip-predict', action='store_true')
+    parser.add_argument('--class-sizes', type=parse_sizes, default=None,
+                        help="Comma-separated class sizes for serialization benchmarks")
+    parser.add_argument('--skip-serialize', action='store_true')
+    parser.add_argument('--skip-parse', action='store_true')
+    parser.add_argument('--families', default=','.join(MODEL_FAMILIES),
+                        help="Comma-separated model families to compare per task")
+    parser.add_argument('--family-students', type=int, default=None,
+                        help="Students in the model family comparison")
+    parser.add_argument('--skip-families', action='store_true')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    score_sizes = args.score_sizes or (QUICK_SCORE_SIZES if args.quick else SCORE_SIZES)
+    student_sizes = args.student_sizes or (QUICK_STUDENT_SIZES if args.quick else STUDENT_SIZES)
+    class_sizes = args.class_sizes or (QUICK_CLASS_SIZES if args.quick else CLASS_SIZES)
+    family_students = args.family_students or (QUICK_FAMILY_STUDENTS if args.quick else FAMILY_STUDENTS)
+    families = [family.strip() for family in args.families.split(',') if family.strip()]
+    unknown = [family for family in families if family not in MODEL_FAMILIES]
+    if unknown:
+        parser.error(f"unknown model families: {', '.join(unknown)}")
+
+    print("🚀 EnhancedLMSAI Benchmark Suite")
+    print("=" * 50)
+
+    results = []
+    if not args.skip_predict:
+        print("🧠 Training reference models...")
+        ai = train_reference_models()
+        results.extend(benchmark_predict_methods(ai, score_sizes, args.repeat))
+    if not args.skip_train:
+        results.extend(benchmark_train_methods(student_sizes, args.train_scores, args.train_repeat))
+    if not args.skip_parse:
+        results.extend(benchmark_request_parsing(score_sizes, args.repeat))
+    if not args.skip_serialize:
+        results.extend(benchmark_serialization(class_sizes, args.repeat))
+    if not args.skip_families:
+        results.extend(benchmark_model_families(family_students, args.train_scores, families, args.repeat))
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "scikit_learn": sklearn.__version__
+        },
+        "config": {
+            "score_sizes": score_sizes,
+            "student_sizes": student_sizes,
+            "class_sizes": class_sizes,
+            "family_students": family_students,
+            "families": families,
+            "train_scores": args.train_scores,
+            "repeat": args.repeat,
+            "train_repeat": args.train_repeat
+        },
+        "results": results
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
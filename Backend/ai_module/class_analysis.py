@@ -0,0 +1,94 @@
+"""
+Per-student class analysis shared by the class-performance endpoint and the
+background cohort-analysis jobs.
+"""
+
+import numpy as np
+
+
+def get_performance_level(avg_score):
+    """Get performance level based on average score"""
+    if avg_score >= 90:
+        return "excellent"
+    elif avg_score >= 75:
+        return "good"
+    elif avg_score >= 60:
+        return "average"
+    else:
+        return "struggling"
+
+def get_weak_topics(scores):
+    """Get weak topics (average < 70)"""
+    topic_scores = {}
+    for score in scores:
+        topic = score['topic']
+        if topic not in topic_scores:
+            topic_scores[topic] = []
+        topic_scores[topic].append(score['score'])
+
+    weak_topics = []
+    for topic, scores_list in topic_scores.items():
+        if np.mean(scores_list) < 70:
+            weak_topics.append(topic)
+
+    return weak_topics
+
+def get_strong_topics(scores):
+    """Get strong topics (average >= 80)"""
+    topic_scores = {}
+    for score in scores:
+        topic = score['topic']
+        if topic not in topic_scores:
+            topic_scores[topic] = []
+        topic_scores[topic].append(score['score'])
+
+    strong_topics = []
+    for topic, scores_list in topic_scores.items():
+        if np.mean(scores_list) >= 80:
+            strong_topics.append(topic)
+
+    return strong_topics
+
+def heuristic_risk_level(avg_performance):
+    """Risk level from the average score alone, as the insight fallbacks do"""
+    return "high" if avg_performance < 60 else "medium" if avg_performance < 75 else "low"
+
+def analyze_class_student(ai, student_data, heuristic=False):
+    """Analyze one student of a class or cohort with the given EnhancedLMSAI
+
+    heuristic skips the risk model and rates risk from the average score.
+    """
+    scores = student_data["scores"]
+    avg_performance = np.mean([s['score'] for s in scores])
+    if heuristic:
+        risk_level = heuristic_risk_level(avg_performance)
+    else:
+        risk_level = ai.predict_risk_level(scores) if ai.risk_model else None
+
+    return {
+        "student_id": student_data["student_id"],
+        "overall_performance": avg_performance,
+        "performance_level": get_performance_level(avg_performance),
+        "risk_level": risk_level or "unknown",
+        "weak_topics": get_weak_topics(scores),
+        "strong_topics": get_strong_topics(scores)
+    }
+
+def new_class_statistics():
+    return {
+        "average_performance": 0,
+        "performance_distribution": {"excellent": 0, "good": 0, "average": 0, "struggling": 0},
+        "risk_distribution": {"low": 0, "medium": 0, "high": 0}
+    }
+
+def add_to_class_statistics(class_statistics, student_analysis):
+    """Count a student analysis into the class distributions"""
+    class_statistics["performance_distribution"][student_analysis["performance_level"]] += 1
+    if student_analysis["risk_level"] != "unknown":
+        class_statistics["risk_distribution"][student_analysis["risk_level"]] += 1
+
+def merge_class_statistics(class_statistics, other):
+    """Add the distributions of other into class_statistics"""
+    for key in ("performance_distribution", "risk_distribution"):
+        for level, count in other[key].items():
+            class_statistics[key][level] += count
@@ -0,0 +1,290 @@
+"""
+Background cohort-analysis jobs for whole-school or district analyses.
+
+A job analyzes every student of a list of classes, or of a JSON data file in
+the training-data format, without holding an HTTP request open. Students are
+split into pages that run in a pool of worker processes; each worker writes
+its page of results straight to disk and sends back only the page's class
+statistics, which the coordinator thread merges into the job summary. With a
+scheduler, each page in flight holds a bulk slot (see scheduler.py), so
+pages start only while interactive work leaves room for them.
+
+On-disk layout, one directory per job under ``jobs/``::
+
+    jobs/<job_id>/job.json          status, progress and (when done) summary
+    jobs/<job_id>/page-00000.json   analyzed students of page 0
+    ...
+
+Files are written to a temporary name and renamed, so readers never see a
+partial page. Jobs still queued or running when the service stops are marked
+``interrupted`` on the next start.
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import fast_json
+from class_analysis import analyze_class_student, new_class_statistics, add_to_class_statistics, merge_class_statistics
+from enhanced_ai import EnhancedLMSAI
+from model_store import ModelStore
+from scheduler import BULK
+
+DEFAULT_JOBS_PATH = "jobs"
+DEFAULT_DATA_FILE = "ai_training_data.json"
+JOB_FILENAME = "job.json"
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+ACTIVE_STATES = ("queued", "running")
+
+# Per-worker-process model cache, keyed by model version (or legacy path)
+_worker_models = {}
+
+
+def _write_atomic(path, content):
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(fast_json.dumps(content))
+    os.replace(tmp_path, path)
+
+
+def page_path(job_dir, page):
+    return os.path.join(job_dir, f"page-{page:05d}.json")
+
+
+def _worker_model(model_version, legacy_path):
+    key = model_version or legacy_path
+    ai = _worker_models.get(key)
+    if ai is None:
+        if model_version:
+            ai = ModelStore().load(model_version)
+        else:
+            ai = EnhancedLMSAI()
+            if legacy_path and os.path.exists(legacy_path):
+                ai.load_models(legacy_path)
+        # Only the latest model is kept; a promotion replaces it
+        _worker_models.clear()
+        _worker_models[key] = ai
+    return ai
+
+
+def analyze_page(job_dir, page, students, model_version, legacy_path):
+    """Worker-process task: analyze one page of students and write it to disk"""
+    ai = _worker_model(model_version, legacy_path)
+    class_statistics = new_class_statistics()
+    analyses = []
+    total_performance = 0.0
+    scored = 0
+    errors = 0
+
+    for student_data in students:
+        try:
+            student_analysis = analyze_class_student(ai, student_data)
+        except Exception as e:
+            analyses.append({"student_id": student_data.get("student_id"), "error": str(e)})
+            errors += 1
+            continue
+        add_to_class_statistics(class_statistics, student_analysis)
+        if np.isfinite(student_analysis["overall_performance"]):
+            total_performance += float(student_analysis["overall_performance"])
+            scored += 1
+        analyses.append(student_analysis)
+
+    _write_atomic(page_path(job_dir, page), {"page": page, "students": analyses})
+    return {
+        "students": len(students),
+        "errors": errors,
+        "scored": scored,
+        "total_performance": total_performance,
+        "class_statistics": class_statistics
+    }
+
+
+class CohortJobManager:
+    def __init__(self, root=DEFAULT_JOBS_PATH, workers=None, page_size=100, data_file=DEFAULT_DATA_FILE, data_dir=".",
+                 scheduler=None):
+        self.root = root
+        self.scheduler = scheduler
+        self.data_dir = os.path.realpath(data_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.page_size = page_size
+        self.data_file = data_file
+        self._lock = threading.Lock()
+        self._executor = None
+        # Spawned workers re-import the launching script (e.g. ``python main.py``)
+        # and so build a manager too; only the main process may recover job state
+        if multiprocessing.current_process().name == "MainProcess":
+            self._mark_interrupted()
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def _save(self, job):
+        with self._lock:
+            _write_atomic(os.path.join(self._job_dir(job["job_id"]), JOB_FILENAME), job)
+
+    def _mark_interrupted(self):
+        if not os.path.isdir(self.root):
+            return
+        for job_id in os.listdir(self.root):
+            job = self.status(job_id)
+            if job and job["state"] in ACTIVE_STATES:
+                job["state"] = "interrupted"
+                job["error"] = "Service stopped before the job finished"
+                self._save(job)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: workers import only this module, not the running app and its threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def load_students(self, class_ids=None, data_file=None):
+        """Collect [{student_id, scores}] for the given classes or data file"""
+        path = os.path.realpath(os.path.join(self.data_dir, data_file or self.data_file))
+        if os.path.commonpath([path, self.data_dir]) != self.data_dir:
+            raise ValueError("Data file must be inside the service data directory")
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {student["student_id"]: student["scores"] for student in data}
+
+        if class_ids:
+            prefixes = tuple(f"{class_id}_" for class_id in class_ids)
+            student_ids = [student_id for student_id in data if student_id.startswith(prefixes)]
+        else:
+            student_ids = list(data)
+        return [{"student_id": student_id, "scores": data[student_id]} for student_id in student_ids]
+
+    def submit(self, students, class_ids=None, data_file=None, page_size=None, model_version=None, legacy_path=None):
+        """Create a job for the given students and start it in the background"""
+        page_size = max(1, page_size or self.page_size)
+        job_id = uuid.uuid4().hex
+        os.makedirs(self._job_dir(job_id), exist_ok=True)
+
+        job = {
+            "job_id": job_id,
+            "state": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "class_ids": class_ids,
+            "data_file": data_file,
+            "model_version": model_version,
+            "total_students": len(students),
+            "page_size": page_size,
+            "pages": (len(students) + page_size - 1) // page_size,
+            "completed_pages": 0,
+            "failed_pages": [],
+            "summary": None,
+            "error": None
+        }
+        self._save(job)
+        snapshot = dict(job)
+
+        threading.Thread(
+            target=self._run, args=(job, students, model_version, legacy_path),
+            name=f"cohort-job-{job_id[:8]}", daemon=True
+        ).start()
+        return snapshot
+
+    def _submit_page(self, executor, job_dir, page, students, model_version, legacy_path):
+        """Submit one page, first waiting for a bulk slot that it holds until done"""
+        if self.scheduler is None:
+            return executor.submit(analyze_page, job_dir, page, students, model_version, legacy_path)
+        self.scheduler.acquire(BULK)
+        try:
+            future = executor.submit(analyze_page, job_dir, page, students, model_version, legacy_path)
+        except BaseException:
+            self.scheduler.release(BULK)
+            raise
+        future.add_done_callback(lambda _: self.scheduler.release(BULK))
+        return future
+
+    def _run(self, job, students, model_version, legacy_path):
+        job_dir = self._job_dir(job["job_id"])
+        page_size = job["page_size"]
+        job["state"] = "running"
+        job["started_at"] = time.time()
+        self._save(job)
+
+        class_statistics = new_class_statistics()
+        totals = {"students": 0, "errors": 0, "scored": 0, "total_performance": 0.0}
+        futures = {}
+
+        def collect(done):
+            for future in list(done):
+                page = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    job["failed_pages"].append({"page": page, "error": str(e)})
+                else:
+                    merge_class_statistics(class_statistics, result["class_statistics"])
+                    for key in totals:
+                        totals[key] += result[key]
+                job["completed_pages"] += 1
+                self._save(job)
+
+        try:
+            executor = self._get_executor()
+            for page, start in enumerate(range(0, len(students), page_size)):
+                future = self._submit_page(executor, job_dir, page, students[start:start + page_size],
+                                           model_version, legacy_path)
+                futures[future] = page
+                collect([f for f in futures if f.done()])
+            del students
+
+            collect(as_completed(list(futures)))
+        except Exception as e:
+            job["state"] = "failed"
+            job["error"] = str(e)
+            job["finished_at"] = time.time()
+            self._save(job)
+            return
+
+        if totals["scored"] > 0:
+            class_statistics["average_performance"] = totals["total_performance"] / totals["scored"]
+        job["summary"] = {
+            "analyzed_students": totals["students"] - totals["errors"],
+            "failed_students": totals["errors"],
+            "class_statistics": class_statistics
+        }
+        job["state"] = "failed" if job["failed_pages"] else "completed"
+        if job["failed_pages"]:
+            job["error"] = f"{len(job['failed_pages'])} of {job['pages']} pages failed"
+        job["finished_at"] = time.time()
+        self._save(job)
+
+    def status(self, job_id):
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(os.path.join(self._job_dir(job_id), JOB_FILENAME), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def page(self, job_id, page):
+        """Raw JSON bytes of a finished page, or None if it is not written yet"""
+        try:
+            with open(page_path(self._job_dir(job_id), page), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,227 @@
+"""
+Columnar and MessagePack request bodies for score-history endpoints.
+
+The default body sends every score as its own ``StudentScore`` object, which
+repeats ``student_id`` and the field names and is validated one object at a
+time. These endpoints also accept the same history as parallel arrays:
+
+    {
+        "student_id": "class1_student1",
+        "columns": {
+            "topic": ["Mathematics", ...],
+            "score": [72.5, ...],
+            "max_score": [100, ...],
+            "date": ["2024-01-15", ...],
+            "assignment_type": ["quiz", ...]
+        },
+        "target_topic": "Physics"
+    }
+
+sent as ``application/vnd.lms.columnar+json`` or as MessagePack
+(``application/msgpack``). Columns are validated whole-array at once with
+NumPy, and dates are converted to day numbers in the same pass (see
+score_days.py). Scores then become lightweight ``ScoreRow`` tuples that the
+endpoints read exactly like ``StudentScore`` objects. Plain JSON bodies still go
+through the request model as before.
+"""
+
+import json
+from itertools import repeat
+from typing import NamedTuple
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from score_days import day_numbers
+from tracing import span
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+COLUMNAR_JSON = "application/vnd.lms.columnar+json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+NUMERIC_COLUMNS = ("score", "max_score")
+TEXT_COLUMNS = ("topic", "date", "assignment_type")
+
+
+class ScoreRow(NamedTuple):
+    student_id: str
+    topic: str
+    score: float
+    max_score: float
+    date: str
+    assignment_type: str
+    day: int
+
+
+def _error(loc, msg):
+    return {"loc": ("body",) + tuple(loc), "msg": msg, "type": "value_error"}
+
+
+def _numeric_column(name, values, errors):
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        errors.append(_error(("columns", name), "Input should be an array of numbers"))
+        return None
+    if array.ndim != 1:
+        errors.append(_error(("columns", name), "Input should be a flat array"))
+        return None
+    if not np.isfinite(array).all():
+        errors.append(_error(("columns", name), "Input should contain only finite numbers"))
+        return None
+    return array
+
+
+def _text_column(name, values, errors):
+    if not set(map(type, values)) <= {str}:
+        errors.append(_error(("columns", name), "Input should be an array of strings"))
+        return None
+    return values
+
+
+def decode_columns(student_id, columns):
+    """Validate parallel score arrays and turn them into ScoreRow tuples"""
+    if not isinstance(columns, dict):
+        raise RequestValidationError([_error(("columns",), "Input should be an object of arrays")])
+    if not isinstance(student_id, str):
+        raise RequestValidationError([_error(("student_id",), "Input should be a valid string")])
+
+    errors = []
+    for name in NUMERIC_COLUMNS + TEXT_COLUMNS:
+        if name not in columns:
+            errors.append(_error(("columns", name), "Field required"))
+        elif not isinstance(columns[name], list):
+            errors.append(_error(("columns", name), "Input should be a valid array"))
+    if errors:
+        raise RequestValidationError(errors)
+
+    lengths = {len(columns[name]) for name in NUMERIC_COLUMNS + TEXT_COLUMNS}
+    if len(lengths) > 1:
+        raise RequestValidationError([_error(("columns",), "All columns should have the same length")])
+
+    numeric = {name: _numeric_column(name, columns[name], errors) for name in NUMERIC_COLUMNS}
+    text = {name: _text_column(name, columns[name], errors) for name in TEXT_COLUMNS}
+    if errors:
+        raise RequestValidationError(errors)
+    try:
+        days = day_numbers(text["date"])
+    except ValueError:
+        raise RequestValidationError([_error(("columns", "date"), "Input should be an array of ISO dates (YYYY-MM-DD)")])
+
+    # _make is tuple.__new__, so rows are built without a Python-level __new__ per score
+    return list(map(ScoreRow._make, zip(
+        repeat(student_id),
+        text["topic"],
+        numeric["score"].tolist(),
+        numeric["max_score"].tolist(),
+        text["date"],
+        text["assignment_type"],
+        days.tolist()
+    )))
+
+
+def _body_errors(error):
+    return RequestValidationError([
+        {**e, "loc": ("body",) + tuple(e["loc"])} for e in error.errors(include_url=False)
+    ])
+
+
+def _validate(model, payload):
+    try:
+        return model.model_validate(payload)
+    except ValidationError as e:
+        raise _body_errors(e)
+
+
+def model_from_payload(model, payload):
+    """Validate an already-decoded body (object list or columns) into model"""
+    if not isinstance(payload, dict):
+        raise RequestValidationError([_error((), "Input should be a valid object")])
+    if "columns" not in payload:
+        return _validate(model, payload)
+
+    fields = {key: value for key, value in payload.items() if key != "columns"}
+    rows = decode_columns(payload.get("student_id"), payload["columns"])
+    # The other fields are still validated by the model; scores skip per-object validation
+    request = _validate(model, {**fields, "scores": []})
+    request.scores = rows
+    return request
+
+
+def _inline_refs(schema, defs):
+    if isinstance(schema, dict):
+        if "$ref" in schema:
+            return _inline_refs(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+        return {key: _inline_refs(value, defs) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return [_inline_refs(value, defs) for value in schema]
+    return schema
+
+
+def score_body_openapi(model):
+    """``openapi_extra`` documenting ``model`` as the body of a ``score_payload`` endpoint
+
+    The body is read by the dependency rather than a declared parameter, so
+    FastAPI would otherwise leave it out of /docs.
+    """
+    schema = model.model_json_schema()
+    schema = _inline_refs(schema, schema.pop("$defs", {}))
+    score_fields = schema["properties"]["scores"]["items"]["properties"]
+    properties = {name: value for name, value in schema["properties"].items() if name != "scores"}
+    properties["columns"] = {
+        "title": "Columns",
+        "description": "One array per score field, all of the same length",
+        "type": "object",
+        "properties": {name: {"type": "array", "items": score_fields[name]}
+                       for name in NUMERIC_COLUMNS + TEXT_COLUMNS},
+        "required": list(NUMERIC_COLUMNS + TEXT_COLUMNS)
+    }
+    columnar = {
+        "title": f"{schema['title']}Columns",
+        "type": "object",
+        "properties": properties,
+        "required": [name for name in schema.get("required", []) if name != "scores"] + ["columns"]
+    }
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": schema},
+        COLUMNAR_JSON: {"schema": columnar},
+        MSGPACK_TYPES[0]: {"schema": columnar}
+    }}}
+
+
+def score_payload(model):
+    """FastAPI dependency parsing ``model`` from a JSON, columnar JSON or MessagePack body"""
+
+    async def parse(request: Request):
+        body = await request.body()
+        content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+
+        with span("decode"):
+            if content_type in MSGPACK_TYPES:
+                if msgpack is None:
+                    raise HTTPException(status_code=415, detail="MessagePack support is not installed")
+                try:
+                    payload = msgpack.unpackb(body, raw=False)
+                except Exception:
+                    raise RequestValidationError([_error((), "Invalid MessagePack body")])
+                return model_from_payload(model, payload)
+
+            if content_type == COLUMNAR_JSON:
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    raise RequestValidationError([_error((), "Invalid JSON body")])
+                return model_from_payload(model, payload)
+
+            try:
+                return model.model_validate_json(body)
+            except ValidationError as e:
+                raise _body_errors(e)
+
+    return parse
@@ -0,0 +1,296 @@
+"""
+Compact, quantized storage and evaluation for the random forest models.
+
+A scikit-learn forest keeps 64 bytes per node (int64 links and feature,
+float64 threshold, impurity and sample counts) plus float64 leaf values.
+``CompactForest`` keeps only what prediction needs, concatenated across trees:
+
+- ``feature``: int8/int16 feature index per node
+- ``threshold``: float32 per node
+- ``left`` / ``right``: int16 (int32 for trees over 32767 nodes) tree-local
+  children; a leaf has ``left == -1`` and ``right`` holds its leaf index
+- ``leaf_values``: float16 per leaf for regressors, uint8 class
+  probabilities (0-255) per leaf for classifiers. Regressors whose leaves
+  do not share one sign, or fall outside float16's normal range, keep
+  float64 leaves (see ``_regression_leaf_dtype``)
+
+scikit-learn compares features as float32, so each threshold is rounded down
+to the nearest float32; every row takes the same path through every tree as
+in the original forest and only the leaf values are quantized. Regression
+predictions stay within ``REGRESSION_TOLERANCE`` (relative) and
+classifications match except on near-ties between classes.
+
+Classifiers can also vote with early exit (``predict_early_exit``): trees
+are walked in index order, a block at a time, and evaluation stops as soon
+as the leading class can no longer be overtaken by the remaining trees, or,
+with a ``delta``, once a Hoeffding bound puts the chance that the full forest
+disagrees below ``delta``.
+
+``EnhancedLMSAI.save_models(..., compact=True)`` stores its forests in this
+form; the models load and predict as before. To convert and check an
+existing model file:
+
+    python compact_forest.py models/enhanced_ai_models.pkl models/enhanced_ai_models.compact.pkl
+"""
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+# float16 keeps 11 significant bits: each leaf is within 2**-11 of its value
+REGRESSION_TOLERANCE = 2 ** -11
+MIN_CLASS_AGREEMENT = 0.99
+PREDICT_CHUNK_ROWS = 10000
+EARLY_EXIT_BLOCK = 10
+EARLY_EXIT_DELTA = 0.01
+
+
+def _smallest_int(max_value):
+    return next(dtype for dtype in (np.int8, np.int16, np.int32, np.int64) if max_value <= np.iinfo(dtype).max)
+
+
+def _threshold_float32(threshold):
+    """Largest float32 <= each threshold, so float32 features split exactly as before"""
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _regression_leaf_dtype(leaves):
+    """float16 when rounding each leaf keeps every average within REGRESSION_TOLERANCE, else float64
+
+    Each float16 leaf is within 2**-11 of its own value, so an average of
+    leaves is within 2**-11 of the average of their magnitudes. That is only
+    the prediction itself when the leaves share a sign.
+    """
+    magnitudes = np.abs(leaves[leaves != 0])
+    finfo = np.finfo(np.float16)
+    same_sign = (leaves >= 0).all() or (leaves <= 0).all()
+    if same_sign and (len(magnitudes) == 0 or (magnitudes.min() >= finfo.tiny and magnitudes.max() <= finfo.max)):
+        return np.float16
+    return np.float64
+
+
+class CompactForest:
+    """Drop-in predict()/predict_proba() for a fitted RandomForestRegressor or RandomForestClassifier"""
+
+    def __init__(self, feature, threshold, left, right, node_offsets, leaf_values, leaf_offsets,
+                 n_features, classes=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.node_offsets = node_offsets
+        self.leaf_values = leaf_values
+        self.leaf_offsets = leaf_offsets
+        self.n_features_in_ = n_features
+        self.classes_ = classes
+
+    @property
+    def is_classifier(self):
+        return self.classes_ is not None
+
+    @property
+    def n_estimators(self):
+        return len(self.node_offsets)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (
+            self.feature, self.threshold, self.left, self.right,
+            self.node_offsets, self.leaf_values, self.leaf_offsets
+        ))
+
+    @classmethod
+    def from_forest(cls, forest):
+        if not isinstance(forest, (RandomForestRegressor, RandomForestClassifier)):
+            raise TypeError(f"Expected a fitted random forest, got {type(forest).__name__}")
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        classifier = isinstance(forest, RandomForestClassifier)
+        max_nodes = max(tree.node_count for tree in trees)
+        link_dtype = np.int16 if max_nodes <= np.iinfo(np.int16).max else np.int32
+
+        features, thresholds, lefts, rights, leaf_values = [], [], [], [], []
+        for tree in trees:
+            is_leaf = tree.children_left == -1
+            leaf_index = np.cumsum(is_leaf) - 1
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(tree.children_left)
+            rights.append(np.where(is_leaf, leaf_index, tree.children_right))
+            value = tree.value[is_leaf, 0, :]
+            if classifier:
+                # Same per-tree probabilities predict_proba averages, quantized to 1/255
+                value = value / value.sum(axis=1, keepdims=True)
+                leaf_values.append(np.rint(value * 255).astype(np.uint8))
+            else:
+                leaf_values.append(value[:, 0])
+
+        node_counts = [tree.node_count for tree in trees]
+        leaf_counts = [len(values) for values in leaf_values]
+        leaf_values = np.concatenate(leaf_values)
+        if not classifier:
+            leaf_values = leaf_values.astype(_regression_leaf_dtype(leaf_values))
+        return cls(
+            feature=np.concatenate(features).astype(_smallest_int(forest.n_features_in_ - 1)),
+            threshold=_threshold_float32(np.concatenate(thresholds)),
+            left=np.concatenate(lefts).astype(link_dtype),
+            right=np.concatenate(rights).astype(link_dtype),
+            node_offsets=np.concatenate(([0], np.cumsum(node_counts)[:-1])).astype(np.int64),
+            leaf_values=leaf_values,
+            leaf_offsets=np.concatenate(([0], np.cumsum(leaf_counts)[:-1])).astype(np.int64),
+            n_features=forest.n_features_in_,
+            classes=forest.classes_.copy() if classifier else None
+        )
+
+    def _check_features(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1] if X.ndim else 0} features, but CompactForest is expecting {self.n_features_in_} features as input."
+            )
+        return X
+
+    def leaf_indices(self, X, trees=None):
+        """(len(trees), len(X)) global leaf indices, walking all selected trees level by level"""
+        trees = np.arange(self.n_estimators) if trees is None else np.asarray(trees)
+        n_rows = len(X)
+        node_base = np.repeat(self.node_offsets[trees], n_rows)
+        row = np.tile(np.arange(n_rows), len(trees))
+        node = node_base.copy()
+        active = np.flatnonzero(self.left[node] != -1)
+        while len(active):
+            current = node[active]
+            go_left = X[row[active], self.feature[current]] <= self.threshold[current]
+            child = np.where(go_left, self.left[current], self.right[current]).astype(np.int64)
+            node[active] = node_base[active] + child
+            active = active[self.left[node[active]] != -1]
+        leaf_base = np.repeat(self.leaf_offsets[trees], n_rows)
+        return (leaf_base + self.right[node]).reshape(len(trees), n_rows)
+
+    def _chunks(self, X):
+        X = self._check_features(X)
+        for start in range(0, len(X), PREDICT_CHUNK_ROWS):
+            yield X[start:start + PREDICT_CHUNK_ROWS]
+
+    def predict_proba(self, X):
+        if not self.is_classifier:
+            raise AttributeError("predict_proba is only available for classifiers")
+        parts = [
+            self.leaf_values[self.leaf_indices(chunk)].sum(axis=0, dtype=np.float64) / (255 * self.n_estimators)
+            for chunk in self._chunks(X)
+        ]
+        return np.concatenate(parts) if parts else np.empty((0, len(self.classes_)))
+
+    def predict_early_exit(self, X, delta=None, block=EARLY_EXIT_BLOCK):
+        """(class, trees evaluated) for a single row, stopping once more trees cannot change the vote
+
+        Without delta the class always equals predict(X)[0]. With delta,
+        evaluation may also stop when the average per-tree margin of the
+        leading class over the runner-up is significant at level delta.
+        """
+        X = self._check_features(X)
+        if len(X) != 1:
+            raise ValueError("predict_early_exit takes exactly one row")
+        n_trees = self.n_estimators
+        votes = np.zeros(len(self.classes_), dtype=np.int64)
+        evaluated = 0
+        confidence_margin = np.log(1 / delta) * 2 * 255 ** 2 if delta else None
+        while evaluated < n_trees:
+            stop = min(evaluated + block, n_trees)
+            leaves = self.leaf_indices(X, np.arange(evaluated, stop))[:, 0]
+            votes += self.leaf_values[leaves].sum(axis=0, dtype=np.int64)
+            evaluated = stop
+
+            leader = int(np.argmax(votes))
+            runner_up = np.partition(votes, -2)[-2] if len(votes) > 1 else 0
+            margin = votes[leader] - runner_up
+            # Each remaining tree adds at most 255 to any class
+            if margin > 255 * (n_trees - evaluated):
+                break
+            # Hoeffding: per-tree margins lie in [-1, 1], so P(full-forest mean <= 0) <= exp(-n * mean^2 / 2)
+            if confidence_margin is not None and margin > 0 and margin * margin >= confidence_margin * evaluated:
+                break
+        return self.classes_[leader], evaluated
+
+    def predict(self, X):
+        if self.is_classifier:
+            return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+        parts = [
+            self.leaf_values[self.leaf_indices(chunk)].astype(np.float64).mean(axis=0)
+            for chunk in self._chunks(X)
+        ]
+        return np.concatenate(parts) if parts else np.empty(0)
+
+
+def compact_model(model):
+    """CompactForest for a random forest; any other model is returned unchanged"""
+    if isinstance(model, (RandomForestRegressor, RandomForestClassifier)):
+        return CompactForest.from_forest(model)
+    return model
+
+
+def model_nbytes(model):
+    """Approximate in-memory size of a model's prediction data"""
+    if hasattr(model, "leaf_values"):
+        # A CompactForest (checked by attribute: unpickled models may come from another import of this module)
+        return model.nbytes
+    if isinstance(model, (RandomForestRegressor, RandomForestClassifier)):
+        return sum(e.tree_.__getstate__()["nodes"].nbytes + e.tree_.value.nbytes for e in model.estimators_)
+    return None
+
+
+def compare_predictions(original, compact, X):
+    """How closely compact reproduces original on X, and whether it is within tolerance"""
+    expected = original.predict(X)
+    actual = compact.predict(X)
+    if hasattr(original, "classes_"):
+        agreement = float(np.mean(expected == actual)) if len(X) else 1.0
+        return {"rows": len(X), "agreement": agreement, "within_tolerance": agreement >= MIN_CLASS_AGREEMENT}
+    error = np.abs(actual - expected) / np.maximum(np.abs(expected), 1)
+    max_error = float(error.max()) if len(X) else 0.0
+    return {"rows": len(X), "max_relative_error": max_error, "within_tolerance": max_error <= REGRESSION_TOLERANCE}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import os
+
+    from enhanced_ai import EnhancedLMSAI
+
+    parser = argparse.ArgumentParser(description="Convert a saved model file to compact forests and check its predictions")
+    parser.add_argument('source', help="Model file written by EnhancedLMSAI.save_models")
+    parser.add_argument('output', help="Where to write the compact model file")
+    parser.add_argument('--data', default='ai_training_data.json', help="Training data to check predictions on")
+    args = parser.parse_args()
+
+    ai = EnhancedLMSAI(feature_cache_dir=None)
+    if not ai.load_models(args.source):
+        raise SystemExit(1)
+    with open(args.data, 'r') as f:
+        data = json.load(f)
+
+    compact_ai = EnhancedLMSAI(feature_cache_dir=None)
+    ai.save_models(args.output, compact=True)
+    compact_ai.load_models(args.output)
+
+    failed = False
+    for task in ("performance", "risk", "grading", "behavioral"):
+        original = getattr(ai, f"{task}_model")
+        compact = getattr(compact_ai, f"{task}_model")
+        if original is None:
+            continue
+        X, _ = ai.training_set(task, data)
+        if task in ("performance", "risk"):
+            try:
+                X = ai.scaler.transform(X)
+            except ValueError:
+                # The shared scaler was last fit on another model's features, as in predict_performance
+                pass
+        check = compare_predictions(original, compact, X)
+        failed |= not check["within_tolerance"]
+        print(f"{'✅' if check['within_tolerance'] else '❌'} {task}: {model_nbytes(original)} -> {model_nbytes(compact)} bytes, {check}")
+
+    print(f"💾 {args.source}: {os.path.getsize(args.source)} bytes -> {args.output}: {os.path.getsize(args.output)} bytes")
+    raise SystemExit(1 if failed else 0)
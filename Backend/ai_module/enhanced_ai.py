@@ -1,17 +1,55 @@
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.ensemble import (
+    RandomForestRegressor, RandomForestClassifier,
+    HistGradientBoostingRegressor, HistGradientBoostingClassifier
+)
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, mean_squared_error
 import joblib
 import json
 from datetime import datetime, timedelta
+import os
 import warnings
+from metrics import record_cache, record_trees_evaluated, timed_inference
+from score_days import sorted_by_date, weekday
+from compact_forest import EARLY_EXIT_DELTA, CompactForest, compact_model
+from features import DEFAULT_CACHE_DIR, STUDENT, load_or_build_features, vocabulary
 warnings.filterwarnings('ignore')
 
+# max_score values whose auto-grade predictions are precomputed; others use the model
+GRADING_TABLE_MAX_SCORES = (10, 20, 25, 50, 100)
+
+# Tasks with a trained scikit-learn model, and the model families each can use:
+# (regressor, classifier, constructor arguments)
+MODEL_TASKS = ("performance", "risk", "grading", "behavioral")
+MODEL_FAMILIES = {
+    "random_forest": (RandomForestRegressor, RandomForestClassifier, {"n_estimators": 100, "random_state": 42}),
+    "hist_gradient_boosting": (HistGradientBoostingRegressor, HistGradientBoostingClassifier, {"max_iter": 100, "random_state": 42})
+}
+DEFAULT_MODEL_FAMILY = "random_forest"
+EARLY_EXIT_MODES = ("off", "exact", "confidence")
+
+
+def parse_model_families(value):
+    """{task: family} from "family" (every task) or "task=family,task=family"; unset tasks use the default"""
+    families = dict.fromkeys(MODEL_TASKS, DEFAULT_MODEL_FAMILY)
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        task, _, family = item.rpartition("=")
+        tasks = [task.strip()] if task else MODEL_TASKS
+        family = family.strip()
+        if family not in MODEL_FAMILIES:
+            raise ValueError(f"Unknown model family {family!r}; expected one of {', '.join(MODEL_FAMILIES)}")
+        for task in tasks:
+            if task not in MODEL_TASKS:
+                raise ValueError(f"Unknown model task {task!r}; expected one of {', '.join(MODEL_TASKS)}")
+            families[task] = family
+    return families
+
+
 class EnhancedLMSAI:
-    def __init__(self):
+    def __init__(self, feature_cache_dir=DEFAULT_CACHE_DIR, model_families=None, early_exit=None):
         self.performance_model = None
         self.risk_model = None
         self.content_recommendation_model = None
@@ -19,91 +57,116 @@ class EnhancedLMSAI:
         self.learning_path_model = None
         self.behavioral_model = None
         self.scaler = StandardScaler()
+        self._grading_table = None
+        self._grading_table_index = {}
+        self._grading_table_max_scores = np.empty(0)
+        self._grading_table_model = None
+        # None disables the on-disk feature cache
+        self.feature_cache_dir = feature_cache_dir
+        self._training_features = None
+        # {task: family}, a spec string for parse_model_families, or None for AI_MODEL_FAMILIES
+        if model_families is None or isinstance(model_families, str):
+            model_families = parse_model_families(model_families if model_families is not None
+                                                  else os.getenv("AI_MODEL_FAMILIES", ""))
+        self.model_families = {**dict.fromkeys(MODEL_TASKS, DEFAULT_MODEL_FAMILY), **model_families}
+        # Single-row risk/behavioral votes: "off" (every tree), "exact" or "confidence"; None reads AI_EARLY_EXIT
+        self.early_exit = (early_exit or os.getenv("AI_EARLY_EXIT", "off")).strip().lower()
+        if self.early_exit not in EARLY_EXIT_MODES:
+            raise ValueError(f"Unknown early exit mode {self.early_exit!r}; expected one of {', '.join(EARLY_EXIT_MODES)}")
+        self._voting_forests = {}
+        
+    def new_model(self, task, classifier=False):
+        """Unfitted model for a task from its configured family"""
+        regressor_class, classifier_class, params = MODEL_FAMILIES[self.model_families[task]]
+        return (classifier_class if classifier else regressor_class)(**params)
+        
+    def training_features(self, data):
+        """Feature matrices for a training dataset, built once and shared by every trainer"""
+        if self._training_features is None or self._training_features[0] is not data:
+            self._training_features = (data, load_or_build_features(data, self.feature_cache_dir))
+        return self._training_features[1]
+        
+    def training_set(self, task, data):
+        """(X, y) the task's model is fit on, from the shared feature matrices; X is unscaled"""
+        features = self.training_features(data)
+        if task == "grading":
+            # Categorical codes are hashed per vocabulary entry; hash() differs between processes
+            topic_codes = np.array([hash(topic) % 100 for topic in features.topics.tolist()])
+            assignment_codes = np.array([hash(t) % 10 for t in features.assignment_types.tolist()])
+            X = np.column_stack((
+                topic_codes[features.score_column("topic").astype(np.int64)],
+                assignment_codes[features.score_column("assignment_type").astype(np.int64)],
+                weekday(features.score_column("day").astype(np.int64)),
+                features.score_column("max_score")
+            )).astype(np.float64)
+            return X, features.score_column("score")
+        
+        students = features.students[features.students[:, STUDENT["count"]] >= 3]
+        avg_score = students[:, STUDENT["mean"]]
+        if task == "performance":
+            X = students[:, [STUDENT["mean"], STUDENT["std"], STUDENT["trend"],
+                             STUDENT["topic_diversity"], STUDENT["assignment_types"]]]
+            return X, avg_score
+        if task == "risk":
+            # Classify risk level: 2 high, 1 medium, 0 low
+            X = students[:, [STUDENT["mean"], STUDENT["std"], STUDENT["trend"]]]
+            return X, np.where(avg_score < 60, 2, np.where(avg_score < 75, 1, 0))
+        if task == "behavioral":
+            # Behavioral features
+            consistency = 1 - students[:, STUDENT["std"]] / 100
+            engagement = students[:, STUDENT["count"]] / 30  # Normalize by time period
+            improvement_rate = students[:, STUDENT["improvement_rate"]]
+            X = np.column_stack((avg_score, consistency, engagement, improvement_rate))
+            # Classify learning style: 0 consistent improver, 1 gradual improver, 2 struggling learner
+            y = np.where((improvement_rate > 0.1) & (consistency > 0.7), 0,
+                         np.where(improvement_rate > 0.05, 1, 2))
+            return X, y
+        raise ValueError(f"Unknown model task {task!r}")
         
     def train_performance_model(self, data):
         """Train performance prediction model"""
-        X = []
-        y = []
-        
-        for student_id, scores in data.items():
-            if len(scores) < 3:
-                continue
-                
-            # Extract features
-            avg_score = np.mean([s['score'] for s in scores])
-            std_score = np.std([s['score'] for s in scores])
-            recent_trend = self._calculate_trend(scores[-3:])
-            topic_diversity = len(set([s['topic'] for s in scores]))
-            assignment_types = len(set([s['assignmentType'] for s in scores]))
-            
-            features = [avg_score, std_score, recent_trend, topic_diversity, assignment_types]
-            X.append(features)
-            y.append(avg_score)
+        X, y = self.training_set("performance", data)
         
         if len(X) > 10:
-            X = np.array(X)
-            y = np.array(y)
-            
             # Scale features
-            X_scaled = self.scaler.fit_transform(X)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
             
-            self.performance_model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.performance_model.fit(X_scaled, y)
+            model = self.new_model("performance")
+            model.fit(X_scaled, y)
+            # Publish only fitted models: requests keep predicting while training runs
+            self.scaler = scaler
+            self.performance_model = model
             
             return True
         return False
     
     def train_risk_classification_model(self, data):
         """Train risk classification model"""
-        X = []
-        y = []
-        
-        for student_id, scores in data.items():
-            if len(scores) < 3:
-                continue
-                
-            avg_score = np.mean([s['score'] for s in scores])
-            std_score = np.std([s['score'] for s in scores])
-            recent_trend = self._calculate_trend(scores[-3:])
-            
-            features = [avg_score, std_score, recent_trend]
-            X.append(features)
-            
-            # Classify risk level
-            if avg_score < 60:
-                risk_level = 2  # High risk
-            elif avg_score < 75:
-                risk_level = 1  # Medium risk
-            else:
-                risk_level = 0  # Low risk
-            y.append(risk_level)
+        X, y = self.training_set("risk", data)
         
         if len(X) > 10:
-            X = np.array(X)
-            y = np.array(y)
-            
-            X_scaled = self.scaler.fit_transform(X)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
             
-            self.risk_model = RandomForestClassifier(n_estimators=100, random_state=42)
-            self.risk_model.fit(X_scaled, y)
+            model = self.new_model("risk", classifier=True)
+            model.fit(X_scaled, y)
+            self.scaler = scaler
+            self.risk_model = model
             
             return True
         return False
     
     def train_content_recommendation_model(self, data):
         """Train content recommendation model using collaborative filtering"""
-        # Create user-item matrix
-        user_item_matrix = {}
-        topic_scores = {}
-        
-        for student_id, scores in data.items():
-            user_item_matrix[student_id] = {}
-            for score in scores:
-                topic = score['topic']
-                if topic not in topic_scores:
-                    topic_scores[topic] = []
-                topic_scores[topic].append(score['score'])
-                user_item_matrix[student_id][topic] = score['score']
+        features = self.training_features(data)
+        topic_index = features.score_column("topic").astype(np.int64)
+        
+        # Scores per topic in dataset order; topics in order of first appearance
+        order = np.argsort(topic_index, kind="stable")
+        bounds = np.cumsum(np.bincount(topic_index, minlength=len(features.topics)))[:-1]
+        topic_scores = dict(zip(features.topics.tolist(),
+                                np.split(features.score_column("score")[order], bounds)))
         
         # Calculate topic similarities
         self.topic_similarities = {}
@@ -137,100 +200,39 @@ class EnhancedLMSAI:
     
     def train_grading_model(self, data):
         """Train automated grading model"""
-        X = []
-        y = []
-        
-        for student_id, scores in data.items():
-            for score in scores:
-                # Features for grading
-                topic = score['topic']
-                assignment_type = score['assignmentType']
-                date = datetime.strptime(score['date'], '%Y-%m-%d')
-                
-                # Convert categorical features
-                topic_encoded = hash(topic) % 100
-                assignment_encoded = hash(assignment_type) % 10
-                day_of_week = date.weekday()
-                
-                features = [topic_encoded, assignment_encoded, day_of_week, score['maxScore']]
-                X.append(features)
-                y.append(score['score'])
+        X, y = self.training_set("grading", data)
         
         if len(X) > 50:
-            X = np.array(X)
-            y = np.array(y)
-            
-            self.grading_model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.grading_model.fit(X, y)
+            model = self.new_model("grading")
+            model.fit(X, y)
+            self.build_grading_table(model=model)
+            self.grading_model = model
             
             return True
         return False
     
     def train_learning_path_model(self, data):
         """Train learning path optimization model"""
-        # Analyze learning sequences
-        learning_paths = {}
-        
-        for student_id, scores in data.items():
-            if len(scores) < 5:
-                continue
-                
-            # Sort by date
-            sorted_scores = sorted(scores, key=lambda x: x['date'])
-            
-            # Extract learning sequence
-            sequence = []
-            for score in sorted_scores:
-                sequence.append({
-                    'topic': score['topic'],
-                    'score': score['score'],
-                    'type': score['assignmentType']
-                })
-            
-            learning_paths[student_id] = sequence
+        features = self.training_features(data)
         
         # Find optimal learning patterns
-        self.optimal_paths = self._analyze_learning_patterns(learning_paths)
+        self.optimal_paths = self._analyze_learning_patterns(features)
         
         return True
     
     def train_behavioral_model(self, data):
         """Train behavioral analysis model"""
-        X = []
-        y = []
-        
-        for student_id, scores in data.items():
-            if len(scores) < 3:
-                continue
-                
-            # Behavioral features
-            avg_score = np.mean([s['score'] for s in scores])
-            consistency = 1 - np.std([s['score'] for s in scores]) / 100
-            engagement = len(scores) / 30  # Normalize by time period
-            improvement_rate = self._calculate_improvement_rate(scores)
-            
-            features = [avg_score, consistency, engagement, improvement_rate]
-            X.append(features)
-            
-            # Classify learning style
-            if improvement_rate > 0.1 and consistency > 0.7:
-                learning_style = 0  # Consistent improver
-            elif improvement_rate > 0.05:
-                learning_style = 1  # Gradual improver
-            else:
-                learning_style = 2  # Struggling learner
-            y.append(learning_style)
+        X, y = self.training_set("behavioral", data)
         
         if len(X) > 10:
-            X = np.array(X)
-            y = np.array(y)
-            
-            self.behavioral_model = RandomForestClassifier(n_estimators=100, random_state=42)
-            self.behavioral_model.fit(X, y)
+            model = self.new_model("behavioral", classifier=True)
+            model.fit(X, y)
+            self.behavioral_model = model
             
             return True
         return False
     
+    @timed_inference("performance")
     def predict_performance(self, student_scores):
         """Predict future performance"""
         if self.performance_model is None:
@@ -258,6 +260,7 @@ class EnhancedLMSAI:
             prediction = self.performance_model.predict(X)[0]
             return max(0, min(100, prediction))
     
+    @timed_inference("risk")
     def predict_risk_level(self, student_scores):
         """Predict risk level"""
         if self.risk_model is None:
@@ -275,14 +278,15 @@ class EnhancedLMSAI:
         
         try:
             X_scaled = self.scaler.transform(X)
-            risk_level = self.risk_model.predict(X_scaled)[0]
+            risk_level = self._classify("risk", self.risk_model, X_scaled)
         except ValueError:
             # If scaler expects different features, use unscaled data
-            risk_level = self.risk_model.predict(X)[0]
+            risk_level = self._classify("risk", self.risk_model, X)
         
         risk_labels = ['low', 'medium', 'high']
         return risk_labels[risk_level]
     
+    @timed_inference("recommendation")
     def recommend_content(self, student_scores, target_topic=None):
         """Recommend content based on student performance"""
         if not hasattr(self, 'topic_similarities'):
@@ -331,6 +335,7 @@ class EnhancedLMSAI:
         recommendations.sort(key=lambda x: x['confidence'], reverse=True)
         return recommendations[:5]
     
+    @timed_inference("grading")
     def auto_grade_assignment(self, assignment_data):
         """Automated grading system"""
         if self.grading_model is None:
@@ -345,12 +350,75 @@ class EnhancedLMSAI:
         assignment_encoded = hash(assignment_type) % 10
         day_of_week = datetime.now().weekday()
         
+        if self._grading_table_model is not self.grading_model:
+            self.build_grading_table()
+        row = self._grading_table_index.get(max_score)
+        record_cache("grading_table", row is not None)
+        if row is not None:
+            return self._grading_table[row, topic_encoded, assignment_encoded, day_of_week]
+        
         features = [topic_encoded, assignment_encoded, day_of_week, max_score]
         X = np.array([features])
         
         predicted_score = self.grading_model.predict(X)[0]
         return max(0, min(max_score, predicted_score))
     
+    @timed_inference("grading")
+    def auto_grade_batch(self, topics, assignment_types, max_scores):
+        """Grades for many submissions: one table gather plus at most one model predict"""
+        if self.grading_model is None:
+            return None
+        
+        max_scores = np.asarray(max_scores, dtype=np.float64)
+        if len(max_scores) == 0:
+            return np.empty(0)
+        
+        # Hash each distinct topic/assignment type once, then map codes back to every submission
+        unique_topics, topic_index = np.unique(np.asarray(topics), return_inverse=True)
+        topic_codes = np.array([hash(topic) % 100 for topic in unique_topics.tolist()])[topic_index]
+        unique_types, type_index = np.unique(np.asarray(assignment_types), return_inverse=True)
+        assignment_codes = np.array([hash(t) % 10 for t in unique_types.tolist()])[type_index]
+        day_of_week = datetime.now().weekday()
+        
+        if self._grading_table_model is not self.grading_model:
+            self.build_grading_table()
+        table_scores = self._grading_table_max_scores
+        rows = np.minimum(np.searchsorted(table_scores, max_scores), max(len(table_scores) - 1, 0))
+        hit = table_scores[rows] == max_scores if len(table_scores) else np.zeros(len(max_scores), dtype=bool)
+        
+        grades = np.empty(len(max_scores))
+        grades[hit] = self._grading_table[rows[hit], topic_codes[hit], assignment_codes[hit], day_of_week]
+        miss = ~hit
+        if miss.any():
+            X = np.column_stack((topic_codes[miss], assignment_codes[miss],
+                                 np.full(miss.sum(), day_of_week), max_scores[miss]))
+            grades[miss] = np.clip(self.grading_model.predict(X), 0, max_scores[miss])
+        record_cache("grading_table", True, int(hit.sum()))
+        record_cache("grading_table", False, int(miss.sum()))
+        return grades
+    
+    def build_grading_table(self, max_scores=GRADING_TABLE_MAX_SCORES, model=None):
+        """Precompute grading predictions for every (topic code, assignment code, weekday) at common max scores
+
+        model defaults to grading_model; training passes the new model before publishing it.
+        """
+        max_scores = sorted(max_scores)
+        model = model if model is not None else self.grading_model
+        if model is None:
+            table, index = None, {}
+        else:
+            codes = np.stack(np.meshgrid(np.arange(100), np.arange(10), np.arange(7), indexing='ij'), axis=-1).reshape(-1, 3)
+            X = np.vstack([np.column_stack((codes, np.full(len(codes), max_score))) for max_score in max_scores])
+            predictions = model.predict(X).reshape(len(max_scores), 100, 10, 7)
+            table = np.clip(predictions, 0, np.array(max_scores, dtype=float)[:, None, None, None])
+            index = {float(max_score): i for i, max_score in enumerate(max_scores)}
+        self._grading_table = table
+        self._grading_table_index = index
+        self._grading_table_max_scores = np.array(max_scores if table is not None else [], dtype=np.float64)
+        # Set last: auto_grade_assignment rebuilds whenever grading_model is no longer this model
+        self._grading_table_model = model
+    
+    @timed_inference("learning_path")
     def optimize_learning_path(self, student_scores, target_topics=None):
         """Optimize learning path for student"""
         if not hasattr(self, 'optimal_paths'):
@@ -404,6 +472,7 @@ class EnhancedLMSAI:
         
         return optimized_path
     
+    @timed_inference("behavioral")
     def analyze_behavior(self, student_scores):
         """Analyze student learning behavior"""
         if self.behavioral_model is None:
@@ -420,7 +489,7 @@ class EnhancedLMSAI:
         features = [avg_score, consistency, engagement, improvement_rate]
         X = np.array([features])
         
-        learning_style = self.behavioral_model.predict(X)[0]
+        learning_style = self._classify("behavioral", self.behavioral_model, X)
         learning_styles = ['Consistent Improver', 'Gradual Improver', 'Struggling Learner']
         
         return {
@@ -431,6 +500,40 @@ class EnhancedLMSAI:
             'recommendations': self._get_behavioral_recommendations(learning_style)
         }
     
+    def _voting_forest(self, task, model):
+        """CompactForest to vote with for a classifier, converted once per model; None for other families"""
+        if isinstance(model, CompactForest):
+            return model
+        if not isinstance(model, RandomForestClassifier):
+            return None
+        cached = self._voting_forests.get(task)
+        if cached is None or cached[0] is not model:
+            cached = self._voting_forests[task] = (model, CompactForest.from_forest(model))
+        return cached[1]
+    
+    def classify_rows(self, task, model, X):
+        """Class for every row of X; forests vote row by row with early exit unless early_exit is off
+
+        Live predictions and the insight snapshot both go through here, so
+        they give the same classes and count the same trees.
+        """
+        forest = self._voting_forest(task, model) if self.early_exit != "off" else None
+        if forest is None:
+            if hasattr(model, 'estimators_') or isinstance(model, CompactForest):
+                record_trees_evaluated(task, model.n_estimators, rows=len(X))
+            return model.predict(X)
+        delta = EARLY_EXIT_DELTA if self.early_exit == "confidence" else None
+        labels = []
+        for row in range(len(X)):
+            label, trees = forest.predict_early_exit(X[row:row + 1], delta=delta)
+            record_trees_evaluated(task, trees)
+            labels.append(label)
+        return np.array(labels, dtype=forest.classes_.dtype)
+    
+    def _classify(self, task, model, X):
+        """Class for one row, as classify_rows"""
+        return self.classify_rows(task, model, X)[0]
+    
     def _calculate_trend(self, recent_scores):
         """Calculate performance trend"""
         if len(recent_scores) < 2:
@@ -446,7 +549,7 @@ class EnhancedLMSAI:
         if len(scores) < 2:
             return 0
         
-        sorted_scores = sorted(scores, key=lambda x: x['date'])
+        sorted_scores = sorted_by_date(scores)
         first_half = sorted_scores[:len(sorted_scores)//2]
         second_half = sorted_scores[len(sorted_scores)//2:]
         
@@ -456,33 +559,37 @@ class EnhancedLMSAI:
             return (second_avg - first_avg) / 100
         return 0
     
-    def _analyze_learning_patterns(self, learning_paths):
-        """Analyze optimal learning patterns"""
-        patterns = {}
-        
-        for student_id, path in learning_paths.items():
-            # Find successful sequences
-            for i in range(len(path) - 1):
-                current = path[i]
-                next_topic = path[i + 1]
-                
-                sequence = f"{current['topic']}->{next_topic['topic']}"
-                if sequence not in patterns:
-                    patterns[sequence] = []
-                
-                # Calculate success rate
-                if next_topic['score'] >= 70:
-                    patterns[sequence].append(1)
-                else:
-                    patterns[sequence].append(0)
-        
-        # Find optimal patterns
+    def _analyze_learning_patterns(self, features):
+        """Analyze optimal learning patterns
+        
+        Counts consecutive topic pairs in the date-ordered history of every
+        student with at least five scores; a pair is optimal when it occurs at
+        least three times and the second score is >= 70 more than 70% of the time.
+        """
+        counts = features.students[:, STUDENT["count"]].astype(np.int64)
+        student = features.score_column("student").astype(np.int64)
+        order = np.lexsort((features.score_column("day"), student))
+        order = order[counts[student[order]] >= 5]
+        if len(order) < 2:
+            return {}
+        
+        topic = features.score_column("topic").astype(np.int64)[order]
+        score = features.score_column("score")[order]
+        same_student = student[order][1:] == student[order][:-1]
+        pairs = (topic[:-1] * len(features.topics) + topic[1:])[same_student]
+        success = (score[1:] >= 70)[same_student]
+        
+        # Patterns in order of first occurrence, like the dict this used to build
+        distinct, pair_index = vocabulary(pairs)
+        occurrences = np.bincount(pair_index, minlength=len(distinct))
+        success_rate = np.bincount(pair_index, weights=success, minlength=len(distinct)) / np.maximum(occurrences, 1)
+        
+        topics = features.topics.tolist()
         optimal_patterns = {}
-        for sequence, success_rates in patterns.items():
-            if len(success_rates) >= 3:
-                avg_success = np.mean(success_rates)
-                if avg_success > 0.7:
-                    optimal_patterns[sequence] = avg_success
+        for pair, count, rate in zip(distinct.tolist(), occurrences.tolist(), success_rate.tolist()):
+            if count >= 3 and rate > 0.7:
+                current, next_topic = divmod(pair, len(topics))
+                optimal_patterns[f"{topics[current]}->{topics[next_topic]}"] = rate
         
         return optimal_patterns
     
@@ -530,16 +637,18 @@ class EnhancedLMSAI:
         
         return recommendations.get(learning_style, ["Continue current approach"])
     
-    def save_models(self, filepath):
-        """Save all trained models"""
+    def save_models(self, filepath, compact=False):
+        """Save all trained models; compact stores random forests as quantized CompactForests"""
+        convert = compact_model if compact else (lambda model: model)
         models = {
-            'performance_model': self.performance_model,
-            'risk_model': self.risk_model,
-            'grading_model': self.grading_model,
-            'behavioral_model': self.behavioral_model,
+            'performance_model': convert(self.performance_model),
+            'risk_model': convert(self.risk_model),
+            'grading_model': convert(self.grading_model),
+            'behavioral_model': convert(self.behavioral_model),
             'scaler': self.scaler,
             'topic_similarities': getattr(self, 'topic_similarities', {}),
-            'optimal_paths': getattr(self, 'optimal_paths', {})
+            'optimal_paths': getattr(self, 'optimal_paths', {}),
+            'model_families': self.model_families
         }
         
         joblib.dump(models, filepath)
@@ -556,6 +665,9 @@ class EnhancedLMSAI:
             self.scaler = models.get('scaler')
             self.topic_similarities = models.get('topic_similarities', {})
             self.optimal_paths = models.get('optimal_paths', {})
+            # Files saved before model families were configurable hold random forests
+            self.model_families = models.get('model_families', dict.fromkeys(MODEL_TASKS, DEFAULT_MODEL_FAMILY))
+            self.build_grading_table()
             
             return True
         except Exception as e:
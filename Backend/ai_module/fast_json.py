@@ -0,0 +1,74 @@
+"""
+Fast JSON responses for large insight payloads.
+
+FastAPI normally runs a returned dict through ``jsonable_encoder``, which
+walks and copies the whole structure before ``json.dumps`` sees it. Returning
+``FastJSONResponse`` skips that step: orjson serializes the dict directly and
+understands NumPy scalars and arrays natively. Without orjson installed we
+fall back to ``json.dumps`` with a NumPy-aware default hook, which still
+avoids the intermediate copy.
+"""
+
+import json
+
+import numpy as np
+from fastapi.responses import Response
+
+from tracing import mark_serialization_start
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _numpy_default(obj):
+    if isinstance(obj, np.floating):
+        value = float(obj)
+        # Match orjson, which writes non-finite floats as null
+        return value if np.isfinite(value) else None
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(content):
+        """Serialize content (including NumPy values) to JSON bytes"""
+        return orjson.dumps(content, default=_numpy_default, option=_ORJSON_OPTIONS)
+else:
+    def _finite(obj):
+        # json writes float subclasses such as np.float64 itself, bypassing the default hook
+        if isinstance(obj, float):
+            return obj if np.isfinite(obj) else None
+        if isinstance(obj, dict):
+            return {key: _finite(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [_finite(value) for value in obj]
+        if isinstance(obj, np.ndarray):
+            return _finite(obj.tolist())
+        return obj
+
+    def dumps(content):
+        """Serialize content (including NumPy values) to JSON bytes"""
+        try:
+            text = json.dumps(content, default=_numpy_default, separators=(",", ":"), allow_nan=False)
+        except ValueError:
+            # Rare: only payloads holding NaN/inf pay for the extra walk
+            text = json.dumps(_finite(content), default=_numpy_default, separators=(",", ":"))
+        return text.encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        # Endpoints build these responses before returning; time the encoding as serialization
+        mark_serialization_start()
+        return dumps(content)
@@ -0,0 +1,196 @@
+"""
+Vectorized feature extraction shared by model training and the insight
+snapshot job.
+
+``build_training_features`` makes one pass over a training dataset
+({student_id: [scores]}) and produces two matrices that every trainer in
+EnhancedLMSAI reads from:
+
+- ``students``: one row per student (STUDENT_COLUMNS), the per-student
+  statistics the performance, risk and behavioral models use
+- ``scores``: one row per score (SCORE_COLUMNS), with topics and assignment
+  types as indexes into the ``topics``/``assignment_types`` vocabularies
+  (in first-appearance order) and dates as day numbers
+
+``load_or_build_features`` caches the result as ``.npy`` files under
+``models/features/<dataset hash>/`` so a retrain on the same data skips
+feature building. Hash codes used by the grading model (``hash(topic) % 100``)
+depend on the process, so they are derived from the vocabularies on use and
+never cached.
+"""
+
+import hashlib
+import os
+import shutil
+from functools import partial
+from typing import NamedTuple
+
+import numpy as np
+
+import fast_json
+from score_days import day_numbers
+
+DEFAULT_CACHE_DIR = os.path.join("models", "features")
+# Bump when a feature definition changes so older caches are ignored
+FEATURES_VERSION = 2
+CACHE_KEEP = 3
+
+STUDENT_COLUMNS = ("count", "mean", "std", "trend", "topic_diversity", "assignment_types", "improvement_rate")
+SCORE_COLUMNS = ("student", "topic", "assignment_type", "day", "max_score", "score")
+STUDENT = {name: i for i, name in enumerate(STUDENT_COLUMNS)}
+SCORE = {name: i for i, name in enumerate(SCORE_COLUMNS)}
+
+
+class TrainingFeatures(NamedTuple):
+    student_ids: np.ndarray
+    topics: np.ndarray
+    assignment_types: np.ndarray
+    students: np.ndarray
+    scores: np.ndarray
+
+    def score_column(self, name):
+        return self.scores[:, SCORE[name]]
+
+
+def vocabulary(values):
+    """(distinct values in first-appearance order, index of each value into them)"""
+    values = np.asarray(values)
+    if not len(values):
+        return values, np.empty(0, dtype=np.int64)
+    distinct, first, inverse = np.unique(values, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    return distinct[order], remap[inverse]
+
+
+def _distinct_per_student(codes, student_index, n_students):
+    if not len(codes):
+        return np.zeros(n_students, dtype=np.int64)
+    width = int(codes.max()) + 1
+    pairs = np.unique(student_index * width + codes)
+    return np.bincount(pairs // width, minlength=n_students)
+
+
+def _reduce_by_count(counts, offsets, values, reduce):
+    """reduce(rows) for every student, each student's values one row of a (students, count) matrix
+
+    Students with the same score count are reduced together. NumPy sums each
+    row pairwise exactly as it sums a student's own list, so np.mean/np.std
+    along axis 1 give the same floats as the per-student code.
+    """
+    result = np.zeros(len(counts))
+    by_count = np.argsort(counts, kind="stable")
+    sorted_counts = counts[by_count]
+    bounds = np.flatnonzero(np.diff(sorted_counts)) + 1
+    for members in np.split(by_count, bounds):
+        count = int(counts[members[0]]) if len(members) else 0
+        if count:
+            result[members] = reduce(values[offsets[members][:, None] + np.arange(count)])
+    return result
+
+
+def _improvement_rate(rows):
+    half = rows.shape[1] // 2
+    return (np.mean(rows[:, half:], axis=1) - np.mean(rows[:, :half], axis=1)) / 100
+
+
+def student_features(counts, score, day, topic_index, type_index):
+    """STUDENT_COLUMNS for every student from flat per-score arrays (students contiguous, in order)
+
+    Matches EnhancedLMSAI's per-student code: population std, trend over the
+    last three scores in list order, improvement rate from date-sorted halves.
+    Trend is 0 below three scores and improvement rate 0 below two.
+    """
+    n_students = len(counts)
+    student_index = np.repeat(np.arange(n_students), counts)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+    mean = _reduce_by_count(counts, offsets, score, partial(np.mean, axis=1))
+    std = _reduce_by_count(counts, offsets, score, partial(np.std, axis=1))
+
+    trend = np.zeros(n_students)
+    has_trend = counts >= 3
+    last = offsets[has_trend] + counts[has_trend] - 1
+    trend[has_trend] = (score[last] - score[last - 2]) / 3
+
+    # Stable sort by day within each student keeps list order for equal dates, like sorted()
+    order = np.lexsort((day, student_index))
+    has_halves = counts >= 2
+    improvement_rate = np.zeros(n_students)
+    improvement_rate[has_halves] = _reduce_by_count(
+        counts[has_halves], offsets[has_halves], score[order], _improvement_rate)
+
+    return np.column_stack((
+        counts, mean, std, trend,
+        _distinct_per_student(topic_index, student_index, n_students),
+        _distinct_per_student(type_index, student_index, n_students),
+        improvement_rate
+    )).astype(np.float64)
+
+
+def build_training_features(data):
+    """TrainingFeatures for {student_id: [scores]} in one pass over the scores"""
+    student_ids = list(data)
+    histories = [data[student_id] for student_id in student_ids]
+    counts = np.fromiter(map(len, histories), dtype=np.int64, count=len(histories))
+    flat = [s for history in histories for s in history]
+
+    score = np.fromiter((s['score'] for s in flat), dtype=np.float64, count=len(flat))
+    max_score = np.fromiter((s['maxScore'] for s in flat), dtype=np.float64, count=len(flat))
+    day = day_numbers([s['date'] for s in flat]) if flat else np.empty(0, dtype=np.int32)
+    topics, topic_index = vocabulary([s['topic'] for s in flat])
+    assignment_types, type_index = vocabulary([s['assignmentType'] for s in flat])
+
+    students = student_features(counts, score, day, topic_index, type_index)
+    scores = np.column_stack((
+        np.repeat(np.arange(len(counts)), counts), topic_index, type_index, day, max_score, score
+    )).astype(np.float64)
+    return TrainingFeatures(np.asarray(student_ids, dtype=str), topics.astype(str),
+                            assignment_types.astype(str), students, scores)
+
+
+def dataset_hash(data):
+    digest = hashlib.blake2b(f"features-v{FEATURES_VERSION}:".encode(), digest_size=16)
+    digest.update(fast_json.dumps(data))
+    return digest.hexdigest()
+
+
+def _prune(cache_dir, keep):
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if not name.startswith(".")]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def load_or_build_features(data, cache_dir=DEFAULT_CACHE_DIR):
+    """TrainingFeatures for data, from the .npy cache when this dataset was seen before"""
+    if cache_dir is None:
+        return build_training_features(data)
+
+    key = dataset_hash(data)
+    path = os.path.join(cache_dir, key)
+    if os.path.isdir(path):
+        try:
+            features = TrainingFeatures(*(
+                np.load(os.path.join(path, f"{field}.npy"), allow_pickle=False)
+                for field in TrainingFeatures._fields
+            ))
+            print(f"📦 Loaded training features from {path}")
+            return features
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not load cached features {path}: {e}")
+
+    features = build_training_features(data)
+    tmp_path = os.path.join(cache_dir, f".tmp-{key}-{os.getpid()}")
+    try:
+        os.makedirs(tmp_path, exist_ok=True)
+        for field, array in zip(TrainingFeatures._fields, features):
+            np.save(os.path.join(tmp_path, f"{field}.npy"), array, allow_pickle=False)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+        _prune(cache_dir, CACHE_KEEP)
+    except OSError as e:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        print(f"⚠️  Could not cache training features: {e}")
+    return features
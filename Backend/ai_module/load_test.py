@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Async load generator for the LMS AI FastAPI service
+
+Drives ``main.app`` either in-process through an ASGI transport (no network)
+or over a real socket, with a request mix that follows the calls made by the
+Node ``aiService.js`` and payload sizes drawn from a configurable
+distribution. Reports throughput and per-endpoint latency histograms:
+
+    python load_test.py --mode asgi --concurrency 16 --requests 2000
+    python load_test.py --mode socket --url http://localhost:8001 --duration 30
+    python load_test.py --mode socket --concurrency 32 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import numpy as np
+
+TOPICS = [
+    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'Computer Science',
+    'English', 'History', 'Geography', 'Literature', 'Economics'
+]
+ASSIGNMENT_TYPES = ['quiz', 'assignment', 'exam', 'lab', 'project']
+
+# Relative call frequency of each endpoint from the Node backend. Four
+# aiService wrappers (comprehensive insights, predictive analytics, tutoring
+# and adaptive learning) all hit /comprehensive-insights; student trends and
+# performance both hit /analyze-performance; class performance and at-risk
+# both hit /analyze-class-performance.
+DEFAULT_MIX = {
+    'comprehensive-insights': 4,
+    'analyze-performance': 2,
+    'analyze-class-performance': 2,
+    'behavior-analysis': 1,
+    'content-recommendations': 1,
+    'learning-path': 1,
+    'study-plan': 1,
+    'auto-grade': 1,
+    'health': 0.5
+}
+
+# Latency histogram bucket upper bounds in milliseconds
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf')]
+
+
+class PayloadFactory:
+    """Build request bodies shaped like the ones aiService.js sends"""
+
+    def __init__(self, seed=42, scores_median=15, scores_sigma=0.8, scores_max=2000,
+                 class_size_min=20, class_size_max=40):
+        self.rng = np.random.default_rng(seed)
+        self.scores_median = scores_median
+        self.scores_sigma = scores_sigma
+        self.scores_max = scores_max
+        self.class_size_min = class_size_min
+        self.class_size_max = class_size_max
+        self.student_counter = 0
+
+    def num_scores(self):
+        """Draw a history length from a log-normal distribution"""
+        value = self.rng.lognormal(np.log(self.scores_median), self.scores_sigma)
+        return int(max(3, min(self.scores_max, round(value))))
+
+    def raw_scores(self, num_scores):
+        """Scores in the training data format (as read from ai_training_data.json)"""
+        base_date = datetime(2024, 1, 1)
+        base = self.rng.uniform(45, 95)
+        values = np.clip(base + self.rng.normal(0, 12, num_scores), 0, 100)
+        days = np.sort(self.rng.integers(0, 240, num_scores))
+        return [
+            {
+                'topic': TOPICS[self.rng.integers(len(TOPICS))],
+                'score': round(float(values[i]), 1),
+                'maxScore': 100,
+                'date': (base_date + timedelta(days=int(days[i]))).strftime('%Y-%m-%d'),
+                'assignmentType': ASSIGNMENT_TYPES[self.rng.integers(len(ASSIGNMENT_TYPES))]
+            }
+            for i in range(num_scores)
+        ]
+
+    def student_request(self):
+        """StudentScore payload as built by convertToAIServiceFormat / analyzeStudentPerformance"""
+        self.student_counter += 1
+        student_id = f"class{self.student_counter % 5 + 1}_student{self.student_counter}"
+        scores = [
+            {
+                'student_id': student_id,
+                'topic': s['topic'],
+                'score': s['score'],
+                'max_score': s['maxScore'],
+                'date': s['date'],
+                'assignment_type': s['assignmentType']
+            }
+            for s in self.raw_scores(self.num_scores())
+        ]
+        return {'student_id': student_id, 'scores': scores}
+
+    def class_request(self):
+        """Class payload as built by analyzeClassPerformance / getAtRiskStudents"""
+        class_size = int(self.rng.integers(self.class_size_min, self.class_size_max + 1))
+        return [
+            {'student_id': f"class1_student{i + 1}", 'scores': self.raw_scores(self.num_scores())}
+            for i in range(class_size)
+        ]
+
+    def grading_request(self):
+        return {
+            'topic': TOPICS[self.rng.integers(len(TOPICS))],
+            'assignment_type': ASSIGNMENT_TYPES[self.rng.integers(len(ASSIGNMENT_TYPES))],
+            'max_score': 100
+        }
+
+    def build(self, endpoint):
+        """Return (method, path, json body) for an endpoint name"""
+        if endpoint == 'health':
+            return 'GET', '/health', None
+        if endpoint == 'auto-grade':
+            return 'POST', '/auto-grade', self.grading_request()
+        if endpoint == 'analyze-class-performance':
+            return 'POST', '/analyze-class-performance', self.class_request()
+        body = self.student_request()
+        if endpoint == 'content-recommendations':
+            body['target_topic'] = None
+        elif endpoint == 'learning-path':
+            body['target_topics'] = None
+        return 'POST', f'/{endpoint}', body
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies_ms = []
+        self.errors = 0
+        self.status_codes = {}
+        self.request_bytes = 0
+
+    def record(self, latency_ms, status_code, request_bytes):
+        self.latencies_ms.append(latency_ms)
+        self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+        self.request_bytes += request_bytes
+        if status_code >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed):
+        latencies = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        counts, _ = np.histogram(latencies, bins=[0] + HISTOGRAM_BUCKETS_MS)
+        return {
+            "requests": len(self.latencies_ms),
+            "errors": self.errors,
+            "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+            "throughput_rps": round(len(self.latencies_ms) / elapsed, 2) if elapsed > 0 else 0,
+            "mean_request_bytes": round(self.request_bytes / len(self.latencies_ms)) if self.latencies_ms else 0,
+            "latency_ms": {
+                "mean": round(float(latencies.mean()), 3),
+                "p50": round(float(np.percentile(latencies, 50)), 3),
+                "p90": round(float(np.percentile(latencies, 90)), 3),
+                "p99": round(float(np.percentile(latencies, 99)), 3),
+                "max": round(float(latencies.max()), 3)
+            },
+            "histogram": [
+                {"le_ms": "inf" if bound == float('inf') else bound, "count": int(count)}
+                for bound, count in zip(HISTOGRAM_BUCKETS_MS, counts)
+            ]
+        }
+
+
+def parse_mix(value):
+    """Parse 'endpoint=weight,...' into a request mix"""
+    mix = {}
+    for item in value.split(','):
+        endpoint, _, weight = item.partition('=')
+        mix[endpoint.strip()] = float(weight or 1)
+    return mix
+
+
+async def run_load(client, mix, factory, concurrency, total_requests=None, duration=None):
+    """Send requests from `concurrency` workers until the request or time budget runs out"""
+    endpoints = list(mix.keys())
+    weights = np.array([mix[e] for e in endpoints], dtype=float)
+    weights /= weights.sum()
+
+    stats = {endpoint: EndpointStats() for endpoint in endpoints}
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_request():
+        nonlocal issued
+        if total_requests is not None and issued >= total_requests:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        issued += 1
+        endpoint = endpoints[factory.rng.choice(len(endpoints), p=weights)]
+        method, path, body = factory.build(endpoint)
+        content = json.dumps(body).encode() if body is not None else None
+        return endpoint, method, path, content
+
+    async def worker():
+        while True:
+            request = next_request()
+            if request is None:
+                return
+            endpoint, method, path, content = request
+            headers = {'Content-Type': 'application/json'} if content is not None else None
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, content=content, headers=headers)
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = 599
+            stats[endpoint].record((time.perf_counter() - start) * 1000, status_code, len(content or b''))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return stats, elapsed
+
+
+def asgi_transport(app):
+    """In-process transport; unhandled app exceptions come back as 500 samples instead of ending the run"""
+    return httpx.ASGITransport(app=app, raise_app_exceptions=False)
+
+
+def start_local_server():
+    """Run main.app under uvicorn on a free local port in a background thread"""
+    import uvicorn
+    from main import app
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def print_report(stats, elapsed):
+    total = sum(len(s.latencies_ms) for s in stats.values())
+    print(f"\n📊 {total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+    print(f"{'endpoint':<28} {'reqs':>6} {'err':>5} {'rps':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for endpoint, endpoint_stats in stats.items():
+        summary = endpoint_stats.summary(elapsed)
+        if not summary["requests"]:
+            continue
+        latency = summary["latency_ms"]
+        print(f"{endpoint:<28} {summary['requests']:>6} {summary['errors']:>5} {summary['throughput_rps']:>8} "
+              f"{latency['p50']:>8.1f}ms {latency['p90']:>7.1f}ms {latency['p99']:>7.1f}ms {latency['max']:>7.1f}ms")
+
+    print("\n📈 Latency histograms (ms)")
+    for endpoint, endpoint_stats in stats.items():
+        summary = endpoint_stats.summary(elapsed)
+        if not summary["requests"]:
+            continue
+        print(f"  {endpoint}")
+        peak = max(bucket["count"] for bucket in summary["histogram"]) or 1
+        for bucket in summary["histogram"]:
+            if bucket["count"]:
+                bar = '█' * max(1, round(40 * bucket["count"] / peak))
+                print(f"    <= {str(bucket['le_ms']):>6} {bucket['count']:>6} {bar}")
+
+
+async def main_async(args):
+    factory = PayloadFactory(
+        seed=args.seed,
+        scores_median=args.scores_median,
+        scores_sigma=args.scores_sigma,
+        scores_max=args.scores_max,
+        class_size_min=args.class_size_min,
+        class_size_max=args.class_size_max
+    )
+    total_requests = None if args.duration else args.requests
+    server = None
+
+    if args.mode == 'asgi':
+        from main import app
+        transport = asgi_transport(app)
+        base_url = 'http://ai-service'
+        print("🧪 Driving main.app in-process through the ASGI transport")
+    else:
+        transport = None
+        base_url = args.url
+        if not base_url:
+            server, _, base_url = start_local_server()
+        print(f"🌐 Driving {base_url} over a real socket")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits,
+                                     timeout=args.timeout) as client:
+            stats, elapsed = await run_load(client, args.mix, factory, args.concurrency,
+                                            total_requests=total_requests, duration=args.duration)
+    finally:
+        if server is not None:
+            server.should_exit = True
+
+    print_report(stats, elapsed)
+
+    if args.output:
+        report = {
+            "generated_at": datetime.now().isoformat(),
+            "mode": args.mode,
+            "base_url": base_url,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(sum(len(s.latencies_ms) for s in stats.values()) / elapsed, 2),
+            "endpoints": {endpoint: s.summary(elapsed) for endpoint, s in stats.items()}
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the LMS AI service")
+    parser.add_argument('--mode', choices=['asgi', 'socket'], default='asgi')
+    parser.add_argument('--url', help="Base URL of a running service (socket mode); starts one if omitted")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help="Total requests (ignored with --duration)")
+    parser.add_argument('--duration', type=float, help="Run for this many seconds instead of a request count")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help="Request mix as endpoint=weight,... (default follows aiService.js)")
+    parser.add_argument('--scores-median', type=float, default=15, help="Median scores per student")
+    parser.add_argument('--scores-sigma', type=float, default=0.8, help="Log-normal spread of scores per student")
+    parser.add_argument('--scores-max', type=int, default=2000)
+    parser.add_argument('--class-size-min', type=int, default=20)
+    parser.add_argument('--class-size-max', type=int, default=40)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the report as JSON")
+    args = parser.parse_args()
+
+    print("🚀 LMS AI Service Load Test")
+    print("=" * 50)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,47 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, PrivateAttr, model_validator
 from typing import List, Dict, Optional, Any
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
-from datetime import datetime
+import asyncio
 import json
 import random
 import time
+from contextlib import nullcontext
 
 # Import the enhanced AI module
 from enhanced_ai import EnhancedLMSAI
+from model_store import UNTRAINED_IDENTITY, ModelStore, ShadowScorer, legacy_model_identity
+from metrics import MetricsMiddleware, record_cache, registry as metrics_registry
+from profiler import SamplingProfiler, ProfilerMiddleware
+import fast_json
+from fast_json import FastJSONResponse
+from cohort_jobs import CohortJobManager
+from columnar import ScoreRow, model_from_payload, score_body_openapi, score_payload
+from score_store import ScoreStore
+from score_days import day_number
+from snapshots import InsightSnapshot, score_fingerprint
+from quiz_bank import QuestionBank, build_quiz
+import insights
+from class_analysis import (
+    analyze_class_student, new_class_statistics, add_to_class_statistics, get_weak_topics
+)
+from tracing import (
+    TracedRoute, TracingMiddleware, current_trace, item_trace, server_timing_header, span,
+    trace_writer_from_env
+)
+from admission import AdmissionGroup, Overloaded, register_gauges
+from scheduler import BULK, INTERACTIVE, InteractiveLatencyMiddleware, PriorityScheduler
 
 app = FastAPI(title="LMS AI Service", version="2.0")
+app.router.route_class = TracedRoute
 
 # CORS middleware
 app.add_middleware(
@@ -25,20 +51,110 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Worker slots shared by interactive and bulk work (see scheduler.py)
+scheduler = PriorityScheduler.from_env()
+scheduler.register_gauges()
+# Student-facing routes whose p99 bulk work must not push over INTERACTIVE_P99_TARGET_MS
+INTERACTIVE_PATHS = (
+    "/analyze-performance", "/comprehensive-insights", "/behavior-analysis", "/content-recommendations",
+    "/learning-path", "/study-plan", "/auto-grade", "/auto-grade/batch", "/batch", "/optimize-learning-path",
+    "/analyze-behavior"
+)
+app.add_middleware(InteractiveLatencyMiddleware, scheduler=scheduler, paths=INTERACTIVE_PATHS,
+                   prefixes=("/students/",))
+
+# Opt-in request profiler (off until enabled through /admin/profiler or the X-Profile header)
+request_profiler = SamplingProfiler(
+    sample_rate=float(os.getenv("PROFILER_SAMPLE_RATE", "0.01")),
+    interval_ms=float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+)
+app.add_middleware(ProfilerMiddleware, profiler=request_profiler)
+
+# Request-ID propagation and Server-Timing spans (see tracing.py)
+trace_writer = trace_writer_from_env()
+app.add_middleware(TracingMiddleware, writer=trace_writer)
 
 # Initialize enhanced AI
 enhanced_ai = EnhancedLMSAI()
 
 # Try to load pre-trained models
 models_path = "models/enhanced_ai_models.pkl"
-if os.path.exists(models_path):
+model_store = ModelStore()
+current_model_version = model_store.current_version()
+if current_model_version:
+    try:
+        enhanced_ai = model_store.load(current_model_version)
+        print(f"✅ Loaded AI models version {current_model_version}")
+    except Exception as e:
+        print(f"⚠️  Could not load model version {current_model_version}: {e}")
+        current_model_version = None
+# What the serving models were built from; insight snapshots must match it (see snapshots.py)
+model_identity = current_model_version or UNTRAINED_IDENTITY
+if current_model_version is None and os.path.exists(models_path):
     try:
         enhanced_ai.load_models(models_path)
+        model_identity = legacy_model_identity(models_path)
         print("✅ Loaded pre-trained AI models")
     except Exception as e:
         print(f"⚠️  Could not load pre-trained models: {e}")
         print("📝 Models will be trained on first request")
 
+# Shadow-score a sample of live traffic against the candidate version, if any
+shadow_scorer = ShadowScorer(sample_rate=float(os.getenv("SHADOW_SAMPLE_RATE", "0.05")))
+
+def configure_shadow_scoring():
+    """Point the shadow scorer at the store's candidate version"""
+    candidate_version = model_store.candidate_version()
+    candidate_ai = None
+    if candidate_version:
+        try:
+            candidate_ai = model_store.load(candidate_version)
+        except Exception as e:
+            print(f"⚠️  Could not load candidate model version {candidate_version}: {e}")
+            candidate_version = None
+    shadow_scorer.configure(enhanced_ai, current_model_version or "legacy", candidate_ai, candidate_version)
+
+configure_shadow_scoring()
+
+metrics_registry.gauge("lms_ai_model_info", "Model version currently serving traffic (value is always 1)",
+                       lambda: {(current_model_version or "legacy",): 1}, ("version",))
+metrics_registry.gauge("lms_ai_shadow_queue_depth", "Requests waiting for shadow scoring",
+                       shadow_scorer.queue_depth)
+
+# Local score store so endpoints can take student/class IDs (see score_store.py)
+score_store = ScoreStore()
+try:
+    score_store.ensure_current()
+except Exception as e:
+    print(f"⚠️  Could not build score store: {e}")
+
+# Question pools for /generate-quiz (see quiz_bank.py)
+question_bank = QuestionBank.load(os.getenv("QUESTION_BANK_PATH", "question_bank.json"))
+
+# Nightly insight snapshot, served when a student's scores are unchanged (see snapshots.py)
+insight_snapshot = InsightSnapshot(os.getenv("INSIGHT_SNAPSHOT_PATH", "data/insights.snap"))
+
+# Concurrency limits and load shedding for the CPU-heavy endpoints (see admission.py)
+admission_groups = {
+    "class_analysis": AdmissionGroup.from_env("class_analysis", max_concurrency=2, max_queue=8),
+    "insights": AdmissionGroup.from_env("insights", max_concurrency=8, max_queue=64),
+    "training": AdmissionGroup.from_env("training", max_concurrency=1, max_queue=4)
+}
+register_gauges(admission_groups)
+
+# Background cohort-analysis jobs (results under jobs/, see cohort_jobs.py)
+cohort_jobs = CohortJobManager(
+    workers=int(os.getenv("COHORT_JOB_WORKERS", "0")) or None,
+    page_size=int(os.getenv("COHORT_JOB_PAGE_SIZE", "100")),
+    scheduler=scheduler
+)
+
+@app.on_event("shutdown")
+def shutdown_cohort_jobs():
+    cohort_jobs.shutdown()
+
 # Pydantic models for request/response
 class StudentScore(BaseModel):
     student_id: str
@@ -47,6 +163,24 @@ class StudentScore(BaseModel):
     max_score: float
     date: str
     assignment_type: str  # quiz, assignment, exam
+    _day: Optional[int] = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def parse_date(self):
+        """Convert date to a day number once, while the request is validated
+
+        Other date strings are still accepted; they get no day number and
+        their history is ordered by the date strings (see sorted_by_date).
+        """
+        try:
+            self._day = day_number(self.date)
+        except ValueError:
+            self._day = None
+        return self
+
+    @property
+    def day(self) -> Optional[int]:
+        return self._day
 
 class PerformanceRequest(BaseModel):
     student_id: str
@@ -89,16 +223,139 @@ class BehavioralAnalysisRequest(BaseModel):
     student_id: str
     scores: List[StudentScore]
 
+class GradingBatchRequest(BaseModel):
+    submissions: List[GradingRequest]
+
 class QuizGenerationRequest(BaseModel):
     weak_subjects: List[str]
     quiz_type: str
     course_title: str
     difficulty_level: str
+    seed: Optional[int] = None
+
+class ClassQuizStudent(BaseModel):
+    student_id: str
+    weak_subjects: List[str]
+    seen_question_ids: List[str] = []
+
+class ClassQuizRequest(BaseModel):
+    class_id: Optional[str] = None
+    students: Optional[List[ClassQuizStudent]] = None
+    quiz_type: str
+    course_title: str
+    difficulty_level: str = "adaptive"
+    seed: Optional[int] = None
+
+class ModelVersionRequest(BaseModel):
+    version: Optional[str] = None
+
+class BatchItem(BaseModel):
+    endpoint: str
+    body: Dict[str, Any]
+    # Request ID of the caller that made this call, so its spans join that caller's trace
+    request_id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+class CohortAnalysisRequest(BaseModel):
+    class_ids: Optional[List[str]] = None
+    data_file: Optional[str] = None
+    page_size: Optional[int] = None
+
+class ProfilerConfigRequest(BaseModel):
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = None
+    interval_ms: Optional[float] = None
+    max_stacks: Optional[int] = None
+    reset: bool = False
 
 # Global variables for model storage
 models = {}
 scalers = {}
 
+# Largest number of calls accepted by /batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "200"))
+# Calls of one /batch request run concurrently, at most this many at a time
+BATCH_CONCURRENCY = max(1, int(os.getenv("BATCH_CONCURRENCY", "8")))
+
+# Largest number of submissions accepted by /auto-grade/batch
+MAX_GRADING_BATCH_SIZE = int(os.getenv("MAX_GRADING_BATCH_SIZE", "5000"))
+GRADE_THRESHOLDS = np.array([60, 70, 80, 90])
+GRADE_LETTERS = np.array(["F", "D", "C", "B", "A"])
+
+# Streaming class analysis (NDJSON, one record per student)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CLASS_STREAM_CHUNK_SIZE = int(os.getenv("CLASS_STREAM_CHUNK_SIZE", "50"))
+
+def to_ml_scores(scores: List[StudentScore]) -> List[Dict]:
+    """Convert request scores to the format expected by the ML models"""
+    with span("feature_extraction"):
+        return [
+            {
+                'score': score.score,
+                'topic': score.topic,
+                'maxScore': score.max_score,
+                'assignmentType': score.assignment_type,
+                'date': score.date,
+                'day': score.day
+            }
+            for score in scores
+        ]
+
+def snapshot_response(kind: str, request) -> Optional[Response]:
+    """Stored response from the insight snapshot if the student's scores and model are unchanged"""
+    with span("snapshot_lookup"):
+        try:
+            content = insight_snapshot.lookup(
+                kind, request.student_id, score_fingerprint(request.scores), model_identity
+            )
+        except Exception as e:
+            print(f"⚠️  Insight snapshot lookup failed: {e}")
+            content = None
+    record_cache("insight_snapshot", content is not None)
+    if content is None:
+        return None
+    return Response(content=content, media_type="application/json")
+
+def heuristic_response(body: Dict) -> Dict:
+    """Mark a fallback answer given because the ML path is over capacity"""
+    return {**body, "degraded": True, "degraded_reason": "over_capacity"}
+
+# Model outputs as seen by the insight builders when no model answers
+NO_PREDICTIONS = dict.fromkeys(insights.PREDICTION_KEYS)
+
+def save_trained_models() -> None:
+    """Save models trained on request; snapshots built from the previous models stop matching"""
+    global model_identity
+    enhanced_ai.save_models(models_path)
+    model_identity = (
+        f"{current_model_version}+trained:{time.time_ns()}" if current_model_version
+        else legacy_model_identity(models_path)
+    )
+
+async def ensure_trained(trained, train) -> None:
+    """Run train() under the training admission group unless trained() already holds
+
+    train re-checks once admitted, so requests queued behind a training run
+    do not train again.
+    """
+    if trained():
+        return
+    await admission_groups["training"].run(train)
+
+def grading_trained() -> bool:
+    return enhanced_ai.grading_model is not None
+
+def learning_path_trained() -> bool:
+    return hasattr(enhanced_ai, 'optimal_paths')
+
+def behavioral_trained() -> bool:
+    return enhanced_ai.behavioral_model is not None
+
+def class_models_trained() -> bool:
+    return enhanced_ai.performance_model is not None
+
 def calculate_performance_metrics(scores: List[StudentScore]) -> Dict:
     """Calculate basic performance metrics"""
     if not scores:
@@ -245,8 +502,9 @@ def generate_recommendations(weaknesses: List[WeaknessAnalysis], risk_level: str
     
     return recommendations
 
-@app.post("/analyze-performance", response_model=PerformanceResponse)
-async def analyze_student_performance(request: PerformanceRequest):
+@app.post("/analyze-performance", response_model=PerformanceResponse,
+          openapi_extra=score_body_openapi(PerformanceRequest))
+async def analyze_student_performance(request: PerformanceRequest = Depends(score_payload(PerformanceRequest))):
     """Analyze student performance and provide insights with ML predictions"""
     try:
         # Calculate basic performance metrics
@@ -265,14 +523,7 @@ async def analyze_student_performance(request: PerformanceRequest):
         ml_predictions = None
         try:
             if enhanced_ai.load_models():
-                # Convert scores to format expected by ML models
-                ml_scores = []
-                for score in request.scores:
-                    ml_scores.append({
-                        'score': score.score,
-                        'topic': score.topic,
-                        'date': score.date
-                    })
+                ml_scores = to_ml_scores(request.scores)
                 
                 # Get ML predictions
                 predicted_performance = enhanced_ai.predict_student_performance(ml_scores)
@@ -302,160 +553,27 @@ async def analyze_student_performance(request: PerformanceRequest):
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 # Enhanced AI endpoints that use real ML models
-@app.post("/comprehensive-insights")
-async def get_comprehensive_insights(request: PerformanceRequest):
+@app.post("/comprehensive-insights", openapi_extra=score_body_openapi(PerformanceRequest))
+async def get_comprehensive_insights(request: PerformanceRequest = Depends(score_payload(PerformanceRequest))):
     """Get comprehensive AI insights using trained ML models"""
+    snapshot = snapshot_response("comprehensive_insights", request)
+    if snapshot is not None:
+        return snapshot
     try:
         # Convert scores to ML format
-        ml_scores = []
-        for score in request.scores:
-            ml_scores.append({
-                'score': score.score,
-                'topic': score.topic,
-                'assignmentType': score.assignment_type,
-                'date': score.date
-            })
-        
-        # Use trained models for predictions
-        insights = {}
-        
-        # 1. Performance Prediction
-        if enhanced_ai.performance_model:
-            predicted_performance = enhanced_ai.predict_performance(ml_scores)
-            confidence_score = min(95, max(60, predicted_performance + np.random.normal(0, 5)))
-        else:
-            predicted_performance = np.mean([s.score for s in request.scores])
-            confidence_score = 75
-        
-        # 2. Risk Assessment
-        if enhanced_ai.risk_model:
-            risk_prediction = enhanced_ai.predict_risk_level(ml_scores)
-            risk_levels = ["low", "medium", "high"]
-            predicted_risk = risk_levels[risk_prediction]
-        else:
-            avg_score = np.mean([s.score for s in request.scores])
-            predicted_risk = "high" if avg_score < 60 else "medium" if avg_score < 75 else "low"
-        
-        # 3. Content Recommendations
-        if enhanced_ai.content_recommendation_model:
-            recommendations = enhanced_ai.recommend_content(ml_scores)
-        else:
-            # Fallback recommendations based on performance
-            weak_topics = [s.topic for s in request.scores if s.score < 70]
-            recommendations = [
-                {"topic": topic, "reason": f"Strengthen {topic} fundamentals", "confidence": 0.8}
-                for topic in weak_topics[:3]
-            ]
-        
-        # 4. Learning Path Optimization
-        if enhanced_ai.learning_path_model:
-            learning_path = enhanced_ai.optimize_learning_path(ml_scores)
-        else:
-            # Generate personalized learning path
-            topics = list(set([s.topic for s in request.scores]))
-            learning_path = {
-                "optimized_path": [
-                    {"topic": topic, "type": "review", "estimated_time": "2 hours"}
-                    for topic in topics[:5]
-                ],
-                "path_length": len(topics),
-                "estimated_completion_time": f"{len(topics) * 2} hours"
-            }
-        
-        # 5. Behavioral Analysis
-        if enhanced_ai.behavioral_model:
-            behavior_analysis = enhanced_ai.analyze_behavior(ml_scores)
-        else:
-            # Analyze learning patterns
-            consistency = np.std([s.score for s in request.scores])
-            engagement = np.mean([s.score for s in request.scores]) / 100
-            behavior_analysis = {
-                "learning_style": "Visual" if np.random.random() > 0.5 else "Kinesthetic",
-                "consistency": max(0.3, min(0.9, 1 - consistency/100)),
-                "engagement": max(0.4, min(0.95, engagement)),
-                "improvement_rate": np.random.uniform(0.1, 0.3),
-                "recommendations": [
-                    "Practice regularly to improve consistency",
-                    "Try different learning methods",
-                    "Set specific goals for each topic"
-                ]
-            }
+        ml_scores = to_ml_scores(request.scores)
         
-        # Generate unique summary based on predictions
-        if predicted_performance > 85:
-            status = "Excellent"
-            trend = "Improving"
-            message = "Student shows exceptional performance with strong potential for continued growth."
-        elif predicted_performance > 70:
-            status = "Good"
-            trend = "Stable"
-            message = "Student demonstrates solid understanding with room for improvement in specific areas."
-        else:
-            status = "Needs Attention"
-            trend = "Declining"
-            message = "Student requires additional support and focused intervention strategies."
-        
-        comprehensive_insights = {
-            "student_id": request.student_id,
-            "comprehensive_insights": {
-                "performance": {
-                    "overall_performance": round(predicted_performance, 1),
-                    "confidence_score": round(confidence_score, 1),
-                    "weak_topics": [s.topic for s in request.scores if s.score < 70][:3],
-                    "strong_topics": [s.topic for s in request.scores if s.score > 85][:3]
-                },
-                "behavior": {
-                    "behavior_analysis": behavior_analysis
-                },
-                "content_recommendations": {
-                    "recommendations": recommendations[:5]
-                },
-                "learning_path": learning_path,
-                "predictions": {
-                    "next_performance": round(predicted_performance + np.random.uniform(-5, 10), 1),
-                    "completion_probability": round(np.random.uniform(0.6, 0.95), 2),
-                    "estimated_improvement": round(np.random.uniform(5, 15), 1)
-                },
-                "study_plan": {
-                    "learning_path": learning_path["optimized_path"][:3],
-                    "recommended_content": recommendations[:3],
-                    "study_schedule": {
-                        "frequency": "3-4 times per week",
-                        "session_duration": "45-60 minutes",
-                        "breaks": "15-minute breaks every 45 minutes"
-                    },
-                    "focus_areas": [
-                        {
-                            "topic": topic,
-                            "current_performance": round(np.mean([s.score for s in request.scores if s.topic == topic]), 1),
-                            "priority": "high" if np.mean([s.score for s in request.scores if s.topic == topic]) < 70 else "medium"
-                        }
-                        for topic in set([s.topic for s in request.scores])
-                    ][:5],
-                    "estimated_completion_time": learning_path["estimated_completion_time"]
-                },
-                "tutoring": {
-                    "needed": predicted_risk == "high",
-                    "recommended_sessions": 2 if predicted_risk == "high" else 1 if predicted_risk == "medium" else 0,
-                    "focus_topics": [s.topic for s in request.scores if s.score < 70][:3]
-                },
-                "adaptive_learning": {
-                    "difficulty_adjustment": "increase" if predicted_performance > 80 else "decrease" if predicted_performance < 60 else "maintain",
-                    "content_pacing": "accelerated" if predicted_performance > 85 else "standard" if predicted_performance > 70 else "remedial",
-                    "personalization_level": "high" if len(request.scores) > 10 else "medium"
-                },
-                "summary": {
-                    "overall_status": status,
-                    "learning_style": behavior_analysis["learning_style"],
-                    "risk_level": predicted_risk,
-                    "performance_trend": trend,
-                    "key_message": message
-                }
-            }
-        }
+        shadow_scorer.submit(ml_scores)
         
-        return comprehensive_insights
+        return FastJSONResponse(await admission_groups["insights"].run(
+            scheduler.call, INTERACTIVE, insights.comprehensive_insights, enhanced_ai, request.student_id, request.scores, ml_scores,
+            fallback=lambda: heuristic_response(insights.comprehensive_insights(
+                enhanced_ai, request.student_id, request.scores, ml_scores, NO_PREDICTIONS
+            ))
+        ))
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Comprehensive insights error: {e}")
         # Return fallback data
@@ -474,58 +592,27 @@ async def get_comprehensive_insights(request: PerformanceRequest):
             }
         }
 
-@app.post("/behavior-analysis")
-async def analyze_behavior_enhanced(request: BehavioralAnalysisRequest):
+@app.post("/behavior-analysis", openapi_extra=score_body_openapi(BehavioralAnalysisRequest))
+async def analyze_behavior_enhanced(request: BehavioralAnalysisRequest = Depends(score_payload(BehavioralAnalysisRequest))):
     """Analyze student behavior using ML models"""
+    snapshot = snapshot_response("behavior_analysis", request)
+    if snapshot is not None:
+        return snapshot
     try:
         # Convert scores to ML format
-        ml_scores = []
-        for score in request.scores:
-            ml_scores.append({
-                'score': score.score,
-                'topic': score.topic,
-                'assignmentType': score.assignment_type,
-                'date': score.date
-            })
+        ml_scores = to_ml_scores(request.scores)
         
-        # Use behavioral model for analysis
-        if enhanced_ai.behavioral_model:
-            behavior_analysis = enhanced_ai.analyze_behavior(ml_scores)
-        else:
-            # Generate personalized behavioral analysis
-            scores = [s.score for s in request.scores]
-            consistency = 1 - (np.std(scores) / 100)
-            engagement = np.mean(scores) / 100
-            improvement_rate = np.random.uniform(0.1, 0.4)
-            
-            # Determine learning style based on performance patterns
-            if np.std(scores) < 10:
-                learning_style = "Consistent"
-            elif np.mean(scores) > 80:
-                learning_style = "High Achiever"
-            elif np.mean(scores) < 60:
-                learning_style = "Needs Support"
-            else:
-                learning_style = "Balanced"
-            
-            behavior_analysis = {
-                "learning_style": learning_style,
-                "consistency": max(0.3, min(0.9, consistency)),
-                "engagement": max(0.4, min(0.95, engagement)),
-                "improvement_rate": improvement_rate,
-                "recommendations": [
-                    "Maintain consistent study schedule",
-                    "Focus on weak areas identified",
-                    "Practice active learning techniques",
-                    "Set specific, achievable goals"
-                ]
-            }
+        shadow_scorer.submit(ml_scores)
         
-        return {
-            "student_id": request.student_id,
-            "behavior_analysis": behavior_analysis
-        }
+        return await admission_groups["insights"].run(
+            scheduler.call, INTERACTIVE, insights.behavior_analysis, enhanced_ai, request.student_id, request.scores, ml_scores,
+            fallback=lambda: heuristic_response(insights.behavior_analysis(
+                enhanced_ai, request.student_id, request.scores, ml_scores, NO_PREDICTIONS
+            ))
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Behavior analysis error: {e}")
         return {
@@ -539,19 +626,12 @@ async def analyze_behavior_enhanced(request: BehavioralAnalysisRequest):
             }
         }
 
-@app.post("/content-recommendations")
-async def get_content_recommendations_enhanced(request: ContentRecommendationRequest):
+@app.post("/content-recommendations", openapi_extra=score_body_openapi(ContentRecommendationRequest))
+async def get_content_recommendations_enhanced(request: ContentRecommendationRequest = Depends(score_payload(ContentRecommendationRequest))):
     """Get personalized content recommendations using ML"""
     try:
         # Convert scores to ML format
-        ml_scores = []
-        for score in request.scores:
-            ml_scores.append({
-                'score': score.score,
-                'topic': score.topic,
-                'assignmentType': score.assignment_type,
-                'date': score.date
-            })
+        ml_scores = to_ml_scores(request.scores)
         
         # Use content recommendation model
         if enhanced_ai.content_recommendation_model:
@@ -597,64 +677,18 @@ async def get_content_recommendations_enhanced(request: ContentRecommendationReq
             "total_recommendations": 2
         }
 
-@app.post("/learning-path")
-async def optimize_learning_path_enhanced(request: LearningPathRequest):
+@app.post("/learning-path", openapi_extra=score_body_openapi(LearningPathRequest))
+async def optimize_learning_path_enhanced(request: LearningPathRequest = Depends(score_payload(LearningPathRequest))):
     """Optimize learning path using ML models"""
+    if request.target_topics is None:
+        snapshot = snapshot_response("learning_path", request)
+        if snapshot is not None:
+            return snapshot
     try:
         # Convert scores to ML format
-        ml_scores = []
-        for score in request.scores:
-            ml_scores.append({
-                'score': score.score,
-                'topic': score.topic,
-                'assignmentType': score.assignment_type,
-                'date': score.date
-            })
-        
-        # Use learning path model
-        if enhanced_ai.learning_path_model:
-            optimized_path = enhanced_ai.optimize_learning_path(ml_scores, request.target_topics)
-        else:
-            # Generate personalized learning path
-            weak_topics = [s.topic for s in request.scores if s.score < 70]
-            strong_topics = [s.topic for s in request.scores if s.score > 85]
-            
-            path_steps = []
-            
-            # Start with weak topics
-            for topic in weak_topics[:3]:
-                path_steps.append({
-                    "topic": topic,
-                    "type": "review",
-                    "estimated_time": "2-3 hours"
-                })
-            
-            # Add practice sessions
-            for topic in weak_topics[:2]:
-                path_steps.append({
-                    "topic": f"{topic} Practice",
-                    "type": "practice",
-                    "estimated_time": "1-2 hours"
-                })
-            
-            # Add advanced topics based on strong areas
-            for topic in strong_topics[:2]:
-                path_steps.append({
-                    "topic": f"Advanced {topic}",
-                    "type": "advanced",
-                    "estimated_time": "3-4 hours"
-                })
-            
-            optimized_path = {
-                "optimized_path": path_steps,
-                "path_length": len(path_steps),
-                "estimated_completion_time": f"{len(path_steps) * 2} hours"
-            }
+        ml_scores = to_ml_scores(request.scores)
         
-        return {
-            "student_id": request.student_id,
-            **optimized_path
-        }
+        return insights.learning_path(enhanced_ai, request.student_id, request.scores, ml_scores, request.target_topics)
         
     except Exception as e:
         print(f"Learning path error: {e}")
@@ -668,19 +702,12 @@ async def optimize_learning_path_enhanced(request: LearningPathRequest):
             "estimated_completion_time": "3 hours"
         }
 
-@app.post("/study-plan")
-async def get_study_plan_enhanced(request: PerformanceRequest):
+@app.post("/study-plan", openapi_extra=score_body_openapi(PerformanceRequest))
+async def get_study_plan_enhanced(request: PerformanceRequest = Depends(score_payload(PerformanceRequest))):
     """Generate personalized study plan using ML insights"""
     try:
         # Convert scores to ML format
-        ml_scores = []
-        for score in request.scores:
-            ml_scores.append({
-                'score': score.score,
-                'topic': score.topic,
-                'assignmentType': score.assignment_type,
-                'date': score.date
-            })
+        ml_scores = to_ml_scores(request.scores)
         
         # Analyze performance patterns
         avg_score = np.mean([s.score for s in request.scores])
@@ -739,16 +766,19 @@ async def get_study_plan_enhanced(request: PerformanceRequest):
             }
         }
 
+def ensure_grading_model():
+    """Train grading model if needed (run through ensure_trained)"""
+    if not grading_trained():
+        training_data = load_training_data()
+        if training_data:
+            enhanced_ai.train_grading_model(training_data)
+            save_trained_models()
+
 @app.post("/auto-grade")
 async def auto_grade_assignment(request: GradingRequest):
     """Automated grading system"""
     try:
-        # Train grading model if needed
-        if enhanced_ai.grading_model is None:
-            training_data = load_training_data()
-            if training_data:
-                enhanced_ai.train_grading_model(training_data)
-                enhanced_ai.save_models(models_path)
+        await ensure_trained(grading_trained, ensure_grading_model)
         
         # Prepare assignment data
         assignment_data = {
@@ -772,30 +802,128 @@ async def auto_grade_assignment(request: GradingRequest):
             "grade_percentage": grade_percentage,
             "grade_letter": "A" if grade_percentage >= 90 else "B" if grade_percentage >= 80 else "C" if grade_percentage >= 70 else "D" if grade_percentage >= 60 else "F"
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Auto-grading failed: {str(e)}")
+
+@app.post("/auto-grade/batch")
+async def auto_grade_assignments(request: GradingBatchRequest):
+    """Grade every submission of an assignment with a single model evaluation"""
+    if len(request.submissions) > MAX_GRADING_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_GRADING_BATCH_SIZE} submissions per batch")
+    try:
+        await ensure_trained(grading_trained, ensure_grading_model)
+        
+        submissions = request.submissions
+        max_scores = np.array([s.max_score for s in submissions], dtype=np.float64)
+        predicted = enhanced_ai.auto_grade_batch(
+            [s.topic for s in submissions], [s.assignment_type for s in submissions], max_scores
+        )
+        if predicted is None:
+            predicted = np.zeros(len(submissions))
+        
+        grades = np.round(predicted, 2)
+        percentages = np.round(
+            np.divide(grades, max_scores, out=np.zeros_like(grades), where=grades != 0) * 100, 2
+        )
+        letters = GRADE_LETTERS[np.searchsorted(GRADE_THRESHOLDS, percentages, side="right")]
+        
+        results = [
+            {
+                "student_id": submission.student_id,
+                "topic": submission.topic,
+                "assignment_type": submission.assignment_type,
+                "max_score": submission.max_score,
+                "predicted_grade": grade,
+                "grade_percentage": percentage,
+                "grade_letter": letter
+            }
+            for submission, grade, percentage, letter in zip(
+                submissions, grades.tolist(), percentages.tolist(), letters.tolist()
+            )
+        ]
+        return FastJSONResponse({"results": results, "total": len(results)})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Auto-grading failed: {str(e)}")
 
-@app.post("/optimize-learning-path")
-async def optimize_learning_path(request: LearningPathRequest):
+# Per-student endpoints that /batch can dispatch to: path -> (request model, handler)
+BATCH_ENDPOINTS = {
+    "/comprehensive-insights": (PerformanceRequest, get_comprehensive_insights),
+    "/behavior-analysis": (BehavioralAnalysisRequest, analyze_behavior_enhanced),
+    "/content-recommendations": (ContentRecommendationRequest, get_content_recommendations_enhanced),
+    "/learning-path": (LearningPathRequest, optimize_learning_path_enhanced),
+    "/study-plan": (PerformanceRequest, get_study_plan_enhanced),
+    "/auto-grade": (GradingRequest, auto_grade_assignment)
+}
+
+async def run_batch_item(item: BatchItem):
+    """Run one batched call; failures become a status/body pair instead of failing the batch"""
+    target = BATCH_ENDPOINTS.get(item.endpoint)
+    if target is None:
+        return 404, {"detail": f"Endpoint {item.endpoint} cannot be batched"}
+    model, handler = target
+    try:
+        result = await handler(model_from_payload(model, item.body))
+    except RequestValidationError as e:
+        return 422, {"detail": jsonable_encoder(e.errors())}
+    except HTTPException as e:
+        return e.status_code, {"detail": e.detail}
+    if isinstance(result, Response):
+        return result.status_code, json.loads(result.body)
+    return 200, result
+
+async def traced_batch_item(item: BatchItem, parent_id: Optional[str]) -> Dict:
+    """run_batch_item under the caller's request ID; its spans come back as server_timing"""
+    with item_trace(item.request_id, item.endpoint, trace_writer, parent_id) as (trace, status_holder):
+        start = time.perf_counter()
+        status, body = await run_batch_item(item)
+        duration_ms = (time.perf_counter() - start) * 1000
+        status_holder[0] = status
+    return {
+        "status": status,
+        "body": body,
+        "duration_ms": round(duration_ms, 3),
+        "request_id": trace.request_id,
+        "server_timing": server_timing_header(trace.spans, duration_ms)
+    }
+
+@app.post("/batch")
+async def run_batch(request: BatchRequest):
+    """Run several per-student calls in one request; responses keep the request order"""
+    if len(request.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} calls per batch")
+    
+    batch_trace = current_trace()
+    parent_id = batch_trace.request_id if batch_trace else None
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def run_item(item):
+        async with slots:
+            return await traced_batch_item(item, parent_id)
+    
+    responses = await asyncio.gather(*map(run_item, request.requests))
+    return FastJSONResponse({"responses": responses})
+
+def ensure_learning_path_model():
+    """Train learning path model if needed (run through ensure_trained)"""
+    if not learning_path_trained():
+        training_data = load_training_data()
+        if training_data:
+            enhanced_ai.train_learning_path_model(training_data)
+            save_trained_models()
+
+@app.post("/optimize-learning-path", openapi_extra=score_body_openapi(LearningPathRequest))
+async def optimize_learning_path(request: LearningPathRequest = Depends(score_payload(LearningPathRequest))):
     """Optimize learning path for student"""
     try:
         # Convert to internal format
-        scores = []
-        for score in request.scores:
-            scores.append({
-                'topic': score.topic,
-                'score': score.score,
-                'maxScore': score.max_score,
-                'date': score.date,
-                'assignmentType': score.assignment_type
-            })
+        scores = to_ml_scores(request.scores)
         
         # Train learning path model if needed
-        if not hasattr(enhanced_ai, 'optimal_paths'):
-            training_data = load_training_data()
-            if training_data:
-                enhanced_ai.train_learning_path_model(training_data)
-                enhanced_ai.save_models(models_path)
+        await ensure_trained(learning_path_trained, ensure_learning_path_model)
         
         # Get optimized path
         optimized_path = enhanced_ai.optimize_learning_path(scores, request.target_topics)
@@ -806,30 +934,28 @@ async def optimize_learning_path(request: LearningPathRequest):
             "path_length": len(optimized_path),
             "estimated_completion_time": calculate_completion_time(optimized_path)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Learning path optimization failed: {str(e)}")
 
-@app.post("/analyze-behavior")
-async def analyze_behavior(request: BehavioralAnalysisRequest):
+def ensure_behavioral_model():
+    """Train behavioral model if needed (run through ensure_trained)"""
+    if not behavioral_trained():
+        training_data = load_training_data()
+        if training_data:
+            enhanced_ai.train_behavioral_model(training_data)
+            save_trained_models()
+
+@app.post("/analyze-behavior", openapi_extra=score_body_openapi(BehavioralAnalysisRequest))
+async def analyze_behavior(request: BehavioralAnalysisRequest = Depends(score_payload(BehavioralAnalysisRequest))):
     """Analyze student learning behavior"""
     try:
         # Convert to internal format
-        scores = []
-        for score in request.scores:
-            scores.append({
-                'topic': score.topic,
-                'score': score.score,
-                'maxScore': score.max_score,
-                'date': score.date,
-                'assignmentType': score.assignment_type
-            })
+        scores = to_ml_scores(request.scores)
         
         # Train behavioral model if needed
-        if enhanced_ai.behavioral_model is None:
-            training_data = load_training_data()
-            if training_data:
-                enhanced_ai.train_behavioral_model(training_data)
-                enhanced_ai.save_models(models_path)
+        await ensure_trained(behavioral_trained, ensure_behavioral_model)
         
         # Analyze behavior
         behavior = enhanced_ai.analyze_behavior(scores)
@@ -841,154 +967,235 @@ async def analyze_behavior(request: BehavioralAnalysisRequest):
             }
         else:
             raise HTTPException(status_code=400, detail="Insufficient data for behavioral analysis")
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Behavioral analysis failed: {str(e)}")
 
+def bulk_slot(heuristic=False):
+    """A bulk worker slot for one chunk of a class analysis; heuristic answers run inline without one"""
+    return nullcontext() if heuristic else scheduler.slot(BULK)
+
+def stream_class_analysis(student_scores, chunk_size=CLASS_STREAM_CHUNK_SIZE, heuristic=False):
+    """Yield NDJSON lines, one per student, then a class statistics trailer"""
+    class_statistics = new_class_statistics()
+    total_performance = 0
+    analyzed = 0
+    
+    for chunk_start in range(0, len(student_scores), chunk_size):
+        lines = []
+        with bulk_slot(heuristic):
+            for student_data in student_scores[chunk_start:chunk_start + chunk_size]:
+                try:
+                    student_analysis = analyze_class_student(enhanced_ai, student_data, heuristic)
+                except Exception as e:
+                    lines.append(fast_json.dumps({
+                        "type": "error",
+                        "student_id": student_data.get("student_id"),
+                        "detail": str(e)
+                    }))
+                    continue
+                add_to_class_statistics(class_statistics, student_analysis)
+                total_performance += student_analysis["overall_performance"]
+                analyzed += 1
+                lines.append(fast_json.dumps({"type": "student", **student_analysis}))
+        # One write per chunk keeps the number of socket sends low
+        yield b"\n".join(lines) + b"\n"
+    
+    if analyzed > 0:
+        class_statistics["average_performance"] = total_performance / analyzed
+    trailer = {
+        "type": "class_statistics",
+        "total_students": len(student_scores),
+        "analyzed_students": analyzed,
+        "class_statistics": class_statistics
+    }
+    yield fast_json.dumps(heuristic_response(trailer) if heuristic else trailer) + b"\n"
+
+def class_analysis_result(student_scores, heuristic=False, chunk_size=CLASS_STREAM_CHUNK_SIZE):
+    """Body of /analyze-class-performance; heuristic rates risk without the model"""
+    class_analysis = {
+        "total_students": len(student_scores),
+        "student_analyses": [],
+        "class_statistics": new_class_statistics()
+    }
+    
+    total_performance = 0
+    
+    for chunk_start in range(0, len(student_scores), chunk_size):
+        with bulk_slot(heuristic):
+            for student_data in student_scores[chunk_start:chunk_start + chunk_size]:
+                student_analysis = analyze_class_student(enhanced_ai, student_data, heuristic)
+                total_performance += student_analysis["overall_performance"]
+                add_to_class_statistics(class_analysis["class_statistics"], student_analysis)
+                class_analysis["student_analyses"].append(student_analysis)
+    
+    # Calculate class average
+    if len(student_scores) > 0:
+        class_analysis["class_statistics"]["average_performance"] = total_performance / len(student_scores)
+    
+    return heuristic_response(class_analysis) if heuristic else class_analysis
+
+def ensure_class_models():
+    """Train the performance and risk models if needed (run through ensure_trained)"""
+    if not class_models_trained():
+        training_data = load_training_data()
+        if training_data:
+            enhanced_ai.train_performance_model(training_data)
+            enhanced_ai.train_risk_classification_model(training_data)
+            save_trained_models()
+
 @app.post("/analyze-class-performance")
-async def analyze_class_performance(student_scores: List[Dict[str, Any]]):
+async def analyze_class_performance(student_scores: List[Dict[str, Any]], stream: bool = False,
+                                    accept: Optional[str] = Header(None)):
     """Analyze performance for entire class"""
     try:
         # Train models if needed
-        if enhanced_ai.performance_model is None:
-            training_data = load_training_data()
-            if training_data:
-                enhanced_ai.train_performance_model(training_data)
-                enhanced_ai.train_risk_classification_model(training_data)
-                enhanced_ai.save_models(models_path)
-        
-        class_analysis = {
-            "total_students": len(student_scores),
-            "student_analyses": [],
-            "class_statistics": {
-                "average_performance": 0,
-                "performance_distribution": {"excellent": 0, "good": 0, "average": 0, "struggling": 0},
-                "risk_distribution": {"low": 0, "medium": 0, "high": 0}
-            }
-        }
+        await ensure_trained(class_models_trained, ensure_class_models)
         
-        total_performance = 0
-        
-        for student_data in student_scores:
-            student_id = student_data["student_id"]
-            scores = student_data["scores"]
-            
-            # Analyze individual student
-            avg_performance = np.mean([s['score'] for s in scores])
-            total_performance += avg_performance
-            
-            performance_level = get_performance_level(avg_performance)
-            risk_level = enhanced_ai.predict_risk_level(scores) if enhanced_ai.risk_model else "unknown"
-            
-            # Update distributions
-            class_analysis["class_statistics"]["performance_distribution"][performance_level] += 1
-            if risk_level != "unknown":
-                class_analysis["class_statistics"]["risk_distribution"][risk_level] += 1
-            
-            student_analysis = {
-                "student_id": student_id,
-                "overall_performance": avg_performance,
-                "performance_level": performance_level,
-                "risk_level": risk_level,
-                "weak_topics": get_weak_topics(scores),
-                "strong_topics": get_strong_topics(scores)
-            }
-            
-            class_analysis["student_analyses"].append(student_analysis)
-        
-        # Calculate class average
-        if len(student_scores) > 0:
-            class_analysis["class_statistics"]["average_performance"] = total_performance / len(student_scores)
+        group = admission_groups["class_analysis"]
+        if stream or (accept and NDJSON_MEDIA_TYPE in accept):
+            if group.use_heuristic():
+                body = stream_class_analysis(student_scores, heuristic=True)
+            else:
+                # Shed before the response starts; the slot is held while the body is written
+                group.admit()
+                body = group.stream(stream_class_analysis(student_scores))
+            return StreamingResponse(body, media_type=NDJSON_MEDIA_TYPE)
         
-        return class_analysis
+        return FastJSONResponse(await group.run(
+            class_analysis_result, student_scores,
+            fallback=lambda: class_analysis_result(student_scores, heuristic=True)
+        ))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Class analysis failed: {str(e)}")
 
+@app.get("/students/{student_id}/performance", response_model=PerformanceResponse)
+async def analyze_stored_student_performance(student_id: str):
+    """Analyze a student's performance from the local score store"""
+    score_store.ensure_current()
+    rows = score_store.student_rows(student_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Student scores not found")
+    request = PerformanceRequest.model_construct(student_id=student_id, scores=list(map(ScoreRow._make, rows)))
+    return await analyze_student_performance(request)
+
+@app.get("/classes/{class_id}/performance")
+async def analyze_stored_class_performance(class_id: str, stream: bool = False,
+                                           accept: Optional[str] = Header(None)):
+    """Analyze a whole class from the local score store"""
+    score_store.ensure_current()
+    student_scores = score_store.class_students([class_id])
+    if not student_scores:
+        raise HTTPException(status_code=404, detail=f"No data found for classId: {class_id}")
+    return await analyze_class_performance(student_scores, stream=stream, accept=accept)
+
+@app.post("/jobs/cohort-analysis", status_code=202)
+def create_cohort_analysis_job(request: CohortAnalysisRequest):
+    """Start a background analysis of whole classes or a data file"""
+    if not request.class_ids and not request.data_file:
+        raise HTTPException(status_code=400, detail="Provide class_ids or data_file")
+    if request.page_size is not None and request.page_size < 1:
+        raise HTTPException(status_code=400, detail="page_size must be at least 1")
+    try:
+        if request.data_file:
+            students = cohort_jobs.load_students(request.class_ids, request.data_file)
+        else:
+            score_store.ensure_current()
+            students = score_store.class_students(request.class_ids)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Data file not found")
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cohort data: {str(e)}")
+    if not students:
+        raise HTTPException(status_code=404, detail="No students found for the given classes")
+    
+    return cohort_jobs.submit(
+        students,
+        class_ids=request.class_ids,
+        data_file=request.data_file,
+        page_size=request.page_size,
+        model_version=current_model_version,
+        legacy_path=None if current_model_version else models_path
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_cohort_analysis_job(job_id: str):
+    """Job state, progress and (once finished) the cohort summary"""
+    job = cohort_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/results")
+async def get_cohort_analysis_results(job_id: str, page: int = 0):
+    """One page of analyzed students, served straight from disk"""
+    job = cohort_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if page < 0 or page >= job["pages"]:
+        raise HTTPException(status_code=404, detail=f"Page must be between 0 and {job['pages'] - 1}")
+    content = cohort_jobs.page(job_id, page)
+    if content is None:
+        raise HTTPException(status_code=409, detail="Page is not ready yet")
+    return Response(content=content, media_type="application/json",
+                    headers={"X-Total-Pages": str(job["pages"])})
+
 @app.post("/generate-quiz")
 async def generate_quiz(request: QuizGenerationRequest):
     """Generate AI-powered quiz based on weak subjects"""
     try:
-        weak_subjects = request.weak_subjects
-        quiz_type = request.quiz_type
-        course_title = request.course_title
-        difficulty_level = request.difficulty_level
-        
-        # Generate quiz questions based on weak subjects
-        questions = []
-        max_score = 0
-        
-        for subject in weak_subjects:
-            # Generate 2-3 questions per weak subject
-            num_questions = random.randint(2, 3)
-            
-            for i in range(num_questions):
-                question_data = {
-                    "question": f"Question {i+1} about {subject}: What is the main concept in {subject}?",
-                    "type": quiz_type.lower(),
-                    "options": [
-                        f"Option A for {subject}",
-                        f"Option B for {subject}", 
-                        f"Option C for {subject}",
-                        f"Option D for {subject}"
-                    ],
-                    "correct_answer": random.randint(0, 3),
-                    "points": 10,
-                    "subject": subject
-                }
-                questions.append(question_data)
-                max_score += 10
-        
-        # Add some general course questions
-        general_questions = [
-            {
-                "question": f"General question about {course_title}: What is the primary focus of this course?",
-                "type": quiz_type.lower(),
-                "options": [
-                    "Understanding basic concepts",
-                    "Advanced problem solving", 
-                    "Practical applications",
-                    "Theoretical foundations"
-                ],
-                "correct_answer": random.randint(0, 3),
-                "points": 15,
-                "subject": "General"
-            },
-            {
-                "question": f"Another question about {course_title}: Which approach is most effective for learning this subject?",
-                "type": quiz_type.lower(),
-                "options": [
-                    "Memorization only",
-                    "Practice and application",
-                    "Reading textbooks only",
-                    "Avoiding difficult topics"
-                ],
-                "correct_answer": 1,
-                "points": 15,
-                "subject": "General"
-            }
-        ]
-        
-        questions.extend(general_questions)
-        max_score += 30
-        
-        return {
-            "quiz_id": f"quiz_{int(time.time())}",
-            "title": f"AI-Generated Quiz: {', '.join(weak_subjects)}",
-            "description": f"Personalized quiz based on weak subjects: {', '.join(weak_subjects)}",
-            "questions": {
-                "questions": questions,
-                "total_questions": len(questions),
-                "time_limit": 30,  # 30 minutes
-                "difficulty": difficulty_level
-            },
-            "max_score": max_score,
-            "weak_subjects": weak_subjects,
-            "course_title": course_title,
-            "generated_at": datetime.now().isoformat()
-        }
+        rng = random.Random(request.seed)
+        return build_quiz(question_bank, request.weak_subjects, request.quiz_type,
+                          request.course_title, request.difficulty_level, rng)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Quiz generation failed: {str(e)}")
 
+@app.post("/generate-quiz/class")
+async def generate_class_quizzes(request: ClassQuizRequest):
+    """Personalized quizzes for every student of a class in one call"""
+    if request.students is None and not request.class_id:
+        raise HTTPException(status_code=400, detail="Provide class_id or students")
+    
+    subject_averages = {}
+    if request.students is not None:
+        students = request.students
+    else:
+        score_store.ensure_current()
+        students = []
+        for student in score_store.class_students([request.class_id]):
+            topic_scores = {}
+            for score in student["scores"]:
+                topic_scores.setdefault(score['topic'], []).append(score['score'])
+            averages = {topic: float(np.mean(values)) for topic, values in topic_scores.items()}
+            subject_averages[student["student_id"]] = averages
+            students.append(ClassQuizStudent(
+                student_id=student["student_id"],
+                weak_subjects=get_weak_topics(student["scores"]) or [min(averages, key=averages.get)]
+            ))
+        if not students:
+            raise HTTPException(status_code=404, detail=f"No data found for classId: {request.class_id}")
+    
+    # Without a seed the set is still reproducible from the seed in the response
+    seed = request.seed if request.seed is not None else random.SystemRandom().randrange(2 ** 32)
+    quizzes = []
+    for student in students:
+        rng = random.Random(f"{seed}:{student.student_id}")
+        quiz = build_quiz(question_bank, student.weak_subjects, request.quiz_type, request.course_title,
+                          request.difficulty_level, rng, subject_averages.get(student.student_id),
+                          student.seen_question_ids)
+        quizzes.append({"student_id": student.student_id, **quiz})
+    
+    return FastJSONResponse({
+        "class_id": request.class_id,
+        "seed": seed,
+        "quizzes": quizzes,
+        "total_quizzes": len(quizzes)
+    })
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -996,6 +1203,7 @@ async def health_check():
         "status": "healthy",
         "service": "LMS AI Performance Analysis",
         "version": "2.0",
+        "model_version": current_model_version,
         "models_loaded": {
             "performance_model": enhanced_ai.performance_model is not None,
             "risk_model": enhanced_ai.risk_model is not None,
@@ -1003,9 +1211,91 @@ async def health_check():
             "behavioral_model": enhanced_ai.behavioral_model is not None,
             "content_recommendation": hasattr(enhanced_ai, 'topic_similarities'),
             "learning_path": hasattr(enhanced_ai, 'optimal_paths')
-        }
+        },
+        "insight_snapshot": insight_snapshot.stats(),
+        "admission": {name: group.stats() for name, group in admission_groups.items()},
+        "scheduler": scheduler.stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus-format service metrics"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/models")
+async def list_model_versions():
+    """List published model versions and shadow-scoring statistics"""
+    return {
+        "current_version": current_model_version,
+        "candidate_version": model_store.candidate_version(),
+        "versions": model_store.list_versions(),
+        "shadow": shadow_scorer.stats()
     }
 
+@app.post("/models/candidate")
+async def set_candidate_model(request: ModelVersionRequest):
+    """Start (or stop, with no version) shadow scoring against a candidate version"""
+    try:
+        model_store.set_candidate(request.version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    configure_shadow_scoring()
+    return {"candidate_version": model_store.candidate_version(), "shadow": shadow_scorer.stats()}
+
+@app.post("/models/promote")
+async def promote_model(request: ModelVersionRequest):
+    """Promote a published version (the candidate by default) to serve live traffic"""
+    global enhanced_ai, current_model_version, model_identity
+    version = request.version or model_store.candidate_version()
+    if not version:
+        raise HTTPException(status_code=400, detail="No model version given and no candidate set")
+    try:
+        promoted_ai = model_store.load(version)
+        model_store.promote(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    enhanced_ai = promoted_ai
+    current_model_version = version
+    model_identity = version
+    configure_shadow_scoring()
+    return {"current_version": current_model_version, "candidate_version": model_store.candidate_version()}
+
+def require_admin_token(token: Optional[str]):
+    if not request_profiler.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled until AI_ADMIN_TOKEN is set")
+    if not request_profiler.token_valid(token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/profiler")
+async def get_profiler_status(x_admin_token: Optional[str] = Header(None)):
+    """Profiler configuration and buffer usage"""
+    require_admin_token(x_admin_token)
+    return request_profiler.status()
+
+@app.post("/admin/profiler")
+async def configure_profiler(request: ProfilerConfigRequest, x_admin_token: Optional[str] = Header(None)):
+    """Switch the request profiler on/off and tune its sampling"""
+    require_admin_token(x_admin_token)
+    if request.reset:
+        request_profiler.reset()
+    request_profiler.configure(
+        enabled=request.enabled,
+        sample_rate=request.sample_rate,
+        interval_ms=request.interval_ms,
+        max_stacks=request.max_stacks
+    )
+    return request_profiler.status()
+
+@app.get("/admin/profiler/stacks", response_class=PlainTextResponse)
+async def download_profiler_stacks(x_admin_token: Optional[str] = Header(None)):
+    """Download aggregated samples as collapsed stacks (flamegraph.pl / speedscope input)"""
+    require_admin_token(x_admin_token)
+    return PlainTextResponse(
+        request_profiler.collapsed(),
+        headers={"Content-Disposition": "attachment; filename=profile.collapsed"}
+    )
+
 # Helper functions
 def load_training_data():
     """Load training data from file"""
@@ -1015,49 +1305,6 @@ def load_training_data():
     except FileNotFoundError:
         return None
 
-def get_performance_level(avg_score):
-    """Get performance level based on average score"""
-    if avg_score >= 90:
-        return "excellent"
-    elif avg_score >= 75:
-        return "good"
-    elif avg_score >= 60:
-        return "average"
-    else:
-        return "struggling"
-
-def get_weak_topics(scores):
-    """Get weak topics (average < 70)"""
-    topic_scores = {}
-    for score in scores:
-        topic = score['topic']
-        if topic not in topic_scores:
-            topic_scores[topic] = []
-        topic_scores[topic].append(score['score'])
-    
-    weak_topics = []
-    for topic, scores_list in topic_scores.items():
-        if np.mean(scores_list) < 70:
-            weak_topics.append(topic)
-    
-    return weak_topics
-
-def get_strong_topics(scores):
-    """Get strong topics (average >= 80)"""
-    topic_scores = {}
-    for score in scores:
-        topic = score['topic']
-        if topic not in topic_scores:
-            topic_scores[topic] = []
-        topic_scores[topic].append(score['score'])
-    
-    strong_topics = []
-    for topic, scores_list in topic_scores.items():
-        if np.mean(scores_list) >= 80:
-            strong_topics.append(topic)
-    
-    return strong_topics
-
 def analyze_trends(scores):
     """Analyze performance trends"""
     if len(scores) < 3:
@@ -1100,7 +1347,7 @@ def calculate_confidence(scores):
     confidence = min(95, 50 + (data_points * 2) + (consistency * 20))
     return round(confidence)
 
-def generate_suggestions(scores):
+def generate_score_suggestions(scores):
     """Generate improvement suggestions"""
     suggestions = []
     
@@ -0,0 +1,370 @@
+"""
+Prometheus-format metrics for the LMS AI service.
+
+Counters and histograms are sharded per thread: each thread only ever
+updates its own shard, so recording a sample takes no lock and never
+contends with other threads. Shards are summed when ``/metrics`` is scraped.
+Gauges are callables evaluated at scrape time, so they cost nothing on the
+request path.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from starlette.routing import Match
+
+from tracing import record_span
+
+# Latency buckets in seconds (Prometheus client defaults, plus sub-millisecond buckets for inference)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INFERENCE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+TREE_BUCKETS = (1, 5, 10, 20, 30, 40, 50, 60, 80, 100, 200, 500)
+
+MODEL_FAMILIES = ("performance", "risk", "grading", "behavioral", "recommendation", "learning_path")
+VOTING_MODELS = ("risk", "behavioral")
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _ShardedMetric:
+    """Base for metrics whose samples are kept in per-thread shards"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._local = threading.local()
+        self._shards = []
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            # list.append is atomic under the GIL
+            self._shards.append(shard)
+        return shard
+
+    def _merged(self):
+        raise NotImplementedError
+
+
+class Counter(_ShardedMetric):
+    type_name = "counter"
+
+    def inc(self, *label_values, amount=1):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def _merged(self):
+        merged = {}
+        for shard in list(self._shards):
+            for labels, value in list(shard.items()):
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+    def value(self, *label_values):
+        return self._merged().get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._merged().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_ShardedMetric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def _series(self, label_values):
+        shard = self._shard()
+        series = shard.get(label_values)
+        if series is None:
+            # [bucket counts..., +Inf count, sum]
+            series = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        return series
+
+    def declare(self, *label_values):
+        """Export an empty series for a label set before its first observation"""
+        self._series(label_values)
+
+    def observe(self, value, *label_values, count=1):
+        """Record value (count times, for a batch of identical samples)"""
+        series = self._series(label_values)
+        series[bisect_left(self.buckets, value)] += count
+        series[-1] += value * count
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def _merged(self):
+        merged = {}
+        for shard in list(self._shards):
+            for labels, series in list(shard.items()):
+                total = merged.get(labels)
+                if total is None:
+                    merged[labels] = list(series)
+                else:
+                    for i, value in enumerate(series):
+                        total[i] += value
+        return merged
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names, labels, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+class Gauge:
+    """Gauge whose samples come from a callable evaluated at scrape time.
+
+    The callable returns either a number or a dict of label tuples to numbers.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name, help_text, func, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.func = func
+        self.label_names = tuple(label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.func()
+        except Exception:
+            return lines
+        if value is None:
+            return lines
+        samples = value if isinstance(value, dict) else {(): value}
+        for labels, sample in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(sample)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._metrics.get(name) or self.register(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=REQUEST_BUCKETS):
+        return self._metrics.get(name) or self.register(Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name, help_text, func, label_names=()):
+        return self.register(Gauge(name, help_text, func, label_names))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "lms_ai_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+REQUESTS_TOTAL = registry.counter(
+    "lms_ai_requests_total", "HTTP requests by route and status code", ("method", "route", "status"))
+INFERENCE_LATENCY = registry.histogram(
+    "lms_ai_inference_duration_seconds", "Model inference time by model family", ("model",), INFERENCE_BUCKETS)
+CACHE_REQUESTS = registry.counter(
+    "lms_ai_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result"))
+TREES_EVALUATED = registry.histogram(
+    "lms_ai_forest_trees_evaluated", "Trees walked per single-row forest classification by model", ("model",), TREE_BUCKETS)
+
+# Background shadow scoring (model_store.ShadowScorer) records here instead of the live series
+SHADOW_INFERENCE_LATENCY = registry.histogram(
+    "lms_ai_shadow_inference_duration_seconds", "Shadow-scoring model inference time by model family", ("model",),
+    INFERENCE_BUCKETS)
+SHADOW_TREES_EVALUATED = registry.histogram(
+    "lms_ai_shadow_forest_trees_evaluated", "Trees walked per shadow-scoring forest classification by model",
+    ("model",), TREE_BUCKETS)
+
+for model_family in MODEL_FAMILIES:
+    INFERENCE_LATENCY.declare(model_family)
+for model_family in VOTING_MODELS:
+    TREES_EVALUATED.declare(model_family)
+
+_inflight = {}
+
+
+_shadow = threading.local()
+
+
+@contextmanager
+def shadow_inference():
+    """Record inference metrics taken in this thread under the shadow series while inside"""
+    _shadow.active = True
+    try:
+        yield
+    finally:
+        _shadow.active = False
+
+
+def _in_shadow():
+    return getattr(_shadow, "active", False)
+
+
+def timed_inference(model_family):
+    """Decorator recording a method's run time under a model family (and as a trace span)"""
+    span_name = f"{model_family}_predict"
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                (SHADOW_INFERENCE_LATENCY if _in_shadow() else INFERENCE_LATENCY).observe(end - start, model_family)
+                record_span(span_name, start, end)
+        return wrapper
+    return decorator
+
+
+def record_cache(cache_name, hit, count=1):
+    CACHE_REQUESTS.inc(cache_name, "hit" if hit else "miss", amount=count)
+
+
+def record_trees_evaluated(model_family, trees, rows=1):
+    """Trees walked per predicted row; rows counts a batch where every row walked all trees"""
+    (SHADOW_TREES_EVALUATED if _in_shadow() else TREES_EVALUATED).observe(trees, model_family, count=rows)
+
+
+def cache_hit_ratios():
+    totals = {}
+    for (cache_name, result), value in CACHE_REQUESTS._merged().items():
+        hits, lookups = totals.get(cache_name, (0, 0))
+        totals[cache_name] = (hits + (value if result == "hit" else 0), lookups + value)
+    return {(cache_name,): hits / lookups for cache_name, (hits, lookups) in totals.items() if lookups}
+
+
+def process_resident_memory():
+    """Resident set size in bytes (falls back to peak RSS off Linux)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def process_cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+registry.gauge("lms_ai_cache_hit_ratio", "Cache hit ratio since start by cache", cache_hit_ratios, ("cache",))
+registry.gauge("lms_ai_inflight_requests", "Requests currently being handled by route",
+               lambda: {(route,): count for route, count in _inflight.items()}, ("route",))
+registry.gauge("process_resident_memory_bytes", "Resident memory size in bytes", process_resident_memory)
+registry.gauge("process_cpu_seconds_total", "Total user and system CPU time in seconds", process_cpu_seconds)
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware recording per-route latency and status codes"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+        self._templated = None
+
+    def _route_label(self, scope):
+        """The matched route's path template (e.g. /jobs/{job_id}), or "other" """
+        if self._routes is None:
+            router = getattr(scope.get("app"), "router", None)
+            routes = [route for route in getattr(router, "routes", []) if hasattr(route, "path")]
+            self._routes = {route.path for route in routes if "{" not in route.path}
+            self._templated = [route for route in routes if "{" in route.path]
+        path = scope.get("path", "")
+        if path in self._routes:
+            return path
+        for route in self._templated:
+            if route.matches(scope)[0] != Match.NONE:
+                return route.path
+        return "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route_label(scope)
+        method = scope.get("method", "GET")
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        _inflight[route] = _inflight.get(route, 0) + 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method, route)
+            REQUESTS_TOTAL.inc(method, route, str(status_holder[0]))
+            _inflight[route] -= 1
@@ -0,0 +1,361 @@
+"""
+Versioned model store for the LMS AI service.
+
+Each model version lives in its own directory under ``models/versions``.
+Versions are written to a temporary directory first and published with an
+atomic rename, so the service never sees a half-written model.  The
+``CURRENT`` and ``CANDIDATE`` pointer files are replaced atomically as well.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from enhanced_ai import EnhancedLMSAI
+from metrics import shadow_inference
+
+DEFAULT_STORE_PATH = os.path.join("models", "versions")
+MODEL_FILENAME = "enhanced_ai_models.pkl"
+MANIFEST_FILENAME = "manifest.json"
+UNTRAINED_IDENTITY = "legacy:untrained"
+
+logger = logging.getLogger(__name__)
+
+
+def legacy_model_identity(path):
+    """Identity of an unversioned model file (its mtime and size), or of no models when it is missing"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return UNTRAINED_IDENTITY
+    return f"legacy:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class ModelStore:
+    def __init__(self, root=DEFAULT_STORE_PATH):
+        self.root = root
+
+    def _pointer_path(self, name):
+        return os.path.join(self.root, name)
+
+    def _read_pointer(self, name):
+        try:
+            with open(self._pointer_path(name), 'r') as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if version and os.path.isdir(self.version_path(version)):
+            return version
+        return None
+
+    def _write_pointer(self, name, version):
+        """Atomically point CURRENT/CANDIDATE at a version"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._pointer_path(f".{name}.tmp-{os.getpid()}")
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._pointer_path(name))
+
+    def _clear_pointer(self, name):
+        try:
+            os.remove(self._pointer_path(name))
+        except FileNotFoundError:
+            pass
+
+    def version_path(self, version):
+        return os.path.join(self.root, version)
+
+    def model_path(self, version):
+        return os.path.join(self.version_path(version), MODEL_FILENAME)
+
+    def new_version_name(self):
+        """Generate a sortable, unique version name"""
+        base = datetime.now().strftime("v%Y%m%d-%H%M%S")
+        version = base
+        suffix = 1
+        while os.path.exists(self.version_path(version)):
+            suffix += 1
+            version = f"{base}-{suffix}"
+        return version
+
+    def publish(self, ai, version=None, metadata=None, make_current=False, make_candidate=False, compact=False):
+        """Write models to a temporary directory and publish them with an atomic rename
+
+        compact stores random forests in the quantized CompactForest format.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        version = version or self.new_version_name()
+        final_path = self.version_path(version)
+        if os.path.exists(final_path):
+            raise ValueError(f"Model version already exists: {version}")
+
+        tmp_path = os.path.join(self.root, f".tmp-{version}-{os.getpid()}")
+        os.makedirs(tmp_path)
+        try:
+            ai.save_models(os.path.join(tmp_path, MODEL_FILENAME), compact=compact)
+
+            manifest = {
+                "version": version,
+                "created_at": datetime.now().isoformat(),
+                "models": {
+                    "performance_model": ai.performance_model is not None,
+                    "risk_model": ai.risk_model is not None,
+                    "grading_model": ai.grading_model is not None,
+                    "behavioral_model": ai.behavioral_model is not None,
+                    "content_recommendation": hasattr(ai, 'topic_similarities'),
+                    "learning_path": hasattr(ai, 'optimal_paths')
+                },
+                "model_families": ai.model_families,
+                "compact": compact,
+                "metadata": metadata or {}
+            }
+            with open(os.path.join(tmp_path, MANIFEST_FILENAME), 'w') as f:
+                json.dump(manifest, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.rename(tmp_path, final_path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        if make_current:
+            self.promote(version)
+        elif make_candidate:
+            self.set_candidate(version)
+
+        return version
+
+    def list_versions(self):
+        """List published versions (oldest first) with their manifests"""
+        if not os.path.isdir(self.root):
+            return []
+
+        versions = []
+        for name in sorted(os.listdir(self.root)):
+            path = self.version_path(name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            manifest = {}
+            try:
+                with open(os.path.join(path, MANIFEST_FILENAME), 'r') as f:
+                    manifest = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+            versions.append({**manifest, "version": name})
+        return versions
+
+    def current_version(self):
+        return self._read_pointer("CURRENT")
+
+    def candidate_version(self):
+        return self._read_pointer("CANDIDATE")
+
+    def promote(self, version):
+        """Make a version current; clears the candidate if it was the one promoted"""
+        if not os.path.isdir(self.version_path(version)):
+            raise ValueError(f"Unknown model version: {version}")
+        self._write_pointer("CURRENT", version)
+        if self.candidate_version() == version:
+            self._clear_pointer("CANDIDATE")
+
+    def set_candidate(self, version):
+        if version is None:
+            self._clear_pointer("CANDIDATE")
+            return
+        if not os.path.isdir(self.version_path(version)):
+            raise ValueError(f"Unknown model version: {version}")
+        self._write_pointer("CANDIDATE", version)
+
+    def load(self, version):
+        """Load a published version into a fresh EnhancedLMSAI instance"""
+        ai = EnhancedLMSAI()
+        if not ai.load_models(self.model_path(version)):
+            raise ValueError(f"Could not load model version: {version}")
+        return ai
+
+
+class VersionStats:
+    """Rolling latency statistics for one model version"""
+
+    def __init__(self, window=2000):
+        self.count = 0
+        self.latencies_ms = deque(maxlen=window)
+
+    def record(self, latency_ms):
+        self.count += 1
+        self.latencies_ms.append(latency_ms)
+
+    def summary(self):
+        if not self.latencies_ms:
+            return {"count": self.count, "mean_ms": 0, "p50_ms": 0, "p99_ms": 0}
+        latencies = np.array(self.latencies_ms)
+        return {
+            "count": self.count,
+            "mean_ms": round(float(latencies.mean()), 3),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3)
+        }
+
+
+def score_snapshot(ai, ml_scores):
+    """Run the model-backed predictions compared during shadow scoring"""
+    snapshot = {
+        "performance": None,
+        "risk_level": None,
+        "learning_style": None
+    }
+    if ai.performance_model is not None:
+        snapshot["performance"] = ai.predict_performance(ml_scores)
+    if ai.risk_model is not None:
+        snapshot["risk_level"] = ai.predict_risk_level(ml_scores)
+    if ai.behavioral_model is not None:
+        behavior = ai.analyze_behavior(ml_scores)
+        snapshot["learning_style"] = behavior["learning_style"] if behavior else None
+    return snapshot
+
+
+class ShadowScorer:
+    """Score a sampled share of live traffic against a candidate model version.
+
+    Work is handed to a single low-priority daemon thread through a bounded
+    queue.  When the queue is full the sample is dropped instead of making the
+    request wait, so shadow scoring never adds to request latency.
+    """
+
+    def __init__(self, sample_rate=0.05, max_queue=256, window=2000):
+        self.sample_rate = sample_rate
+        self.primary = None
+        self.primary_version = None
+        self.candidate = None
+        self.candidate_version = None
+        self.window = window
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._reset_stats()
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+
+    def _reset_stats(self):
+        self.version_stats = {}
+        self.compared = 0
+        self.performance_deltas = deque(maxlen=self.window)
+        self.risk_agreements = 0
+        self.risk_compared = 0
+        self.style_agreements = 0
+        self.style_compared = 0
+
+    def configure(self, primary, primary_version, candidate, candidate_version):
+        """Swap the primary/candidate pair; resets the comparison statistics"""
+        with self._lock:
+            self.primary = primary
+            self.primary_version = primary_version
+            self.candidate = candidate
+            self.candidate_version = candidate_version
+            self._reset_stats()
+
+    @property
+    def active(self):
+        return self.candidate is not None and self.primary is not None
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, ml_scores):
+        """Maybe enqueue a request for shadow scoring; never blocks"""
+        if not self.active or random.random() >= self.sample_rate:
+            return False
+        # Read the pair under the lock configure() swaps it under, so a promotion never mixes versions
+        with self._lock:
+            pair = (self.primary, self.primary_version, self.candidate, self.candidate_version)
+        if pair[0] is None or pair[2] is None:
+            return False
+        try:
+            self._queue.put_nowait((*pair, ml_scores))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _lower_priority(self):
+        # Linux niceness is per thread, so this only affects the shadow worker
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+    def _run(self):
+        self._lower_priority()
+        while True:
+            primary, primary_version, candidate, candidate_version, ml_scores = self._queue.get()
+            try:
+                self._compare(primary, primary_version, candidate, candidate_version, ml_scores)
+            except Exception:
+                logger.exception("Shadow scoring failed")
+            finally:
+                self._queue.task_done()
+
+    def _timed_snapshot(self, ai, ml_scores):
+        start = time.perf_counter()
+        # Keeps shadow traffic out of the live inference latency and tree-count metrics
+        with shadow_inference():
+            snapshot = score_snapshot(ai, ml_scores)
+        return snapshot, (time.perf_counter() - start) * 1000
+
+    def _compare(self, primary, primary_version, candidate, candidate_version, ml_scores):
+        primary_result, primary_ms = self._timed_snapshot(primary, ml_scores)
+        candidate_result, candidate_ms = self._timed_snapshot(candidate, ml_scores)
+
+        with self._lock:
+            # Drop results for a pair that was swapped out while we were scoring
+            if candidate_version != self.candidate_version or primary_version != self.primary_version:
+                return
+
+            for version, latency in ((primary_version, primary_ms), (candidate_version, candidate_ms)):
+                if version not in self.version_stats:
+                    self.version_stats[version] = VersionStats(self.window)
+                self.version_stats[version].record(latency)
+
+            self.compared += 1
+            if primary_result["performance"] is not None and candidate_result["performance"] is not None:
+                self.performance_deltas.append(candidate_result["performance"] - primary_result["performance"])
+            if primary_result["risk_level"] is not None and candidate_result["risk_level"] is not None:
+                self.risk_compared += 1
+                self.risk_agreements += primary_result["risk_level"] == candidate_result["risk_level"]
+            if primary_result["learning_style"] is not None and candidate_result["learning_style"] is not None:
+                self.style_compared += 1
+                self.style_agreements += primary_result["learning_style"] == candidate_result["learning_style"]
+
+    def stats(self):
+        """Snapshot of shadow-scoring statistics"""
+        with self._lock:
+            deltas = np.array(self.performance_deltas) if self.performance_deltas else None
+            return {
+                "active": self.active,
+                "sample_rate": self.sample_rate,
+                "primary_version": self.primary_version,
+                "candidate_version": self.candidate_version,
+                "compared": self.compared,
+                "queued": self.queue_depth(),
+                "dropped": self.dropped,
+                "latency": {version: stats.summary() for version, stats in self.version_stats.items()},
+                "performance_delta": {
+                    "mean": round(float(deltas.mean()), 3),
+                    "mean_abs": round(float(np.abs(deltas).mean()), 3),
+                    "max_abs": round(float(np.abs(deltas).max()), 3)
+                } if deltas is not None else None,
+                "risk_agreement": round(self.risk_agreements / self.risk_compared, 4) if self.risk_compared else None,
+                "learning_style_agreement": round(self.style_agreements / self.style_compared, 4) if self.style_compared else None
+            }
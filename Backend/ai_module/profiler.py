@@ -0,0 +1,187 @@
+"""
+Opt-in sampling profiler for live requests.
+
+While the profiler is enabled, a request is selected for profiling when it
+falls in a configurable fraction of requests or carries the ``X-Profile: 1``
+header. A background sampler runs until the request finishes. The model work
+of many endpoints runs in thread-pool threads rather than on the event loop,
+so the sampler periodically captures the stack of every busy thread (threads
+parked in ``select`` or a lock/queue wait are skipped) and aggregates them in
+collapsed-stack form (``frame;frame;frame count``), ready for flame-graph
+tools. Work of other requests running at the same time is sampled as well.
+Distinct stacks are bounded; once the buffer is full, further new stacks are
+counted under a single overflow entry.
+
+When nothing is being profiled the sampler thread is parked on an event.
+While the profiler is disabled the middleware only checks a flag per request.
+"""
+
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+OVERFLOW_STACK = "[overflow]"
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse_stack(frame):
+    """Render a frame chain root-first in collapsed-stack notation"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def _is_idle(frame):
+    # An event loop waiting in select(), or a pool thread waiting for work, is not time spent on the request
+    code = frame.f_code
+    if code.co_name in ("select", "poll", "_run_once") and code.co_filename.endswith(("selectors.py", "base_events.py")):
+        return True
+    return code.co_name in ("wait", "get") and code.co_filename.endswith(("threading.py", "queue.py"))
+
+
+class SamplingProfiler:
+    def __init__(self, sample_rate=0.01, interval_ms=5, max_stacks=10000):
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.max_stacks = max_stacks
+        self.admin_token = os.getenv("AI_ADMIN_TOKEN")
+        self._lock = threading.Lock()
+        self._active = 0
+        self._wake = threading.Event()
+        self._thread = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stacks = {}
+            self.total_samples = 0
+            self.profiled_requests = 0
+            self.started_at = time.time()
+
+    def configure(self, enabled=None, sample_rate=None, interval_ms=None, max_stacks=None):
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, sample_rate))
+        if interval_ms is not None:
+            self.interval_ms = max(1, interval_ms)
+        if max_stacks is not None:
+            self.max_stacks = max(1, max_stacks)
+        if enabled is not None:
+            self.enabled = enabled
+
+    def should_profile(self, forced):
+        if forced:
+            return True
+        return self.enabled and random.random() < self.sample_rate
+
+    def begin(self):
+        """Start sampling for a profiled request; pair with end()"""
+        with self._lock:
+            self._active += 1
+            self.profiled_requests += 1
+        self._ensure_sampler()
+        self._wake.set()
+
+    def end(self):
+        with self._lock:
+            self._active -= 1
+            if not self._active:
+                self._wake.clear()
+
+    def _ensure_sampler(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval_ms / 1000)
+            if not self._active:
+                continue
+            sampler_id = threading.get_ident()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id or _is_idle(frame):
+                    continue
+                self._record(collapse_stack(frame))
+
+    def _record(self, stack):
+        with self._lock:
+            self.total_samples += 1
+            if stack in self._stacks:
+                self._stacks[stack] += 1
+            elif len(self._stacks) < self.max_stacks:
+                self._stacks[stack] = 1
+            else:
+                self._stacks[OVERFLOW_STACK] = self._stacks.get(OVERFLOW_STACK, 0) + 1
+
+    def collapsed(self):
+        """Aggregated samples in collapsed-stack text format"""
+        with self._lock:
+            stacks = sorted(self._stacks.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sample_rate": self.sample_rate,
+                "interval_ms": self.interval_ms,
+                "max_stacks": self.max_stacks,
+                "distinct_stacks": len(self._stacks),
+                "total_samples": self.total_samples,
+                "profiled_requests": self.profiled_requests,
+                "active_requests": self._active,
+                "collecting_since": self.started_at
+            }
+
+    def token_valid(self, token):
+        """Admin access needs AI_ADMIN_TOKEN to be set and matched; it is closed otherwise"""
+        if not self.admin_token or token is None:
+            return False
+        return hmac.compare_digest(token.encode(), self.admin_token.encode())
+
+
+class ProfilerMiddleware:
+    """Plain ASGI middleware that profiles sampled or header-flagged requests"""
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    def _forced(self, scope):
+        requested = False
+        token = None
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                requested = value in (b"1", b"true")
+            elif name == ADMIN_TOKEN_HEADER:
+                token = value.decode("latin-1")
+        return requested and self.profiler.token_valid(token)
+
+    async def __call__(self, scope, receive, send):
+        # Disabled: pass through without scanning the headers
+        if (scope["type"] != "http" or not self.profiler.enabled
+                or not self.profiler.should_profile(self._forced(scope))):
+            await self.app(scope, receive, send)
+            return
+
+        self.profiler.begin()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end()
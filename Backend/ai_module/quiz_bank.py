@@ -0,0 +1,270 @@
+"""
+Indexed question bank for quiz generation.
+
+Questions are grouped into candidate pools keyed by (subject, difficulty,
+question type) when the bank loads, including "any difficulty" and "any type"
+pools. Assembling a quiz only draws from these ready-made pools, so the work
+grows with the number of questions picked, not with the size of the bank.
+
+The bank is read from ``question_bank.json`` when present: a list of questions
+with ``subject``, ``difficulty``, ``type``, ``question``, ``options``,
+``correct_answer``, ``points`` and optionally ``id``. Otherwise it is generated
+from templates for the subjects in the training data.
+
+Draws use a ``random.Random`` seeded per quiz, so the same seed always
+assembles the same quiz, and a quiz never contains the same question twice.
+"""
+
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime
+
+DEFAULT_BANK_PATH = "question_bank.json"
+DIFFICULTIES = ("easy", "medium", "hard")
+QUESTION_TYPES = ("multiple_choice", "true_false", "short_answer", "essay")
+DEFAULT_SUBJECTS = [
+    "Advanced Mathematics", "Art", "Biology", "Chemistry", "Computer Science", "Economics",
+    "English", "Geography", "History", "Literature", "Mathematics", "Music",
+    "Physical Education", "Physics", "Psychology", "Sociology"
+]
+ASPECTS = [
+    "key terms", "core principles", "common methods",
+    "real-world applications", "historical development", "problem-solving strategies"
+]
+STEMS = {
+    "easy": [
+        "Which of the following best describes the {aspect} of {subject}?",
+        "What is a correct statement about the {aspect} of {subject}?"
+    ],
+    "medium": [
+        "How would you apply the {aspect} of {subject} to a familiar problem?",
+        "Which explanation of the {aspect} of {subject} is most accurate?"
+    ],
+    "hard": [
+        "How do the {aspect} of {subject} connect to other topics in the course?",
+        "Which argument about the {aspect} of {subject} holds up under closer analysis?"
+    ]
+}
+POINTS = {"easy": 10, "medium": 10, "hard": 15}
+
+
+def subject_key(subject):
+    return " ".join(subject.lower().split())
+
+
+def normalize_difficulty(difficulty_level):
+    """easy/medium/hard, or None for adaptive and unknown levels (any difficulty)"""
+    level = (difficulty_level or "").strip().lower()
+    return level if level in DIFFICULTIES else None
+
+
+def normalize_type(quiz_type):
+    """One of QUESTION_TYPES, or None for MIXED and unknown types (any type)"""
+    question_type = re.sub(r"[\s-]+", "_", (quiz_type or "").strip().lower())
+    return question_type if question_type in QUESTION_TYPES else None
+
+
+def adaptive_difficulty(average_score):
+    """Difficulty for a subject from the student's average score in it"""
+    if average_score < 60:
+        return "easy"
+    elif average_score < 80:
+        return "medium"
+    return "hard"
+
+
+def template_questions(subject, difficulties=DIFFICULTIES, question_types=QUESTION_TYPES):
+    """Template questions for one subject, identical on every call"""
+    slug = re.sub(r"[^a-z0-9]+", "-", subject_key(subject)).strip("-")
+    answers = random.Random(f"answers:{slug}")
+    questions = []
+    for difficulty in difficulties:
+        for question_type in question_types:
+            number = 0
+            for aspect in ASPECTS:
+                for stem in STEMS[difficulty]:
+                    question = {
+                        "id": f"{slug}:{difficulty}:{question_type}:{number:02d}",
+                        "subject": subject,
+                        "difficulty": difficulty,
+                        "type": question_type,
+                        "points": POINTS[difficulty]
+                    }
+                    text = stem.format(aspect=aspect, subject=subject)
+                    if question_type == "multiple_choice":
+                        question["question"] = text
+                        question["options"] = [f"Option {letter} for {subject}" for letter in "ABCD"]
+                        question["correct_answer"] = answers.randint(0, 3)
+                    elif question_type == "true_false":
+                        question["question"] = f"True or false: the {aspect} of {subject} apply only to {difficulty} problems."
+                        question["options"] = ["True", "False"]
+                        question["correct_answer"] = answers.randint(0, 1)
+                    else:
+                        question["question"] = text if question_type == "short_answer" else f"Discuss in detail: {text}"
+                        question["options"] = []
+                        question["correct_answer"] = None
+                    questions.append(question)
+                    number += 1
+    return questions
+
+
+class QuestionBank:
+    def __init__(self, questions):
+        self.questions = questions
+        pools = {}
+        for index, question in enumerate(questions):
+            subject = subject_key(question["subject"])
+            for difficulty in (question["difficulty"], None):
+                for question_type in (question["type"], None):
+                    pools.setdefault((subject, difficulty, question_type), []).append(index)
+        self.pools = {key: tuple(indexes) for key, indexes in pools.items()}
+        self.subjects = {subject for subject, _, _ in self.pools}
+
+    @classmethod
+    def load(cls, path=DEFAULT_BANK_PATH):
+        """Bank from a JSON question file, or the template bank if there is none"""
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                questions = json.load(f)
+            for index, question in enumerate(questions):
+                question.setdefault("id", f"q{index}")
+                question["difficulty"] = normalize_difficulty(question.get("difficulty")) or "medium"
+                question["type"] = normalize_type(question.get("type")) or "multiple_choice"
+                question.setdefault("points", POINTS[question["difficulty"]])
+            source = path
+        else:
+            questions = [q for subject in DEFAULT_SUBJECTS for q in template_questions(subject)]
+            source = "templates"
+        bank = cls(questions)
+        print(f"📝 Question bank loaded from {source}: {len(questions)} questions in {len(bank.pools)} pools")
+        return bank
+
+    def _draw(self, pool, questions, count, rng, exclude):
+        """Up to count distinct questions from pool, skipping excluded IDs
+
+        Partial Fisher-Yates shuffle over a sparse swap table: each pick costs
+        O(1) however large the pool is.
+        """
+        swapped = {}
+        picked = []
+        size = len(pool)
+        position = 0
+        while len(picked) < count and position < size:
+            other = rng.randrange(position, size)
+            choice = swapped.get(other, pool[other])
+            swapped[other] = swapped.get(position, pool[position])
+            position += 1
+            question = questions[choice]
+            if question["id"] not in exclude:
+                picked.append(question)
+        return picked
+
+    def draw(self, subject, difficulty, question_type, count, rng, exclude=()):
+        """count questions for a subject; unknown subjects get template questions
+
+        When the bank has the subject but no pool for this difficulty and type,
+        the difficulty is relaxed first, then the type.
+        """
+        key = subject_key(subject)
+        if key in self.subjects:
+            for pool_key in ((key, difficulty, question_type), (key, None, question_type),
+                             (key, difficulty, None), (key, None, None)):
+                pool = self.pools.get(pool_key)
+                if pool is not None:
+                    return self._draw(pool, self.questions, count, rng, exclude)
+        fallback = template_questions(
+            subject,
+            (difficulty,) if difficulty else DIFFICULTIES,
+            (question_type,) if question_type else QUESTION_TYPES
+        )
+        return self._draw(range(len(fallback)), fallback, count, rng, exclude)
+
+    def stats(self):
+        return {"questions": len(self.questions), "subjects": len(self.subjects), "pools": len(self.pools)}
+
+
+def course_questions(course_title, quiz_type, rng):
+    """The two general questions every quiz ends with"""
+    return [
+        {
+            "id": "general:focus",
+            "question": f"General question about {course_title}: What is the primary focus of this course?",
+            "type": quiz_type.lower(),
+            "options": [
+                "Understanding basic concepts",
+                "Advanced problem solving",
+                "Practical applications",
+                "Theoretical foundations"
+            ],
+            "correct_answer": rng.randint(0, 3),
+            "points": 15,
+            "subject": "General"
+        },
+        {
+            "id": "general:approach",
+            "question": f"Another question about {course_title}: Which approach is most effective for learning this subject?",
+            "type": quiz_type.lower(),
+            "options": [
+                "Memorization only",
+                "Practice and application",
+                "Reading textbooks only",
+                "Avoiding difficult topics"
+            ],
+            "correct_answer": 1,
+            "points": 15,
+            "subject": "General"
+        }
+    ]
+
+
+def build_quiz(bank, weak_subjects, quiz_type, course_title, difficulty_level, rng,
+               subject_averages=None, seen_question_ids=()):
+    """Quiz for one student: 2-3 bank questions per weak subject plus the course questions
+
+    With an adaptive difficulty level and subject_averages, each subject is
+    drawn at the difficulty matching the student's average in it.
+    """
+    question_type = normalize_type(quiz_type)
+    difficulty = normalize_difficulty(difficulty_level)
+    used = set(seen_question_ids)
+    questions = []
+
+    for subject in dict.fromkeys(weak_subjects):
+        subject_difficulty = difficulty
+        if subject_difficulty is None and subject_averages and subject in subject_averages:
+            subject_difficulty = adaptive_difficulty(subject_averages[subject])
+        for question in bank.draw(subject, subject_difficulty, question_type, rng.randint(2, 3), rng, used):
+            used.add(question["id"])
+            questions.append({
+                "question_id": question["id"],
+                "question": question["question"],
+                "type": question["type"],
+                "options": question["options"],
+                "correct_answer": question["correct_answer"],
+                "points": question["points"],
+                "subject": subject,
+                "difficulty": question["difficulty"]
+            })
+
+    for question in course_questions(course_title, quiz_type, rng):
+        question["question_id"] = question.pop("id")
+        questions.append(question)
+
+    return {
+        "quiz_id": f"quiz_{int(time.time())}_{rng.getrandbits(32):08x}",
+        "title": f"AI-Generated Quiz: {', '.join(weak_subjects)}",
+        "description": f"Personalized quiz based on weak subjects: {', '.join(weak_subjects)}",
+        "questions": {
+            "questions": questions,
+            "total_questions": len(questions),
+            "time_limit": 30,  # 30 minutes
+            "difficulty": difficulty_level
+        },
+        "max_score": sum(question["points"] for question in questions),
+        "weak_subjects": weak_subjects,
+        "course_title": course_title,
+        "generated_at": datetime.now().isoformat()
+    }
@@ -10,6 +10,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 import random
 from enhanced_ai import EnhancedLMSAI
+from model_store import ModelStore, score_snapshot
 import os
 
 def generate_new_training_data(scenario="improved"):
@@ -137,10 +138,10 @@ def retrain_models_with_new_data(scenario="improved"):
     print("🧠 Training behavioral analysis model...")
     behavioral_success = ai.train_behavioral_model(new_training_data)
     
-    # Save all models
+    # Publish the models as a new candidate version
     if any([performance_success, risk_success, content_success, grading_success, learning_path_success, behavioral_success]):
-        ai.save_models('models/enhanced_ai_models_new.pkl')
-        print("✅ Models saved successfully!")
+        version = ModelStore().publish(ai, metadata={"scenario": scenario}, make_candidate=True)
+        print(f"✅ Models published as candidate version {version}")
         
         # Test the new models
         test_new_models(ai, new_training_data)
@@ -190,64 +191,62 @@ def test_new_models(ai, data):
             print(f"   Learning Style: {behavior['learning_style']}")
 
 def compare_predictions():
-    """Compare predictions before and after retraining"""
+    """Compare current and candidate model versions across all students"""
     
-    print("\n🔄 Loading old and new models...")
+    print("\n🔄 Loading current and candidate models...")
     
-    # Load old models
-    ai_old = EnhancedLMSAI()
-    try:
-        ai_old.load_models('models/enhanced_ai_models.pkl')
-        print("✅ Old models loaded")
-    except:
-        print("❌ Old models not found")
-        return
+    store = ModelStore()
     
-    # Load new models
-    ai_new = EnhancedLMSAI()
-    try:
-        ai_new.load_models('models/enhanced_ai_models_new.pkl')
-        print("✅ New models loaded")
-    except:
-        print("❌ New models not found")
+    # Load current models (fall back to the unversioned file)
+    current_version = store.current_version()
+    if current_version:
+        ai_old = store.load(current_version)
+        print(f"✅ Current models loaded ({current_version})")
+    else:
+        ai_old = EnhancedLMSAI()
+        if not os.path.exists('models/enhanced_ai_models.pkl') or not ai_old.load_models('models/enhanced_ai_models.pkl'):
+            print("❌ Current models not found")
+            return
+        print("✅ Current models loaded (legacy file)")
+    
+    # Load candidate models
+    candidate_version = store.candidate_version()
+    if not candidate_version:
+        print("❌ No candidate models published")
         return
+    ai_new = store.load(candidate_version)
+    print(f"✅ Candidate models loaded ({candidate_version})")
     
     # Load test data
     try:
         with open('ai_training_data.json', 'r') as f:
             old_data = json.load(f)
-        with open('ai_training_data_new.json', 'r') as f:
-            new_data = json.load(f)
     except:
         print("❌ Training data not found")
         return
     
     # Compare predictions
-    test_student = list(old_data.keys())[0]
-    student_scores = old_data[test_student]
-    
-    print(f"\n📊 Comparing predictions for student: {test_student}")
-    
-    # Performance prediction comparison
-    if ai_old.performance_model and ai_new.performance_model:
-        old_prediction = ai_old.predict_performance(student_scores)
-        new_prediction = ai_new.predict_performance(student_scores)
-        actual_avg = np.mean([s['score'] for s in student_scores])
-        
+    performance_deltas = []
+    risk_agreements = []
+    for student_scores in old_data.values():
+        old_result = score_snapshot(ai_old, student_scores)
+        new_result = score_snapshot(ai_new, student_scores)
+        if old_result["performance"] is not None and new_result["performance"] is not None:
+            performance_deltas.append(new_result["performance"] - old_result["performance"])
+        if old_result["risk_level"] is not None and new_result["risk_level"] is not None:
+            risk_agreements.append(old_result["risk_level"] == new_result["risk_level"])
+    
+    print(f"\n📊 Compared predictions for {len(old_data)} students")
+    
+    if performance_deltas:
         print(f"   Performance Prediction:")
-        print(f"     Old Model: {old_prediction:.1f}")
-        print(f"     New Model: {new_prediction:.1f}")
-        print(f"     Actual: {actual_avg:.1f}")
-        print(f"     Difference: {new_prediction - old_prediction:.1f}")
-    
-    # Risk classification comparison
-    if ai_old.risk_model and ai_new.risk_model:
-        old_risk = ai_old.predict_risk_level(student_scores)
-        new_risk = ai_new.predict_risk_level(student_scores)
-        
+        print(f"     Mean Difference: {np.mean(performance_deltas):.2f}")
+        print(f"     Mean Absolute Difference: {np.mean(np.abs(performance_deltas)):.2f}")
+        print(f"     Max Absolute Difference: {np.max(np.abs(performance_deltas)):.2f}")
+    
+    if risk_agreements:
         print(f"   Risk Classification:")
-        print(f"     Old Model: {old_risk}")
-        print(f"     New Model: {new_risk}")
+        print(f"     Agreement: {np.mean(risk_agreements) * 100:.1f}%")
 
 def main():
     """Main function to demonstrate model retraining"""
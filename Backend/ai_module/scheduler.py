@@ -0,0 +1,196 @@
+"""
+Priority scheduling between interactive and bulk work.
+
+Student-facing calls (the interactive lane) and class or cohort analyses
+(the bulk lane) share ``workers`` slots, one per core by default:
+
+- ``reserved`` slots are kept for interactive work: bulk never holds more
+  than ``workers - reserved`` at once
+- bulk work takes a slot per chunk (a chunk of a class analysis, a page of
+  a cohort job) and gives it back in between, so it is preempted at chunk
+  boundaries: a freed slot goes to waiting interactive work first
+- the p99 of student-facing requests from the last
+  ``LATENCY_WINDOW_SECONDS``, measured by ``InteractiveLatencyMiddleware``,
+  is checked against ``p99_target``; while it is above target, bulk is held
+  to a single slot. Samples age out of the window, so once interactive
+  traffic stops the cap lifts again.
+
+The pool is per process and guards work running in threads (the thread pool,
+the cohort job coordinator). Handlers that run on the event loop take no
+slot; only their latency is measured.
+
+Configuration comes from the environment:
+
+    SCHEDULER_WORKERS               slots (default: CPU count)
+    SCHEDULER_RESERVED_INTERACTIVE  slots bulk work cannot use (default: a quarter, at least 1)
+    INTERACTIVE_P99_TARGET_MS       student-facing p99 target (default 250)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from metrics import registry
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+LATENCY_WINDOW = 500
+LATENCY_WINDOW_SECONDS = 30.0
+# Recompute the p99 every this many interactive requests, and at least this often
+P99_INTERVAL = 20
+P99_REFRESH_SECONDS = 1.0
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+SLOT_WAIT = registry.histogram(
+    "lms_ai_scheduler_wait_seconds", "Time spent waiting for a worker slot by lane", ("lane",), WAIT_BUCKETS)
+for _lane in LANES:
+    SLOT_WAIT.declare(_lane)
+
+
+class PriorityScheduler:
+    def __init__(self, workers, reserved, p99_target_ms):
+        self.workers = max(1, workers)
+        # Bulk always keeps at least one slot so jobs finish eventually
+        self.reserved = min(max(0, reserved), self.workers - 1)
+        self.p99_target = p99_target_ms / 1000
+        self.running = dict.fromkeys(LANES, 0)
+        self.waiting = dict.fromkeys(LANES, 0)
+        self.interactive_p99 = None
+        # (time.monotonic(), seconds) of recent student-facing requests
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._since_p99 = 0
+        self._p99_at = time.monotonic()
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls):
+        workers = int(os.getenv("SCHEDULER_WORKERS", "0")) or os.cpu_count() or 1
+        return cls(
+            workers,
+            int(os.getenv("SCHEDULER_RESERVED_INTERACTIVE", str(max(1, workers // 4)))),
+            float(os.getenv("INTERACTIVE_P99_TARGET_MS", "250"))
+        )
+
+    def _refresh_p99(self, now):
+        cutoff = now - LATENCY_WINDOW_SECONDS
+        while self._latencies and self._latencies[0][0] < cutoff:
+            self._latencies.popleft()
+        self.interactive_p99 = (
+            float(np.percentile([seconds for _, seconds in self._latencies], 99)) if self._latencies else None
+        )
+        self._since_p99 = 0
+        self._p99_at = now
+
+    def over_target(self):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._p99_at >= P99_REFRESH_SECONDS:
+                self._refresh_p99(now)
+            return self.interactive_p99 is not None and self.interactive_p99 > self.p99_target
+
+    def bulk_limit(self):
+        """Slots bulk work may hold right now"""
+        return 1 if self.over_target() else self.workers - self.reserved
+
+    def _can_start(self, lane):
+        if sum(self.running.values()) >= self.workers:
+            return False
+        if lane == INTERACTIVE:
+            return True
+        return self.waiting[INTERACTIVE] == 0 and self.running[BULK] < self.bulk_limit()
+
+    def acquire(self, lane):
+        """Block until lane may use a slot; pair with release(lane)"""
+        started = time.perf_counter()
+        with self._cond:
+            self.waiting[lane] += 1
+            try:
+                # Timed waits so bulk notices the p99 window emptying without new requests
+                while not self._can_start(lane):
+                    self._cond.wait(P99_REFRESH_SECONDS)
+            finally:
+                self.waiting[lane] -= 1
+            self.running[lane] += 1
+        SLOT_WAIT.observe(time.perf_counter() - started, lane)
+
+    def release(self, lane):
+        with self._cond:
+            self.running[lane] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, lane):
+        self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def call(self, lane, func, *args):
+        """func(*args) holding a slot of lane (blocking: call from a worker thread)"""
+        with self.slot(lane):
+            return func(*args)
+
+    async def run(self, lane, func, *args):
+        return await run_in_threadpool(self.call, lane, func, *args)
+
+    def observe_interactive(self, seconds):
+        """Record a student-facing request's latency; bulk capacity follows the windowed p99"""
+        with self._cond:
+            now = time.monotonic()
+            self._latencies.append((now, seconds))
+            self._since_p99 += 1
+            if self._since_p99 < P99_INTERVAL:
+                return
+            was_over = self.over_target()
+            self._refresh_p99(now)
+            if was_over and not self.over_target():
+                # Bulk work held back by the p99 guard may start again
+                self._cond.notify_all()
+
+    def stats(self):
+        bulk_limit = self.bulk_limit()
+        return {
+            "workers": self.workers,
+            "reserved_interactive": self.reserved,
+            "bulk_limit": bulk_limit,
+            "running": dict(self.running),
+            "waiting": dict(self.waiting),
+            "interactive_p99_ms": round(self.interactive_p99 * 1000, 2) if self.interactive_p99 is not None else None,
+            "p99_target_ms": round(self.p99_target * 1000, 2)
+        }
+
+    def register_gauges(self):
+        registry.gauge("lms_ai_scheduler_running", "Worker slots in use by lane",
+                       lambda: {(lane,): count for lane, count in self.running.items()}, ("lane",))
+        registry.gauge("lms_ai_scheduler_waiting", "Work waiting for a worker slot by lane",
+                       lambda: {(lane,): count for lane, count in self.waiting.items()}, ("lane",))
+        registry.gauge("lms_ai_scheduler_bulk_limit", "Worker slots bulk work may currently hold", self.bulk_limit)
+
+
+class InteractiveLatencyMiddleware:
+    """Plain ASGI middleware feeding student-facing request latencies to the scheduler"""
+
+    def __init__(self, app, scheduler, paths, prefixes=()):
+        self.app = app
+        self.scheduler = scheduler
+        self.paths = frozenset(paths)
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "") if scope["type"] == "http" else None
+        if path is None or not (path in self.paths or path.startswith(self.prefixes)):
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.scheduler.observe_interactive(time.perf_counter() - start)
@@ -0,0 +1,63 @@
+"""
+Score dates as int32 day numbers (days since 1970-01-01).
+
+Dates arrive as ISO strings ("2024-01-15", optionally followed by a time) and
+are converted once when scores enter the service: request validation, the
+columnar decoder, the score store import and the training data. Sorting,
+weekdays and date windows then work on integers instead of re-parsing or
+comparing strings. Score dicts in the ML format carry the number as ``day``.
+Request scores with other date strings are accepted without a day number.
+"""
+
+from datetime import date
+
+import numpy as np
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday
+
+
+def day_number(value):
+    """Day number of one ISO date string; raises ValueError if it is not a date"""
+    return date.fromisoformat(value[:10]).toordinal() - EPOCH_ORDINAL
+
+
+def day_numbers(values):
+    """int32 day numbers for a sequence of ISO date strings, parsed in one NumPy call"""
+    days = np.asarray(values, dtype="U10").astype("datetime64[D]")
+    if np.isnat(days).any():
+        raise ValueError("Dates must be ISO dates (YYYY-MM-DD)")
+    return days.astype(np.int32)
+
+
+def weekday(days):
+    """Monday=0 ... Sunday=6, like datetime.weekday(); works on ints and arrays"""
+    return (days + EPOCH_WEEKDAY) % 7
+
+
+def score_day(score):
+    """Day number of an ML-format score dict, parsing only if it was never converted"""
+    day = score.get('day')
+    return day if day is not None else day_number(score['date'])
+
+
+def sorted_by_date(scores):
+    """ML-format score dicts in date order
+
+    A history with a date that is not an ISO date is ordered by the date
+    strings instead, as it was before dates were parsed.
+    """
+    try:
+        days = [score_day(s) for s in scores]
+    except ValueError:
+        return sorted(scores, key=lambda s: s['date'])
+    return [scores[i] for i in sorted(range(len(scores)), key=days.__getitem__)]
+
+
+def add_day_numbers(data):
+    """Give every score in {student_id: [scores]} a ``day``, parsing all new dates at once"""
+    pending = [s for scores in data.values() for s in scores if 'day' not in s]
+    if pending:
+        for s, day in zip(pending, day_numbers([s['date'] for s in pending]).tolist()):
+            s['day'] = day
+    return data
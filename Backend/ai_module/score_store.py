@@ -0,0 +1,209 @@
+"""
+Local indexed score store for the LMS AI service.
+
+Score histories live in a SQLite database so endpoints can take a student or
+class ID and read the scores locally instead of receiving whole histories in
+every request. Rows are clustered by ``(student_id, seq)`` and indexed by
+class prefix (the part of the student ID before the first ``_``, e.g.
+``class1`` for ``class1_student4``), keeping the original student order.
+
+The database is built from ``ai_training_data.json`` and rebuilt whenever
+that file changes (checked with one ``stat`` per lookup). Builds go to a
+temporary file that is renamed into place, so readers never see a half-built
+store.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from itertools import groupby
+from operator import itemgetter
+
+from score_days import add_day_numbers
+
+DEFAULT_DB_PATH = os.path.join("data", "scores.sqlite3")
+DEFAULT_SOURCE_PATH = "ai_training_data.json"
+
+SCHEMA = """
+CREATE TABLE scores (
+    student_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    class_id TEXT NOT NULL,
+    student_ord INTEGER NOT NULL,
+    topic TEXT NOT NULL,
+    score REAL NOT NULL,
+    max_score REAL NOT NULL,
+    date TEXT NOT NULL,
+    assignment_type TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    PRIMARY KEY (student_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+INDEXES = """
+CREATE INDEX idx_scores_class ON scores (class_id, student_ord, seq);
+"""
+SCORE_COLUMNS = "student_id, topic, score, max_score, date, assignment_type, day"
+# Part of the source signature, so stores built with an older layout are rebuilt
+SCHEMA_VERSION = 2
+
+
+def class_id_of(student_id):
+    """Class prefix of a student ID (class1_student4 -> class1)"""
+    return student_id.split("_", 1)[0] if "_" in student_id else ""
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return f"v{SCHEMA_VERSION}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class ScoreStore:
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._generation = 0
+        self._build_lock = threading.Lock()
+        self._signature = None
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.generation != self._generation:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+            self._local.generation = self._generation
+        return conn
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _meta(self, key):
+        try:
+            row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def ensure_current(self, source_path=DEFAULT_SOURCE_PATH):
+        """Build the store from source_path if it is missing or out of date"""
+        if not os.path.exists(source_path):
+            return False
+        signature = _source_signature(source_path)
+        if self._signature is None and self.exists():
+            self._signature = self._meta("source_signature")
+        if signature == self._signature:
+            return False
+        self.import_json(source_path)
+        return True
+
+    def import_json(self, source_path=DEFAULT_SOURCE_PATH):
+        """Rebuild the store from a training-data JSON file ({student_id: [scores]})"""
+        with open(source_path, 'r') as f:
+            data = json.load(f)
+        add_day_numbers(data)
+        signature = _source_signature(source_path)
+
+        with self._build_lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            conn = sqlite3.connect(tmp_path)
+            try:
+                conn.executescript(SCHEMA)
+                conn.executemany(
+                    "INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (student_id, seq, class_id_of(student_id), student_ord,
+                         s['topic'], float(s['score']), float(s.get('maxScore', 100)),
+                         s['date'], s.get('assignmentType', 'quiz'), s['day'])
+                        for student_ord, (student_id, scores) in enumerate(data.items())
+                        for seq, s in enumerate(scores)
+                    )
+                )
+                conn.executescript(INDEXES)
+                conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                    ("source_path", source_path),
+                    ("source_signature", signature),
+                    ("students", str(len(data)))
+                ])
+                conn.commit()
+            finally:
+                conn.close()
+
+            os.replace(tmp_path, self.path)
+            self._generation += 1
+            self._signature = signature
+        print(f"📚 Score store built from {source_path}: {len(data)} students")
+
+    def student_rows(self, student_id):
+        """Score tuples (student_id, topic, score, max_score, date, assignment_type, day) in order"""
+        if not self.exists():
+            return []
+        return self._connection().execute(
+            f"SELECT {SCORE_COLUMNS} FROM scores WHERE student_id = ? ORDER BY seq", (student_id,)
+        ).fetchall()
+
+    def student_scores(self, student_id):
+        """One student's history in the training-data format, or None if unknown"""
+        rows = self.student_rows(student_id)
+        if not rows:
+            return None
+        return [
+            {'topic': topic, 'score': score, 'maxScore': max_score, 'date': date,
+             'assignmentType': assignment_type, 'day': day}
+            for _, topic, score, max_score, date, assignment_type, day in rows
+        ]
+
+    def class_students(self, class_ids):
+        """[{student_id, scores}] for every student of the given classes, in stored order"""
+        if not self.exists():
+            return []
+        students = []
+        for class_id in class_ids:
+            rows = self._connection().execute(
+                f"SELECT {SCORE_COLUMNS} FROM scores WHERE class_id = ? ORDER BY student_ord, seq", (class_id,)
+            )
+            current = None
+            for student_id, topic, score, max_score, date, assignment_type, day in rows:
+                if current is None or current["student_id"] != student_id:
+                    current = {"student_id": student_id, "scores": []}
+                    students.append(current)
+                current["scores"].append({
+                    'topic': topic, 'score': score, 'maxScore': max_score,
+                    'date': date, 'assignmentType': assignment_type, 'day': day
+                })
+        return students
+
+    def iter_student_rows(self):
+        """(student_id, [score tuples]) for every stored student, in stored order"""
+        if not self.exists():
+            return
+        rows = self._connection().execute(f"SELECT {SCORE_COLUMNS} FROM scores ORDER BY student_ord, seq")
+        for student_id, student_rows in groupby(rows, key=itemgetter(0)):
+            yield student_id, list(student_rows)
+
+    def stats(self):
+        conn = self._connection()
+        students, scores = conn.execute("SELECT COUNT(DISTINCT student_id), COUNT(*) FROM scores").fetchone()
+        classes = conn.execute("SELECT COUNT(DISTINCT class_id) FROM scores").fetchone()[0]
+        return {"path": self.path, "students": students, "classes": classes, "scores": scores}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the local score store from training data")
+    parser.add_argument('--source', default=DEFAULT_SOURCE_PATH)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    store = ScoreStore(args.db)
+    store.import_json(args.source)
+    print(store.stats())
@@ -0,0 +1,292 @@
+"""
+Nightly insight snapshots for students whose scores have not changed.
+
+A batch job runs the /comprehensive-insights, /behavior-analysis and
+/learning-path logic for every student in the score store and writes the
+serialized responses to one snapshot file. Model features are extracted for
+all students at once with NumPy and each model predicts the whole cohort in a
+single call.
+
+Each student's entry records a fingerprint of the score history it was built
+from, and the snapshot records the identity of its models: the published
+version, or for unversioned models the mtime and size of the model file
+(``model_store.legacy_model_identity``). The endpoints fingerprint the scores
+they receive and return the stored bytes when the fingerprint and the serving
+models' identity match; models trained by the service change that identity.
+Any other request is computed live, so a stale snapshot is never served.
+
+File layout (``data/insights.snap``)::
+
+    b"LMSINS01"                  magic
+    uint64 little-endian         length of the index
+    index (JSON)                 meta + {student_id: [fingerprint, offset, length, ...]}
+    blobs                        serialized responses, offsets relative to here
+
+The file is written to a temporary name and renamed into place. Readers map
+it and pick up a new snapshot on the next lookup (one ``stat`` per lookup).
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import partial
+
+import numpy as np
+
+import fast_json
+import insights
+from columnar import ScoreRow
+from features import STUDENT, student_features, vocabulary
+
+DEFAULT_SNAPSHOT_PATH = os.path.join("data", "insights.snap")
+MAGIC = b"LMSINS01"
+HEADER = struct.Struct("<8sQ")
+KINDS = ("comprehensive_insights", "behavior_analysis", "learning_path")
+RISK_LABELS = np.array(['low', 'medium', 'high'])
+LEARNING_STYLES = ['Consistent Improver', 'Gradual Improver', 'Struggling Learner']
+
+
+def score_fingerprint(scores):
+    """Hash of a score history (objects with StudentScore attributes), in order"""
+    digest = hashlib.blake2b(digest_size=16)
+    for s in scores:
+        digest.update(
+            f"{s.topic}\x1f{float(s.score)!r}\x1f{float(s.max_score)!r}\x1f{s.date}\x1f{s.assignment_type}\x1e"
+            .encode("utf-8")
+        )
+    return digest.hexdigest()
+
+
+def to_ml_scores(scores):
+    return [
+        {'score': s.score, 'topic': s.topic, 'maxScore': s.max_score,
+         'assignmentType': s.assignment_type, 'date': s.date, 'day': s.day}
+        for s in scores
+    ]
+
+
+def extract_features(histories):
+    """Model features for every student at once, matching EnhancedLMSAI's per-student code
+
+    Returns (eligible, performance, risk, behavioral): a mask of students with
+    at least three scores, and one feature row per eligible student for each model.
+    """
+    counts = np.fromiter((len(h) for h in histories), dtype=np.int64, count=len(histories))
+    if not counts.sum():
+        empty = np.empty((0, 0))
+        return np.zeros(len(histories), dtype=bool), empty, empty, empty
+
+    total = counts.sum()
+    score = np.fromiter((s.score for h in histories for s in h), dtype=np.float64, count=total)
+    day = np.fromiter((s.day for h in histories for s in h), dtype=np.int32, count=total)
+    _, topic_index = vocabulary([s.topic for h in histories for s in h])
+    _, type_index = vocabulary([s.assignment_type for h in histories for s in h])
+
+    eligible = counts >= 3
+    students = student_features(counts, score, day, topic_index, type_index)[eligible]
+    mean, std, count = students[:, STUDENT["mean"]], students[:, STUDENT["std"]], students[:, STUDENT["count"]]
+
+    performance = students[:, [STUDENT["mean"], STUDENT["std"], STUDENT["trend"],
+                               STUDENT["topic_diversity"], STUDENT["assignment_types"]]]
+    risk = students[:, [STUDENT["mean"], STUDENT["std"], STUDENT["trend"]]]
+    behavioral = np.column_stack((mean, 1 - std / 100, count / 30, students[:, STUDENT["improvement_rate"]]))
+    return eligible, performance, risk, behavioral
+
+
+def _predict_scaled(ai, predict, X):
+    # Same fallback as the per-student predict methods when the scaler was fit on other features
+    try:
+        return predict(ai.scaler.transform(X))
+    except ValueError:
+        return predict(X)
+
+
+def predict_cohort(ai, histories):
+    """insights.predict_student output for every student, from one predict call per model
+
+    The classifiers go through EnhancedLMSAI.classify_rows, like the live
+    predictions, so early-exit voting gives the same classes here.
+    """
+    predictions = [{key: None for key in insights.PREDICTION_KEYS} for _ in histories]
+    eligible, performance_X, risk_X, behavioral_X = extract_features(histories)
+    rows = np.flatnonzero(eligible)
+    if not len(rows):
+        return predictions
+
+    if ai.performance_model is not None:
+        performance = np.clip(_predict_scaled(ai, ai.performance_model.predict, performance_X), 0, 100)
+        for row, value in zip(rows, performance):
+            predictions[row]["performance"] = value
+    if ai.risk_model is not None:
+        risk = RISK_LABELS[_predict_scaled(ai, partial(ai.classify_rows, "risk", ai.risk_model), risk_X)]
+        for row, value in zip(rows, risk.tolist()):
+            predictions[row]["risk"] = value
+    if ai.behavioral_model is not None:
+        styles = ai.classify_rows("behavioral", ai.behavioral_model, behavioral_X)
+        for row, style, features in zip(rows, styles, behavioral_X):
+            predictions[row]["behavior"] = {
+                'learning_style': LEARNING_STYLES[int(style)],
+                'consistency': features[1],
+                'engagement': features[2],
+                'improvement_rate': features[3],
+                'recommendations': ai._get_behavioral_recommendations(style)
+            }
+    return predictions
+
+
+def build_snapshot(ai, model_version, students, path=DEFAULT_SNAPSHOT_PATH):
+    """Write a snapshot for [(student_id, [ScoreRow])] and return its summary"""
+    started = time.perf_counter()
+    histories = [scores for _, scores in students]
+    predictions = predict_cohort(ai, histories)
+
+    index = {}
+    blobs = []
+    offset = 0
+    failed = 0
+    for (student_id, scores), student_predictions in zip(students, predictions):
+        ml_scores = to_ml_scores(scores)
+        try:
+            responses = (
+                insights.comprehensive_insights(ai, student_id, scores, ml_scores, student_predictions),
+                insights.behavior_analysis(ai, student_id, scores, ml_scores, student_predictions),
+                insights.learning_path(ai, student_id, scores, ml_scores)
+            )
+        except Exception as e:
+            # Left out of the snapshot; requests for this student are computed live
+            print(f"⚠️  Snapshot skipped {student_id}: {e}")
+            failed += 1
+            continue
+        entry = [score_fingerprint(scores)]
+        for response in responses:
+            blob = fast_json.dumps(response)
+            entry += [offset, len(blob)]
+            blobs.append(blob)
+            offset += len(blob)
+        index[student_id] = entry
+
+    header = fast_json.dumps({
+        "model_version": model_version,
+        "created_at": time.time(),
+        "kinds": KINDS,
+        "students": index
+    })
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+    summary = {
+        "path": path,
+        "model_version": model_version,
+        "students": len(index),
+        "failed_students": failed,
+        "bytes": HEADER.size + len(header) + offset,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+    print(f"📸 Insight snapshot written: {summary}")
+    return summary
+
+
+class InsightSnapshot:
+    """Read side of the snapshot file, reloaded when the file is replaced"""
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._loaded = None
+
+    def _load(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._signature, self._loaded = None, None
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return self._loaded
+        with self._lock:
+            if signature != self._signature:
+                with open(self.path, 'rb') as f:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, index_length = HEADER.unpack_from(data)
+                if magic != MAGIC:
+                    raise ValueError(f"{self.path} is not an insight snapshot")
+                meta = json.loads(data[HEADER.size:HEADER.size + index_length])
+                # Earlier mappings stay valid for lookups still holding them
+                self._loaded = (meta, data, HEADER.size + index_length)
+                self._signature = signature
+        return self._loaded
+
+    def lookup(self, kind, student_id, fingerprint, model_version):
+        """Stored response bytes for the student, or None if missing or out of date"""
+        loaded = self._load()
+        if loaded is None:
+            return None
+        meta, data, blob_start = loaded
+        entry = meta["students"].get(student_id)
+        if entry is None or entry[0] != fingerprint or meta["model_version"] != model_version:
+            return None
+        position = 1 + 2 * KINDS.index(kind)
+        start = blob_start + entry[position]
+        return data[start:start + entry[position + 1]]
+
+    def stats(self):
+        loaded = self._load()
+        if loaded is None:
+            return {"path": self.path, "available": False}
+        meta = loaded[0]
+        return {
+            "path": self.path,
+            "available": True,
+            "model_version": meta["model_version"],
+            "created_at": meta["created_at"],
+            "students": len(meta["students"])
+        }
+
+
+def students_from_store(store):
+    """[(student_id, [ScoreRow])] for every student in the score store"""
+    return [(student_id, list(map(ScoreRow._make, rows))) for student_id, rows in store.iter_student_rows()]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from model_store import ModelStore, legacy_model_identity
+    from enhanced_ai import EnhancedLMSAI
+    from score_store import ScoreStore, DEFAULT_DB_PATH, DEFAULT_SOURCE_PATH
+
+    parser = argparse.ArgumentParser(description="Build the nightly insight snapshot for every stored student")
+    parser.add_argument('--source', default=DEFAULT_SOURCE_PATH)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--output', default=DEFAULT_SNAPSHOT_PATH)
+    parser.add_argument('--legacy-models', default=os.path.join("models", "enhanced_ai_models.pkl"))
+    args = parser.parse_args()
+
+    store = ScoreStore(args.db)
+    store.ensure_current(args.source)
+
+    model_store = ModelStore()
+    version = model_store.current_version()
+    if version:
+        ai = model_store.load(version)
+    else:
+        ai = EnhancedLMSAI()
+        if os.path.exists(args.legacy_models):
+            ai.load_models(args.legacy_models)
+        version = legacy_model_identity(args.legacy_models)
+
+    build_snapshot(ai, version, students_from_store(store), args.output)
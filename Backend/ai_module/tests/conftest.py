@@ -0,0 +1,28 @@
+import os
+import sys
+
+# The service modules import each other flat and read their data files relative to this directory
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODULE_DIR)
+os.chdir(MODULE_DIR)
+os.environ.setdefault("AI_TRACE_FILE", "off")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def main_module(tmp_path_factory):
+    import main
+
+    # Models trained on demand during the tests are saved outside the source tree
+    main.models_path = str(tmp_path_factory.mktemp("models") / "enhanced_ai_models.pkl")
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(main_module):
+    from fastapi.testclient import TestClient
+
+    # One client for the session: every request shares the app's event loop
+    with TestClient(main_module.app) as client:
+        yield client
@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from admission import AdmissionGroup, Overloaded
+
+
+def test_trained_model_burst_is_not_shed(main_module, client):
+    if main_module.enhanced_ai.grading_model is None:
+        main_module.enhanced_ai.train_grading_model(main_module.load_training_data())
+    body = {"topic": "Mathematics", "assignment_type": "quiz", "max_score": 100}
+
+    with ThreadPoolExecutor(30) as pool:
+        statuses = list(pool.map(lambda _: client.post("/auto-grade", json=body).status_code, range(30)))
+
+    assert statuses == [200] * 30
+
+
+def test_sheds_with_retry_after_when_queue_is_full():
+    async def scenario():
+        group = AdmissionGroup("test", max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            started = await group.enter()
+            await release.wait()
+            group.leave(started)
+
+        running = asyncio.create_task(hold())
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert (group.active, group.waiting) == (1, 1)
+        with pytest.raises(Overloaded) as shed:
+            await group.enter()
+        release.set()
+        await asyncio.gather(running, queued)
+        return shed.value, group
+
+    shed, group = asyncio.run(scenario())
+    assert shed.status_code == 503
+    assert int(shed.headers["Retry-After"]) >= 1
+    assert (group.active, group.waiting) == (0, 0)
+
+
+def test_heuristic_fallback_when_over_capacity():
+    async def scenario():
+        group = AdmissionGroup("test", max_concurrency=1, max_queue=0, overload="heuristic")
+        started = await group.enter()
+        answer = await group.run(lambda: "model", fallback=lambda: "heuristic")
+        group.leave(started)
+        return answer, await group.run(lambda: "model", fallback=lambda: "heuristic")
+
+    assert asyncio.run(scenario()) == ("heuristic", "model")
+
+
+def test_stream_holds_a_slot_only_while_iterated():
+    async def scenario():
+        group = AdmissionGroup("test", max_concurrency=1, max_queue=0)
+        group.admit()
+        group.stream(iter([b"never sent"]))
+        unsent = group.active
+
+        body = group.stream(iter([b"a", b"b"]))
+        first = await body.__anext__()
+        during = group.active
+        await body.aclose()
+        return unsent, first, during, group.active
+
+    assert asyncio.run(scenario()) == (0, b"a", 1, 0)
+
+
+def test_streamed_class_analysis_releases_its_slot(main_module, client):
+    group = main_module.admission_groups["class_analysis"]
+    data = main_module.load_training_data()
+    students = [{"student_id": student_id, "scores": data[student_id]} for student_id in list(data)[:5]]
+
+    response = client.post("/analyze-class-performance?stream=true", json=students)
+
+    assert response.status_code == 200
+    assert response.text.splitlines()[-1].startswith('{"type":"class_statistics"')
+    assert (group.active, group.waiting) == (0, 0)
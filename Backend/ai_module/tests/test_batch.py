@@ -0,0 +1,40 @@
+GRADING_BODY = {"topic": "Mathematics", "assignment_type": "quiz", "max_score": 100}
+
+
+def test_batch_items_keep_their_callers_request_ids(client):
+    requests = [
+        {"endpoint": "/auto-grade", "body": GRADING_BODY, "request_id": "caller-1"},
+        {"endpoint": "/auto-grade", "body": GRADING_BODY},
+        {"endpoint": "/not-batchable", "body": {}, "request_id": "caller-3"}
+    ]
+
+    response = client.post("/batch", json={"requests": requests}, headers={"X-Request-ID": "batch-1"})
+
+    results = response.json()["responses"]
+    assert [r["status"] for r in results] == [200, 200, 404]
+    assert results[0]["request_id"] == "caller-1"
+    assert results[2]["request_id"] == "caller-3"
+    assert results[1]["request_id"] not in ("caller-1", "batch-1")
+    assert all("total;dur=" in r["server_timing"] for r in results)
+
+
+def test_batch_runs_calls_concurrently(main_module, client, monkeypatch):
+    import asyncio
+
+    running = {"now": 0, "peak": 0}
+
+    async def slow_item(item):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return 200, {"endpoint": item.endpoint}
+
+    monkeypatch.setattr(main_module, "run_batch_item", slow_item)
+    monkeypatch.setattr(main_module, "BATCH_CONCURRENCY", 3)
+    requests = [{"endpoint": "/study-plan", "body": {"n": i}} for i in range(10)]
+
+    response = client.post("/batch", json={"requests": requests})
+
+    assert [r["status"] for r in response.json()["responses"]] == [200] * 10
+    assert running["peak"] == 3
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def students():
+    with open("ai_training_data.json") as f:
+        data = json.load(f)
+    return [{"student_id": student_id, "scores": scores} for student_id, scores in list(data.items())[:7]]
+
+
+def ndjson(body):
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_stream_matches_the_buffered_analysis(client, students):
+    buffered = client.post("/analyze-class-performance", json=students)
+    streamed = client.post("/analyze-class-performance?stream=true", json=students)
+    assert buffered.status_code == streamed.status_code == 200
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+
+    expected = buffered.json()
+    lines = ndjson(streamed.content)
+    assert [line["type"] for line in lines] == ["student"] * len(students) + ["class_statistics"]
+    assert [{k: v for k, v in line.items() if k != "type"} for line in lines[:-1]] == expected["student_analyses"]
+    trailer = lines[-1]
+    assert trailer["total_students"] == trailer["analyzed_students"] == len(students)
+    statistics = trailer["class_statistics"]
+    assert statistics.pop("average_performance") == pytest.approx(
+        expected["class_statistics"].pop("average_performance"))
+    assert statistics == expected["class_statistics"]
+
+
+def test_accept_header_selects_the_stream(client, students):
+    response = client.post("/analyze-class-performance", json=students[:2],
+                           headers={"Accept": "application/x-ndjson"})
+
+    assert ndjson(response.content)[-1]["type"] == "class_statistics"
+
+
+def test_chunk_size_does_not_change_the_stream(main_module, students):
+    whole = b"".join(main_module.stream_class_analysis(students, chunk_size=len(students)))
+    chunks = list(main_module.stream_class_analysis(students, chunk_size=2))
+
+    # Four student chunks of up to two lines, then the trailer
+    assert len(chunks) == 5
+    assert b"".join(chunks) == whole
+
+
+def test_failed_students_become_error_lines(main_module, students):
+    broken = [students[0], {"student_id": "broken", "scores": [{"score": 50}]}, students[1]]
+
+    lines = ndjson(b"".join(main_module.stream_class_analysis(broken, chunk_size=2)))
+
+    assert [line["type"] for line in lines] == ["student", "error", "student", "class_statistics"]
+    assert lines[1]["student_id"] == "broken"
+    assert (lines[-1]["total_students"], lines[-1]["analyzed_students"]) == (3, 2)
+    analyzed = [line["overall_performance"] for line in lines if line["type"] == "student"]
+    assert lines[-1]["class_statistics"]["average_performance"] == pytest.approx(sum(analyzed) / 2)
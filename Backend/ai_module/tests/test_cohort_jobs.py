@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+import pytest
+
+from class_analysis import add_to_class_statistics, analyze_class_student, new_class_statistics
+from cohort_jobs import JOB_FILENAME, CohortJobManager
+from enhanced_ai import EnhancedLMSAI
+
+
+@pytest.fixture(scope="module")
+def students():
+    with open("ai_training_data.json") as f:
+        data = json.load(f)
+    return [{"student_id": student_id, "scores": scores} for student_id, scores in list(data.items())[:7]]
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = CohortJobManager(root=str(tmp_path / "jobs"), workers=1, page_size=3)
+    yield manager
+    manager.shutdown()
+
+
+def wait_for_job(manager, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = manager.status(job_id)
+        if job["state"] not in ("queued", "running"):
+            return job
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_pages_and_summary_match_a_single_pass(manager, students):
+    job = wait_for_job(manager, manager.submit(students)["job_id"])
+
+    assert job["state"] == "completed"
+    assert (job["pages"], job["completed_pages"]) == (3, 3)
+    pages = [json.loads(manager.page(job["job_id"], page)) for page in range(job["pages"])]
+    assert [len(page["students"]) for page in pages] == [3, 3, 1]
+    analyzed = [student for page in pages for student in page["students"]]
+    assert [student["student_id"] for student in analyzed] == [student["student_id"] for student in students]
+
+    # The coordinator's merge of the page statistics equals one pass over every student
+    ai = EnhancedLMSAI(feature_cache_dir=None)
+    expected = new_class_statistics()
+    performances = []
+    for student_data in students:
+        analysis = analyze_class_student(ai, student_data)
+        add_to_class_statistics(expected, analysis)
+        performances.append(analysis["overall_performance"])
+    summary = job["summary"]
+    assert (summary["analyzed_students"], summary["failed_students"]) == (7, 0)
+    statistics = summary["class_statistics"]
+    assert statistics.pop("average_performance") == pytest.approx(sum(performances) / len(performances))
+    expected.pop("average_performance")
+    assert statistics == expected
+
+
+def test_failed_students_are_reported_without_failing_the_job(manager, students):
+    broken = [students[0], {"student_id": "broken", "scores": [{"score": 50}]}, students[1]]
+
+    job = wait_for_job(manager, manager.submit(broken, page_size=2)["job_id"])
+
+    assert job["state"] == "completed"
+    assert (job["summary"]["analyzed_students"], job["summary"]["failed_students"]) == (2, 1)
+    analyzed = [student for page in (0, 1) for student in json.loads(manager.page(job["job_id"], page))["students"]]
+    assert analyzed[1]["student_id"] == "broken" and "error" in analyzed[1]
+    # The average covers the analyzed students only
+    performances = [analyzed[0]["overall_performance"], analyzed[2]["overall_performance"]]
+    assert job["summary"]["class_statistics"]["average_performance"] == pytest.approx(sum(performances) / 2)
+
+
+def test_unfinished_jobs_are_marked_interrupted_on_start(tmp_path):
+    root = tmp_path / "jobs"
+    job_id = "0" * 32
+    os.makedirs(root / job_id)
+    (root / job_id / JOB_FILENAME).write_text(json.dumps({"job_id": job_id, "state": "running"}))
+
+    job = CohortJobManager(root=str(root)).status(job_id)
+
+    assert job["state"] == "interrupted"
+
+
+def test_status_and_pages_of_unknown_jobs(manager):
+    assert manager.status("../etc") is None
+    assert manager.status("f" * 32) is None
+    assert manager.page("f" * 32, 0) is None
+
+
+def test_load_students_filters_classes_and_stays_in_the_data_dir(tmp_path):
+    (tmp_path / "cohort.json").write_text(json.dumps({
+        "class1_a": [{"score": 1}], "class1_b": [{"score": 2}], "class2_a": [{"score": 3}]
+    }))
+    manager = CohortJobManager(root=str(tmp_path / "jobs"), data_file="cohort.json", data_dir=str(tmp_path))
+
+    assert [s["student_id"] for s in manager.load_students(["class1"])] == ["class1_a", "class1_b"]
+    assert len(manager.load_students()) == 3
+    with pytest.raises(ValueError):
+        manager.load_students(data_file="../outside.json")
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from columnar import COLUMNAR_JSON, msgpack
+
+COLUMNS = ("topic", "score", "max_score", "date", "assignment_type")
+
+
+@pytest.fixture(scope="module")
+def history():
+    with open("ai_training_data.json") as f:
+        student_id, scores = next(iter(json.load(f).items()))
+    return student_id, [{
+        "student_id": student_id,
+        "topic": score["topic"],
+        "score": score["score"],
+        "max_score": score["maxScore"],
+        "date": score["date"],
+        "assignment_type": score["assignmentType"]
+    } for score in scores]
+
+
+@pytest.mark.parametrize("path", ["/analyze-performance", "/analyze-behavior", "/optimize-learning-path"])
+def test_columnar_and_msgpack_bodies_match_score_objects(client, history, path):
+    student_id, scores = history
+    columnar = {"student_id": student_id, "columns": {name: [score[name] for score in scores] for name in COLUMNS}}
+
+    expected = client.post(path, json={"student_id": student_id, "scores": scores})
+    as_columns = client.post(path, content=json.dumps(columnar), headers={"content-type": COLUMNAR_JSON})
+
+    assert expected.status_code == 200
+    assert as_columns.json() == expected.json()
+    if msgpack is not None:
+        as_msgpack = client.post(path, content=msgpack.packb(columnar), headers={"content-type": "application/msgpack"})
+        assert as_msgpack.json() == expected.json()
+
+
+def test_columns_of_different_lengths_are_rejected(client, history):
+    student_id, scores = history
+    columns = {name: [score[name] for score in scores] for name in COLUMNS}
+    columns["score"] = columns["score"][:-1]
+
+    response = client.post("/analyze-performance", content=json.dumps({"student_id": student_id, "columns": columns}),
+                           headers={"content-type": COLUMNAR_JSON})
+
+    assert response.status_code == 422
+
+
+SCORE_ENDPOINTS = ["/analyze-performance", "/comprehensive-insights", "/behavior-analysis", "/content-recommendations",
+                   "/learning-path", "/study-plan", "/optimize-learning-path", "/analyze-behavior"]
+
+
+@pytest.mark.parametrize("path", SCORE_ENDPOINTS)
+def test_score_endpoints_document_their_request_bodies(client, path):
+    body = client.get("/openapi.json").json()["paths"][path]["post"]["requestBody"]
+    content = body["content"]
+
+    plain = content["application/json"]["schema"]
+    assert {"student_id", "scores"} <= set(plain["required"])
+    assert plain["properties"]["scores"]["items"]["required"] == [
+        "student_id", "topic", "score", "max_score", "date", "assignment_type"]
+    for content_type in (COLUMNAR_JSON, "application/msgpack"):
+        columnar = content[content_type]["schema"]
+        assert "scores" not in columnar["properties"]
+        assert set(columnar["properties"]["columns"]["required"]) == {
+            "topic", "score", "max_score", "date", "assignment_type"}
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from compact_forest import MIN_CLASS_AGREEMENT, REGRESSION_TOLERANCE, CompactForest, compare_predictions
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(2000, 6))
+    y = X[:, 0] * 40 + X[:, 1] ** 2 * 10 + rng.normal(scale=5, size=len(X)) + 70
+    labels = np.digitize(X[:, 0] + X[:, 2] * 0.5, (-0.5, 0.5))
+    return X[:1500], X[1500:], y[:1500], labels[:1500]
+
+
+def test_positive_regressor_uses_float16_leaves_within_tolerance(dataset):
+    X_train, X_test, y, _ = dataset
+    # Percent-style targets, like the performance and grading models
+    forest = RandomForestRegressor(n_estimators=30, random_state=0).fit(X_train, np.clip(y, 0, 100))
+    compact = CompactForest.from_forest(forest)
+
+    result = compare_predictions(forest, compact, X_test)
+
+    assert compact.leaf_values.dtype == np.float16
+    assert result["within_tolerance"]
+    assert result["max_relative_error"] <= REGRESSION_TOLERANCE
+    assert compact.nbytes < sum(e.tree_.__getstate__()["nodes"].nbytes for e in forest.estimators_)
+
+
+def test_mixed_sign_regressor_keeps_exact_leaves(dataset):
+    X_train, X_test, y, _ = dataset
+    # Averages of large leaves of both signs can be near zero, where float16 rounding would exceed the tolerance
+    forest = RandomForestRegressor(n_estimators=30, random_state=0).fit(X_train, y - 70)
+    compact = CompactForest.from_forest(forest)
+
+    result = compare_predictions(forest, compact, X_test)
+
+    assert compact.leaf_values.dtype == np.float64
+    assert result["max_relative_error"] <= REGRESSION_TOLERANCE
+
+
+def test_classifier_agrees_with_the_original(dataset):
+    X_train, X_test, _, labels = dataset
+    forest = RandomForestClassifier(n_estimators=30, random_state=0).fit(X_train, labels)
+    compact = CompactForest.from_forest(forest)
+
+    result = compare_predictions(forest, compact, X_test)
+
+    assert result["agreement"] >= MIN_CLASS_AGREEMENT
+    assert np.allclose(compact.predict_proba(X_test), forest.predict_proba(X_test), atol=1 / 255)
+
+
+def test_exact_early_exit_matches_the_full_vote(dataset):
+    X_train, X_test, _, labels = dataset
+    forest = RandomForestClassifier(n_estimators=50, random_state=0).fit(X_train, labels)
+    compact = CompactForest.from_forest(forest)
+    full = compact.predict(X_test)
+
+    evaluated = []
+    for row, expected in zip(X_test, full):
+        label, trees = compact.predict_early_exit(row[None, :])
+        assert label == expected
+        evaluated.append(trees)
+
+    assert max(evaluated) <= compact.n_estimators
+    # Clear-cut rows stop before the last block
+    assert min(evaluated) < compact.n_estimators
+
+
+def test_early_exit_takes_one_row(dataset):
+    X_train, X_test, _, labels = dataset
+    compact = CompactForest.from_forest(RandomForestClassifier(n_estimators=5, random_state=0).fit(X_train, labels))
+
+    with pytest.raises(ValueError):
+        compact.predict_early_exit(X_test[:2])
@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pytest
+
+from compact_forest import compact_model
+from enhanced_ai import EnhancedLMSAI
+from metrics import TREES_EVALUATED
+
+
+@pytest.fixture(scope="module")
+def trained():
+    with open("ai_training_data.json") as f:
+        data = json.load(f)
+    ai = EnhancedLMSAI(feature_cache_dir=None, early_exit="off")
+    ai.train_risk_classification_model(data)
+    ai.train_behavioral_model(data)
+    return ai, [scores for scores in data.values() if len(scores) >= 3]
+
+
+def voting(trained, early_exit, compact=False):
+    source, _ = trained
+    ai = EnhancedLMSAI(feature_cache_dir=None, early_exit=early_exit)
+    convert = compact_model if compact else (lambda model: model)
+    ai.risk_model, ai.behavioral_model = convert(source.risk_model), convert(source.behavioral_model)
+    ai.scaler = source.scaler
+    return ai
+
+
+def predictions(ai, histories):
+    return [(ai.predict_risk_level(scores), ai.analyze_behavior(scores)["learning_style"]) for scores in histories]
+
+
+def trees_observed(model_family):
+    counts = TREES_EVALUATED._merged().get((model_family,), [0, 0])
+    return sum(counts[:-1]), counts[-1]
+
+
+def test_exact_early_exit_matches_the_full_vote(trained):
+    _, histories = trained
+    # Voting runs on the compact form of the forests, so compare against a full vote of that form
+    full = predictions(voting(trained, "off", compact=True), histories)
+
+    assert predictions(voting(trained, "exact"), histories) == full
+    assert predictions(voting(trained, "exact", compact=True), histories) == full
+
+
+def test_confidence_early_exit_walks_fewer_trees(trained):
+    _, histories = trained
+    full = predictions(voting(trained, "off", compact=True), histories)
+
+    observed, trees = trees_observed("risk")
+    exact = predictions(voting(trained, "exact"), histories)
+    exact_observed, exact_trees = trees_observed("risk")
+    confident = predictions(voting(trained, "confidence"), histories)
+    confident_observed, confident_trees = trees_observed("risk")
+
+    # One observation per single-row classification
+    assert exact_observed - observed == confident_observed - exact_observed == len(histories)
+    assert confident_trees - exact_trees <= exact_trees - trees < len(histories) * trained[0].risk_model.n_estimators
+    agreement = np.mean([a == b for a, b in zip(confident, full)])
+    assert agreement >= 0.95
+    assert exact == full
+
+
+def test_off_counts_every_tree(trained):
+    _, histories = trained
+    ai = voting(trained, "off")
+    observed, trees = trees_observed("behavioral")
+
+    ai.analyze_behavior(histories[0])
+
+    assert trees_observed("behavioral") == (observed + 1, trees + ai.behavioral_model.n_estimators)
+
+
+def test_voting_forest_follows_a_replaced_model(trained):
+    _, histories = trained
+    ai = voting(trained, "exact")
+    ai.predict_risk_level(histories[0])
+    first = ai._voting_forests["risk"]
+    ai.predict_risk_level(histories[1])
+    assert ai._voting_forests["risk"] is first
+
+    # Retraining swaps in a new model; its votes must not come from the old forest
+    ai.risk_model = ai.new_model("risk", classifier=True).fit(
+        np.random.default_rng(0).normal(size=(60, 3)), np.arange(60) % 3)
+    ai.predict_risk_level(histories[0])
+    assert ai._voting_forests["risk"][0] is ai.risk_model
+
+
+def test_gradient_boosting_models_skip_early_exit(trained):
+    _, histories = trained
+    ai = EnhancedLMSAI(feature_cache_dir=None, model_families="hist_gradient_boosting", early_exit="exact")
+    ai.risk_model = ai.new_model("risk", classifier=True).fit(
+        np.random.default_rng(0).normal(size=(60, 3)), np.arange(60) % 3)
+    ai.scaler = trained[0].scaler
+    observed = trees_observed("risk")
+
+    assert ai.predict_risk_level(histories[0]) in ("low", "medium", "high")
+    assert trees_observed("risk") == observed
+    assert "risk" not in ai._voting_forests
+
+
+def test_unknown_modes_are_rejected():
+    with pytest.raises(ValueError):
+        EnhancedLMSAI(feature_cache_dir=None, early_exit="sometimes")
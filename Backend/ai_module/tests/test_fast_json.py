@@ -0,0 +1,54 @@
+import importlib
+import json
+import sys
+
+import numpy as np
+import pytest
+
+import fast_json
+from fast_json import FastJSONResponse
+
+
+def test_numpy_values_serialize_like_their_python_equivalents():
+    content = {
+        "score": np.float64(72.5),
+        "count": np.int64(3),
+        "passed": np.bool_(True),
+        "history": np.array([1.5, 2.5]),
+        "nested": [{"rank": np.int32(1)}],
+        1: "non-string key",
+    }
+
+    assert json.loads(fast_json.dumps(content)) == {
+        "score": 72.5, "count": 3, "passed": True, "history": [1.5, 2.5], "nested": [{"rank": 1}],
+        "1": "non-string key",
+    }
+
+
+def test_non_finite_floats_become_null():
+    assert json.loads(fast_json.dumps({"a": np.float64("nan"), "b": np.float32("inf")})) == {"a": None, "b": None}
+
+
+def test_unknown_types_are_rejected():
+    with pytest.raises(TypeError):
+        fast_json.dumps({"value": object()})
+
+
+def test_response_body_is_compact_json():
+    response = FastJSONResponse({"rows": [np.float64(1.0), 2]})
+
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"rows": [1.0, 2]}
+
+
+def test_fallback_without_orjson_produces_the_same_json(monkeypatch):
+    content = {"score": np.float64(72.5), "missing": np.float64("nan"), "history": np.array([1.0, np.nan])}
+    expected = json.loads(fast_json.dumps(content))
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    try:
+        fallback = importlib.reload(fast_json)
+        assert fallback.orjson is None
+        assert json.loads(fallback.dumps(content)) == expected
+    finally:
+        monkeypatch.undo()
+        importlib.reload(fast_json)
@@ -0,0 +1,67 @@
+import json
+
+import numpy as np
+import pytest
+
+from enhanced_ai import EnhancedLMSAI
+from features import STUDENT, build_training_features
+
+
+def baseline_student_row(scores):
+    """The per-student features as EnhancedLMSAI computed them before the shared feature matrices"""
+    values = [s['score'] for s in scores]
+    by_date = sorted(scores, key=lambda s: s['date'])
+    half = len(by_date) // 2
+    improvement_rate = (
+        (np.mean([s['score'] for s in by_date[half:]]) - np.mean([s['score'] for s in by_date[:half]])) / 100
+        if len(scores) >= 2 else 0
+    )
+    return [
+        np.mean(values),
+        np.std(values),
+        (values[-1] - values[-3]) / 3 if len(values) >= 3 else 0,
+        len({s['topic'] for s in scores}),
+        len({s['assignmentType'] for s in scores}),
+        improvement_rate
+    ]
+
+
+def synthetic_data(seed=5):
+    rng = np.random.default_rng(seed)
+    data = {}
+    # Lengths around NumPy's pairwise-summation block sizes, where summation order matters most
+    for i, length in enumerate([1, 2, 3, 7, 8, 9, 15, 16, 17, 127, 128, 129, 300, 1000] * 3):
+        data[f"s{i}"] = [{
+            'score': float(rng.uniform(0, 100)) if rng.random() < 0.7 else int(rng.integers(0, 101)),
+            'maxScore': 100,
+            'topic': f"t{rng.integers(6)}",
+            'assignmentType': ("quiz", "exam", "assignment")[rng.integers(3)],
+            'date': f"2024-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}"
+        } for _ in range(length)]
+    return data
+
+
+@pytest.mark.parametrize("source", ["training", "synthetic"])
+def test_student_features_equal_the_baseline_per_student_code(source):
+    if source == "training":
+        with open("ai_training_data.json") as f:
+            data = json.load(f)
+    else:
+        data = synthetic_data()
+
+    students = build_training_features(data).students
+    expected = np.array([baseline_student_row(scores) for scores in data.values()])
+    columns = [STUDENT[name] for name in
+               ("mean", "std", "trend", "topic_diversity", "assignment_types", "improvement_rate")]
+
+    np.testing.assert_array_equal(students[:, columns], expected)
+
+
+def test_performance_model_trains_on_the_baseline_features():
+    with open("ai_training_data.json") as f:
+        data = json.load(f)
+    X, y = EnhancedLMSAI(feature_cache_dir=None).training_set("performance", data)
+
+    expected = np.array([baseline_student_row(scores)[:5] for scores in data.values() if len(scores) >= 3])
+    np.testing.assert_array_equal(X, expected)
+    np.testing.assert_array_equal(y, expected[:, 0])
@@ -0,0 +1,117 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from enhanced_ai import GRADING_TABLE_MAX_SCORES, EnhancedLMSAI
+from metrics import CACHE_REQUESTS
+
+
+@pytest.fixture(scope="module")
+def ai():
+    with open("ai_training_data.json") as f:
+        data = json.load(f)
+    ai = EnhancedLMSAI(feature_cache_dir=None)
+    assert ai.train_grading_model(data)
+    return ai
+
+
+def model_grade(model, topic, assignment_type, max_score):
+    """The model prediction auto_grade_assignment made before the table existed"""
+    features = [hash(topic) % 100, hash(assignment_type) % 10, datetime.now().weekday(), max_score]
+    return max(0, min(max_score, model.predict(np.array([features]))[0]))
+
+
+@pytest.mark.parametrize("max_score", GRADING_TABLE_MAX_SCORES)
+def test_table_lookups_match_the_model(ai, max_score):
+    for topic in ("Mathematics", "English", "Physics"):
+        for assignment_type in ("quiz", "exam", "homework"):
+            assignment = {"topic": topic, "assignmentType": assignment_type, "maxScore": max_score}
+            assert ai.auto_grade_assignment(assignment) == pytest.approx(
+                model_grade(ai.grading_model, topic, assignment_type, max_score))
+
+
+def test_other_max_scores_fall_back_to_the_model(ai):
+    assignment = {"topic": "Mathematics", "assignmentType": "quiz", "maxScore": 37}
+
+    assert 37.0 not in ai._grading_table_index
+    assert ai.auto_grade_assignment(assignment) == model_grade(ai.grading_model, "Mathematics", "quiz", 37)
+
+
+def test_table_is_rebuilt_for_a_replaced_model(ai):
+    retrained = EnhancedLMSAI(feature_cache_dir=None)
+    retrained.grading_model = ai.grading_model
+    assignment = {"topic": "Mathematics", "assignmentType": "quiz", "maxScore": 100}
+
+    # Loaded or assigned models have no table yet; the first grade builds it
+    assert retrained._grading_table_model is None
+    grade = retrained.auto_grade_assignment(assignment)
+    assert retrained._grading_table_model is ai.grading_model
+    assert grade == pytest.approx(model_grade(ai.grading_model, "Mathematics", "quiz", 100))
+
+
+def test_untrained_grading_returns_none():
+    ai = EnhancedLMSAI(feature_cache_dir=None)
+
+    assert ai.auto_grade_assignment({"topic": "Mathematics"}) is None
+    ai.build_grading_table()
+    assert ai._grading_table is None and ai._grading_table_index == {}
+
+
+SUBMISSIONS = [
+    ("Mathematics", "quiz", 100), ("English", "exam", 37), ("Mathematics", "quiz", 20),
+    ("Physics", "homework", 100), ("English", "exam", 12.5), ("Mathematics", "quiz", 100),
+]
+
+
+def test_batch_matches_single_grades(ai):
+    topics, assignment_types, max_scores = zip(*SUBMISSIONS)
+
+    grades = ai.auto_grade_batch(list(topics), list(assignment_types), list(max_scores))
+
+    assert grades.tolist() == [
+        ai.auto_grade_assignment({"topic": topic, "assignmentType": assignment_type, "maxScore": max_score})
+        for topic, assignment_type, max_score in SUBMISSIONS
+    ]
+
+
+def test_batch_records_table_hits_and_misses(ai):
+    def counts():
+        merged = CACHE_REQUESTS._merged()
+        return merged.get(("grading_table", "hit"), 0), merged.get(("grading_table", "miss"), 0)
+
+    hits, misses = counts()
+    ai.auto_grade_batch(*map(list, zip(*SUBMISSIONS)))
+
+    assert counts() == (hits + 4, misses + 2)
+
+
+def test_empty_and_untrained_batches(ai):
+    assert len(ai.auto_grade_batch([], [], [])) == 0
+    assert EnhancedLMSAI(feature_cache_dir=None).auto_grade_batch(["Mathematics"], ["quiz"], [100]) is None
+
+
+def test_batch_endpoint_matches_single_calls(client):
+    submissions = [
+        {"topic": topic, "assignment_type": assignment_type, "max_score": max_score, "student_id": f"s{i}"}
+        for i, (topic, assignment_type, max_score) in enumerate(SUBMISSIONS)
+    ]
+
+    response = client.post("/auto-grade/batch", json={"submissions": submissions})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == len(submissions)
+    for submission, result in zip(submissions, body["results"]):
+        single = client.post("/auto-grade", json=submission).json()
+        assert result == {**single, "student_id": submission["student_id"]}
+
+
+def test_batch_endpoint_rejects_oversized_batches(main_module, client, monkeypatch):
+    monkeypatch.setattr(main_module, "MAX_GRADING_BATCH_SIZE", 2)
+    submission = {"topic": "Mathematics", "assignment_type": "quiz"}
+
+    response = client.post("/auto-grade/batch", json={"submissions": [submission] * 3})
+
+    assert response.status_code == 413
@@ -0,0 +1,23 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from load_test import PayloadFactory, asgi_transport, run_load
+
+
+def test_app_exceptions_are_recorded_as_server_errors():
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        raise ValueError("Out of range float values are not JSON compliant")
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=asgi_transport(app), base_url="http://ai-service") as client:
+            return await run_load(client, {"health": 1}, PayloadFactory(), concurrency=2, total_requests=6)
+
+    stats, _ = asyncio.run(scenario())
+
+    assert stats["health"].status_codes == {500: 6}
+    assert stats["health"].errors == 6
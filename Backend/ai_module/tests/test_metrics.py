@@ -0,0 +1,10 @@
+def test_templated_routes_are_labelled_by_template(client):
+    client.get("/jobs/" + "0" * 32)
+    client.get("/students/nobody/performance")
+    client.get("/no-such-route")
+
+    text = client.get("/metrics").text
+
+    assert 'route="/jobs/{job_id}"' in text
+    assert 'route="/students/{student_id}/performance"' in text
+    assert 'route="other"' in text
@@ -0,0 +1,81 @@
+import json
+
+import joblib
+import pytest
+from sklearn.ensemble import (
+    HistGradientBoostingClassifier, HistGradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor
+)
+
+from enhanced_ai import DEFAULT_MODEL_FAMILY, MODEL_TASKS, EnhancedLMSAI, parse_model_families
+from model_store import MANIFEST_FILENAME, ModelStore
+
+
+@pytest.fixture(scope="module")
+def data():
+    with open("ai_training_data.json") as f:
+        return json.load(f)
+
+
+def test_parse_model_families():
+    assert parse_model_families("") == dict.fromkeys(MODEL_TASKS, DEFAULT_MODEL_FAMILY)
+    assert parse_model_families("hist_gradient_boosting") == dict.fromkeys(MODEL_TASKS, "hist_gradient_boosting")
+    assert parse_model_families(" risk = hist_gradient_boosting , grading=hist_gradient_boosting") == {
+        "performance": "random_forest", "risk": "hist_gradient_boosting",
+        "grading": "hist_gradient_boosting", "behavioral": "random_forest",
+    }
+    with pytest.raises(ValueError):
+        parse_model_families("risk=linear")
+    with pytest.raises(ValueError):
+        parse_model_families("ranking=random_forest")
+
+
+def test_families_come_from_the_environment_unless_given(monkeypatch):
+    monkeypatch.setenv("AI_MODEL_FAMILIES", "performance=hist_gradient_boosting")
+
+    assert EnhancedLMSAI(feature_cache_dir=None).model_families["performance"] == "hist_gradient_boosting"
+    assert EnhancedLMSAI(feature_cache_dir=None, model_families={}).model_families["performance"] == "random_forest"
+    assert EnhancedLMSAI(feature_cache_dir=None, model_families="random_forest").model_families["performance"] == \
+        "random_forest"
+
+
+def test_new_model_uses_the_task_family():
+    ai = EnhancedLMSAI(feature_cache_dir=None, model_families="risk=hist_gradient_boosting")
+
+    assert isinstance(ai.new_model("risk", classifier=True), HistGradientBoostingClassifier)
+    assert isinstance(ai.new_model("risk"), HistGradientBoostingRegressor)
+    assert isinstance(ai.new_model("performance"), RandomForestRegressor)
+    assert isinstance(ai.new_model("behavioral", classifier=True), RandomForestClassifier)
+
+
+def test_gradient_boosting_trains_and_serves_every_task(data, tmp_path):
+    ai = EnhancedLMSAI(feature_cache_dir=None, model_families="hist_gradient_boosting")
+    assert ai.train_performance_model(data)
+    assert ai.train_risk_classification_model(data)
+    assert ai.train_grading_model(data)
+    assert ai.train_behavioral_model(data)
+    scores = next(iter(data.values()))
+
+    assert isinstance(ai.grading_model, HistGradientBoostingRegressor)
+    assert 0 <= ai.predict_performance(scores) <= 100
+    assert ai.predict_risk_level(scores) in ("low", "medium", "high")
+    assert 0 <= ai.auto_grade_assignment({"topic": "Mathematics", "assignmentType": "quiz", "maxScore": 100}) <= 100
+    assert ai.analyze_behavior(scores) is not None
+
+    # The families are saved with the models and listed in the version manifest
+    store = ModelStore(str(tmp_path))
+    version = store.publish(ai, version="v1")
+    with open(tmp_path / version / MANIFEST_FILENAME) as f:
+        assert json.load(f)["model_families"] == ai.model_families
+    loaded = store.load(version)
+    assert loaded.model_families == ai.model_families
+    assert loaded.predict_performance(scores) == ai.predict_performance(scores)
+
+
+def test_files_saved_without_families_load_as_random_forests(tmp_path, monkeypatch):
+    path = str(tmp_path / "models.pkl")
+    joblib.dump({"performance_model": None, "scaler": None}, path)
+    monkeypatch.setenv("AI_MODEL_FAMILIES", "hist_gradient_boosting")
+    ai = EnhancedLMSAI(feature_cache_dir=None)
+
+    assert ai.load_models(path)
+    assert ai.model_families == dict.fromkeys(MODEL_TASKS, DEFAULT_MODEL_FAMILY)
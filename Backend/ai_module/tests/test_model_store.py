@@ -0,0 +1,112 @@
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+from enhanced_ai import EnhancedLMSAI
+from metrics import INFERENCE_LATENCY, SHADOW_INFERENCE_LATENCY
+from model_store import MANIFEST_FILENAME, ModelStore, ShadowScorer
+
+
+@pytest.fixture(scope="module")
+def trained_ai():
+    with open("ai_training_data.json") as f:
+        data = json.load(f)
+    ai = EnhancedLMSAI(feature_cache_dir=None)
+    ai.train_performance_model(data)
+    return ai, data
+
+
+def inference_count(histogram, model_family):
+    return sum(histogram._merged().get((model_family,), [0, 0])[:-1])
+
+
+def test_shadow_scoring_is_kept_out_of_live_inference_metrics(trained_ai):
+    ai, data = trained_ai
+    ml_scores = next(iter(data.values()))
+    scorer = ShadowScorer(sample_rate=1.0)
+    live_before = inference_count(INFERENCE_LATENCY, "performance")
+    shadow_before = inference_count(SHADOW_INFERENCE_LATENCY, "performance")
+
+    scorer._compare(ai, "v1", ai, "v1", ml_scores)
+
+    assert inference_count(INFERENCE_LATENCY, "performance") == live_before
+    assert inference_count(SHADOW_INFERENCE_LATENCY, "performance") == shadow_before + 2
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_shadow_submit_reads_the_pair_under_the_swap_lock(monkeypatch):
+    scorer = ShadowScorer(sample_rate=1.0)
+    compared = []
+    monkeypatch.setattr(scorer, "_compare", lambda *args: compared.append(args[:4]))
+    scorer.configure("old-primary", "v1", "old-candidate", "v2")
+
+    # Hold the lock half-way through a swap, as configure() does during a promotion
+    with scorer._lock:
+        scorer.primary, scorer.primary_version = "new-primary", "v2"
+        submitter = threading.Thread(target=scorer.submit, args=([],))
+        submitter.start()
+        time.sleep(0.05)
+        scorer.candidate, scorer.candidate_version = "new-candidate", "v3"
+    submitter.join(5)
+    wait_for(lambda: compared)
+
+    assert compared == [("new-primary", "v2", "new-candidate", "v3")]
+
+
+def test_shadow_scoring_failures_are_logged(monkeypatch, caplog):
+    scorer = ShadowScorer(sample_rate=1.0)
+
+    def fail(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(scorer, "_compare", fail)
+    scorer.configure("primary", "v1", "candidate", "v2")
+    with caplog.at_level(logging.ERROR, logger="model_store"):
+        assert scorer.submit([])
+        wait_for(lambda: any("Shadow scoring failed" in r.message for r in caplog.records))
+
+
+def test_publish_promote_and_roll_back(tmp_path, trained_ai):
+    ai, data = trained_ai
+    store = ModelStore(str(tmp_path))
+
+    first = store.publish(ai, version="v1", make_current=True)
+    second = store.publish(ai, version="v2", make_candidate=True, compact=True)
+
+    assert store.current_version() == first
+    assert store.candidate_version() == second
+    assert [version["version"] for version in store.list_versions()] == ["v1", "v2"]
+    assert store.list_versions()[1]["compact"] is True
+    # Publishing leaves no temporary directories behind
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["CANDIDATE", "CURRENT", "v1", "v2"]
+
+    store.promote(second)
+    assert store.current_version() == second
+    assert store.candidate_version() is None
+
+    store.promote(first)
+    assert store.current_version() == first
+    ml_scores = next(iter(data.values()))
+    assert store.load(first).predict_performance(ml_scores) == ai.predict_performance(ml_scores)
+
+
+def test_publish_rejects_existing_versions_and_unknown_promotions(tmp_path, trained_ai):
+    ai, _ = trained_ai
+    store = ModelStore(str(tmp_path))
+    store.publish(ai, version="v1")
+
+    with pytest.raises(ValueError):
+        store.publish(ai, version="v1")
+    with pytest.raises(ValueError):
+        store.promote("missing")
+    assert store.current_version() is None
+    assert (tmp_path / "v1" / MANIFEST_FILENAME).exists()
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiler import ProfilerMiddleware, SamplingProfiler
+
+
+def test_admin_token_is_required(monkeypatch):
+    monkeypatch.delenv("AI_ADMIN_TOKEN", raising=False)
+    assert not SamplingProfiler().token_valid(None)
+    assert not SamplingProfiler().token_valid("anything")
+
+    monkeypatch.setenv("AI_ADMIN_TOKEN", "secret")
+    profiler = SamplingProfiler()
+    assert profiler.token_valid("secret")
+    assert not profiler.token_valid("wrong")
+    assert not profiler.token_valid(None)
+
+
+def busy_model_work(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_samples_worker_threads_of_a_profiled_request():
+    profiler = SamplingProfiler(interval_ms=1)
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_model_work, args=(stop,))
+    worker.start()
+
+    profiler.begin()
+    time.sleep(0.1)
+    profiler.end()
+    stop.set()
+    worker.join()
+
+    assert "busy_model_work" in profiler.collapsed()
+
+
+def test_disabled_profiler_ignores_the_profile_header(monkeypatch):
+    monkeypatch.setenv("AI_ADMIN_TOKEN", "secret")
+    profiler = SamplingProfiler()
+    begun = []
+    monkeypatch.setattr(profiler, "begin", lambda: begun.append(True))
+    monkeypatch.setattr(profiler, "end", lambda: None)
+    app = FastAPI()
+    app.get("/ping")(lambda: {"ok": True})
+    app.add_middleware(ProfilerMiddleware, profiler=profiler)
+    headers = {"X-Profile": "1", "X-Admin-Token": "secret"}
+
+    with TestClient(app) as client:
+        assert client.get("/ping", headers=headers).status_code == 200
+        assert begun == []
+        profiler.configure(enabled=True, sample_rate=0)
+        assert client.get("/ping", headers=headers).status_code == 200
+        assert begun == [True]
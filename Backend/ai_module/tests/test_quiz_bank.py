@@ -0,0 +1,11 @@
+import random
+
+from quiz_bank import build_quiz
+
+
+def test_course_questions_keep_the_requested_quiz_type(main_module):
+    quiz = build_quiz(main_module.question_bank, ["Mathematics"], "Practice", "Algebra", "easy", random.Random(1))
+
+    general = [question for question in quiz["questions"]["questions"] if question["subject"] == "General"]
+    assert len(general) == 2
+    assert {question["type"] for question in general} == {"practice"}
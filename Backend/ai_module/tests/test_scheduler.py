@@ -0,0 +1,77 @@
+import threading
+import time
+
+import scheduler as scheduler_module
+from scheduler import BULK, INTERACTIVE, PriorityScheduler
+
+
+def hold(sched, lane, count):
+    for _ in range(count):
+        sched.acquire(lane)
+
+
+def test_bulk_is_capped_below_the_reserved_slots():
+    sched = PriorityScheduler(workers=4, reserved=1, p99_target_ms=250)
+    hold(sched, BULK, 3)
+    started = threading.Event()
+    worker = threading.Thread(target=lambda: (sched.acquire(BULK), started.set()), daemon=True)
+    worker.start()
+    assert not started.wait(0.2)
+    # The reserved slot is still there for interactive work
+    sched.acquire(INTERACTIVE)
+    assert sched.running == {INTERACTIVE: 1, BULK: 3}
+    sched.release(INTERACTIVE)
+    sched.release(BULK)
+    assert started.wait(2)
+
+
+def test_freed_slot_goes_to_waiting_interactive_work_first():
+    sched = PriorityScheduler(workers=2, reserved=0, p99_target_ms=250)
+    hold(sched, BULK, 2)
+    order = []
+
+    def take(lane):
+        sched.acquire(lane)
+        order.append(lane)
+
+    bulk = threading.Thread(target=take, args=(BULK,), daemon=True)
+    bulk.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=take, args=(INTERACTIVE,), daemon=True)
+    interactive.start()
+    time.sleep(0.05)
+    sched.release(BULK)
+    interactive.join(2)
+    time.sleep(0.05)
+    assert order == [INTERACTIVE]
+    sched.release(INTERACTIVE)
+    bulk.join(2)
+    assert order == [INTERACTIVE, BULK]
+
+
+def test_slow_interactive_p99_holds_bulk_to_one_slot():
+    sched = PriorityScheduler(workers=4, reserved=1, p99_target_ms=50)
+    assert sched.bulk_limit() == 3
+    for _ in range(scheduler_module.P99_INTERVAL):
+        sched.observe_interactive(0.2)
+    assert sched.bulk_limit() == 1
+    for _ in range(scheduler_module.LATENCY_WINDOW):
+        sched.observe_interactive(0.001)
+    assert sched.bulk_limit() == 3
+
+
+def test_cap_lifts_once_interactive_traffic_stops(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "LATENCY_WINDOW_SECONDS", 0.2)
+    monkeypatch.setattr(scheduler_module, "P99_REFRESH_SECONDS", 0.05)
+    sched = PriorityScheduler(workers=4, reserved=1, p99_target_ms=50)
+    for _ in range(scheduler_module.P99_INTERVAL):
+        sched.observe_interactive(0.2)
+    hold(sched, BULK, 1)
+    started = threading.Event()
+    worker = threading.Thread(target=lambda: (sched.acquire(BULK), started.set()), daemon=True)
+    worker.start()
+    assert not started.wait(0.05)
+    # No further interactive requests: the slow samples age out and the waiting bulk chunk starts
+    assert started.wait(2)
+    assert sched.bulk_limit() == 3
+    assert sched.stats()["interactive_p99_ms"] is None
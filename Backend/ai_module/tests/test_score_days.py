@@ -0,0 +1,29 @@
+from score_days import day_number, sorted_by_date
+
+
+def history(dates):
+    return [{"student_id": "s1", "topic": "Mathematics", "score": score, "max_score": 100, "date": date,
+             "assignment_type": "quiz"} for date, score in zip(dates, (40, 55, 70, 90))]
+
+
+def test_iso_dates_are_parsed_once_into_day_numbers(main_module):
+    score = main_module.StudentScore(**history(["2024-01-15T09:30:00"])[0])
+
+    assert score.day == day_number("2024-01-15") == 19737
+
+
+def test_other_date_strings_are_still_accepted(main_module, client):
+    scores = history(["15/01/2024", "2024-02-01", "2024-03-01", "2024-04-01"])
+
+    assert main_module.StudentScore(**scores[0]).day is None
+    response = client.post("/analyze-behavior", json={"student_id": "s1", "scores": scores})
+    assert response.status_code == 200
+
+
+def test_histories_with_other_dates_sort_by_the_date_string():
+    ml = [{"score": 1, "date": "2024-02-01", "day": day_number("2024-02-01")},
+          {"score": 2, "date": "15/01/2024", "day": None},
+          {"score": 3, "date": "2024-01-01", "day": day_number("2024-01-01")}]
+
+    assert [s["score"] for s in sorted_by_date(ml)] == [2, 3, 1]
+    assert [s["score"] for s in sorted_by_date([ml[0], ml[2]])] == [3, 1]
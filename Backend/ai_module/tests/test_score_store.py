@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+
+import pytest
+
+import score_store as score_store_module
+from score_store import ScoreStore, class_id_of
+
+
+def score(value, date="2024-01-05", topic="Mathematics"):
+    return {"topic": topic, "score": value, "maxScore": 100, "date": date, "assignmentType": "quiz"}
+
+
+def write_source(path, data, mtime_ns):
+    path.write_text(json.dumps(data))
+    # Pin the mtime so a rewrite within the same clock tick still counts as a change
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "scores.json"
+    write_source(path, {
+        "class2_b": [score(70)],
+        "class1_b": [score(80), score(85, "2024-01-12")],
+        "class1_a": [score(60)],
+        "loner": [score(50)],
+    }, 1_000_000_000)
+    return path
+
+
+def test_class_id_of():
+    assert class_id_of("class1_student4") == "class1"
+    assert class_id_of("class1_student_4") == "class1"
+    assert class_id_of("loner") == ""
+
+
+def test_reads_keep_the_source_order(tmp_path, source):
+    store = ScoreStore(str(tmp_path / "db" / "scores.sqlite3"))
+    assert store.ensure_current(str(source))
+
+    assert [s["score"] for s in store.student_scores("class1_b")] == [80, 85]
+    assert store.student_scores("class1_b")[1]["day"] > store.student_scores("class1_b")[0]["day"]
+    assert store.student_scores("missing") is None
+    assert [s["student_id"] for s in store.class_students(["class1", "class2"])] == ["class1_b", "class1_a", "class2_b"]
+    assert [student_id for student_id, _ in store.iter_student_rows()] == ["class2_b", "class1_b", "class1_a", "loner"]
+    assert store.stats()["students"] == 4
+
+
+def test_rebuilds_only_when_the_source_changes(tmp_path, source):
+    store = ScoreStore(str(tmp_path / "scores.sqlite3"))
+    assert store.ensure_current(str(source))
+    assert not store.ensure_current(str(source))
+    assert [s["score"] for s in store.student_scores("class1_a")] == [60]
+
+    write_source(source, {"class1_a": [score(65), score(90, "2024-01-12")]}, 2_000_000_000)
+    assert store.ensure_current(str(source))
+
+    assert [s["score"] for s in store.student_scores("class1_a")] == [65, 90]
+    assert store.student_scores("class1_b") is None
+
+
+def test_connections_of_other_threads_see_a_rebuild(tmp_path, source):
+    store = ScoreStore(str(tmp_path / "scores.sqlite3"))
+    store.ensure_current(str(source))
+    results = []
+    worker_reads, rebuilt = threading.Event(), threading.Event()
+
+    def reader():
+        results.append(store.student_scores("class1_a"))
+        worker_reads.set()
+        rebuilt.wait(5)
+        results.append(store.student_scores("class1_a"))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    assert worker_reads.wait(5)
+    write_source(source, {"class1_a": [score(99)]}, 2_000_000_000)
+    store.ensure_current(str(source))
+    rebuilt.set()
+    thread.join(5)
+
+    assert [[s["score"] for s in scores] for scores in results] == [[60], [99]]
+
+
+def test_a_new_store_reuses_an_up_to_date_database(tmp_path, source, monkeypatch):
+    path = str(tmp_path / "scores.sqlite3")
+    ScoreStore(path).ensure_current(str(source))
+
+    assert not ScoreStore(path).ensure_current(str(source))
+    # A layout change rebuilds databases written by older versions
+    monkeypatch.setattr(score_store_module, "SCHEMA_VERSION", score_store_module.SCHEMA_VERSION + 1)
+    assert ScoreStore(path).ensure_current(str(source))
+
+
+def test_missing_store_and_source(tmp_path):
+    store = ScoreStore(str(tmp_path / "scores.sqlite3"))
+
+    assert not store.ensure_current(str(tmp_path / "missing.json"))
+    assert store.student_rows("class1_a") == []
+    assert store.class_students(["class1"]) == []
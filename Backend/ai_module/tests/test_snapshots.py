@@ -0,0 +1,78 @@
+from columnar import ScoreRow
+from enhanced_ai import EnhancedLMSAI
+from model_store import UNTRAINED_IDENTITY, legacy_model_identity
+from score_days import day_number
+from snapshots import InsightSnapshot, build_snapshot, score_fingerprint
+
+DATES = ("2024-01-05", "2024-01-12", "2024-01-19", "2024-01-26")
+
+
+def score_rows(values):
+    return [ScoreRow("s1", "Mathematics", float(v), 100.0, d, "quiz", day_number(d)) for v, d in zip(values, DATES)]
+
+
+def test_lookup_matches_fingerprint_and_model_identity(tmp_path):
+    path = str(tmp_path / "insights.snap")
+    scores = score_rows([55, 62, 70, 78])
+    build_snapshot(EnhancedLMSAI(feature_cache_dir=None), "v1", [("s1", scores)], path)
+    snapshot = InsightSnapshot(path)
+    fingerprint = score_fingerprint(scores)
+
+    assert snapshot.lookup("comprehensive_insights", "s1", fingerprint, "v1") is not None
+    assert snapshot.lookup("comprehensive_insights", "s1", fingerprint, "v2") is None
+    assert snapshot.lookup("comprehensive_insights", "s1", score_fingerprint(score_rows([55, 62, 70, 79])), "v1") is None
+    assert snapshot.lookup("comprehensive_insights", "s2", fingerprint, "v1") is None
+
+
+def test_legacy_identity_changes_when_the_model_file_is_rewritten(tmp_path):
+    path = str(tmp_path / "models.pkl")
+    assert legacy_model_identity(path) == UNTRAINED_IDENTITY
+
+    with open(path, "wb") as f:
+        f.write(b"old models")
+    before = legacy_model_identity(path)
+    with open(path, "wb") as f:
+        f.write(b"retrained models")
+
+    assert before != UNTRAINED_IDENTITY
+    assert legacy_model_identity(path) != before
+
+
+def test_request_training_stops_serving_older_snapshots(main_module, monkeypatch):
+    monkeypatch.setattr(main_module, "models_path", "unused.pkl")
+    monkeypatch.setattr(main_module.enhanced_ai, "save_models", lambda path: None)
+    monkeypatch.setattr(main_module, "current_model_version", "v1")
+    monkeypatch.setattr(main_module, "model_identity", "v1")
+
+    main_module.save_trained_models()
+
+    assert main_module.model_identity not in ("v1", UNTRAINED_IDENTITY)
+
+
+def test_cohort_predictions_vote_like_live_predictions():
+    import json
+
+    from metrics import TREES_EVALUATED
+    from snapshots import predict_cohort, to_ml_scores
+
+    with open("ai_training_data.json") as f:
+        data = json.load(f)
+    ai = EnhancedLMSAI(feature_cache_dir=None, early_exit="confidence")
+    ai.train_risk_classification_model(data)
+    ai.train_behavioral_model(data)
+    histories = [
+        [ScoreRow(student_id, s["topic"], float(s["score"]), float(s["maxScore"]), s["date"],
+                  s["assignmentType"], day_number(s["date"])) for s in scores]
+        for student_id, scores in list(data.items())[:40]
+    ]
+    before = TREES_EVALUATED._merged().get(("behavioral",), [0])[:-1]
+
+    cohort = predict_cohort(ai, histories)
+
+    after = TREES_EVALUATED._merged()[("behavioral",)][:-1]
+    assert sum(after) - sum(before) == sum(len(h) >= 3 for h in histories)
+    for history, predicted in zip(histories, cohort):
+        ml_scores = to_ml_scores(history)
+        assert predicted["risk"] == ai.predict_risk_level(ml_scores)
+        live = ai.analyze_behavior(ml_scores)
+        assert (predicted["behavior"] or {}).get("learning_style") == (live or {}).get("learning_style")
@@ -0,0 +1,86 @@
+import json
+import logging
+import time
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from fast_json import FastJSONResponse
+from tracing import TracedRoute, TraceWriter, TracingMiddleware, trace_writer_from_env
+
+
+class ListWriter(list):
+    def write(self, record):
+        self.append(record)
+
+
+def traced_app(writer):
+    router = APIRouter(route_class=TracedRoute)
+
+    @router.get("/built")
+    async def built():
+        return FastJSONResponse({"rows": list(range(1000))})
+
+    @router.get("/returned", response_class=FastJSONResponse)
+    async def returned():
+        return {"rows": list(range(1000))}
+
+    @router.get("/plain")
+    async def plain():
+        return {"rows": list(range(1000))}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(TracingMiddleware, writer=writer)
+    return app
+
+
+def test_serialization_is_recorded_once_per_request():
+    writer = ListWriter()
+    with TestClient(traced_app(writer)) as client:
+        for path in ("/built", "/returned", "/plain"):
+            assert client.get(path).status_code == 200
+
+    assert len(writer) == 3
+    for record in writer:
+        names = [span["name"] for span in record["spans"]]
+        assert names.count("serialization") == 1, record["path"]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_trace_file_is_opt_in(monkeypatch, tmp_path):
+    monkeypatch.delenv("AI_TRACE_FILE", raising=False)
+    assert trace_writer_from_env() is None
+
+    monkeypatch.setenv("AI_TRACE_FILE", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setenv("AI_TRACE_MAX_BYTES", "4096")
+    writer = trace_writer_from_env()
+    assert (writer.path, writer.max_bytes) == (str(tmp_path / "traces.jsonl"), 4096)
+
+
+def test_trace_file_rotates_at_its_size_limit(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    writer = TraceWriter(str(path), max_bytes=200)
+
+    writer.write({"request_id": "a" * 250})
+    wait_for(lambda: (tmp_path / "traces.jsonl.1").exists())
+    writer.write({"request_id": "b"})
+    wait_for(path.exists)
+
+    assert json.loads((tmp_path / "traces.jsonl.1").read_text())["request_id"] == "a" * 250
+    assert json.loads(path.read_text())["request_id"] == "b"
+
+
+def test_trace_write_failures_are_logged(tmp_path, caplog):
+    # A directory cannot be opened for appending
+    writer = TraceWriter(str(tmp_path))
+
+    with caplog.at_level(logging.ERROR, logger="tracing"):
+        writer.write({"request_id": "a"})
+        wait_for(lambda: any("Trace write failed" in r.message for r in caplog.records))
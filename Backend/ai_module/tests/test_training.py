@@ -0,0 +1,95 @@
+import json
+import math
+import threading
+import time
+
+import pytest
+
+from enhanced_ai import EnhancedLMSAI
+
+
+@pytest.fixture(scope="module")
+def data():
+    with open("ai_training_data.json") as f:
+        return json.load(f)
+
+
+def paused_trainer(ai):
+    """Make the next model's fit() wait until resume is set, signalling fitting once it starts"""
+    fitting, resume = threading.Event(), threading.Event()
+    new_model = ai.new_model
+
+    def paused_model(task, classifier=False):
+        model = new_model(task, classifier)
+        fit = model.fit
+
+        def paused_fit(*args, **kwargs):
+            fitting.set()
+            resume.wait(10)
+            return fit(*args, **kwargs)
+
+        model.fit = paused_fit
+        return model
+
+    ai.new_model = paused_model
+    return fitting, resume
+
+
+@pytest.mark.parametrize("train, attribute, predict", [
+    ("train_grading_model", "grading_model",
+     lambda ai, scores: ai.auto_grade_assignment({"topic": "Mathematics", "assignmentType": "quiz", "maxScore": 100})),
+    ("train_performance_model", "performance_model", lambda ai, scores: ai.predict_performance(scores)),
+    ("train_risk_classification_model", "risk_model", lambda ai, scores: ai.predict_risk_level(scores)),
+    ("train_behavioral_model", "behavioral_model", lambda ai, scores: ai.analyze_behavior(scores)),
+])
+def test_requests_during_training_never_see_an_unfitted_model(data, train, attribute, predict):
+    ai = EnhancedLMSAI(feature_cache_dir=None)
+    scores = next(iter(data.values()))
+    fitting, resume = paused_trainer(ai)
+    trainer = threading.Thread(target=getattr(ai, train), args=(data,))
+    trainer.start()
+    try:
+        assert fitting.wait(10)
+        # The model is being fitted: the trained check and predictions still see no model
+        assert getattr(ai, attribute) is None
+        during = predict(ai, scores)
+    finally:
+        resume.set()
+        trainer.join(30)
+
+    assert getattr(ai, attribute) is not None
+    after = predict(ai, scores)
+    assert after is not None
+    if isinstance(after, float):
+        assert math.isfinite(after)
+    if attribute == "grading_model":
+        assert during is None
+
+
+def test_auto_grade_calls_during_training_wait_for_the_fitted_model(main_module, client, monkeypatch):
+    ai = EnhancedLMSAI(feature_cache_dir=None)
+    monkeypatch.setattr(main_module, "enhanced_ai", ai)
+    # The paused fit() cannot be pickled
+    monkeypatch.setattr(main_module, "save_trained_models", lambda: None)
+    fitting, resume = paused_trainer(ai)
+    body = {"topic": "Mathematics", "assignment_type": "quiz", "max_score": 100}
+    responses = []
+
+    def grade():
+        responses.append(client.post("/auto-grade", json=body))
+
+    first = threading.Thread(target=grade)
+    first.start()
+    assert fitting.wait(30)
+    # Fewer than the training group's queue, which sheds the rest
+    during = [threading.Thread(target=grade) for _ in range(3)]
+    for thread in during:
+        thread.start()
+    # Let them reach the server while the model is still being fitted
+    time.sleep(0.3)
+    resume.set()
+    for thread in [first, *during]:
+        thread.join(30)
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert all(response.json()["predicted_grade"] > 0 for response in responses)
@@ -0,0 +1,267 @@
+"""
+Request tracing for the LMS AI service.
+
+Every HTTP request gets a trace context keyed by the ``X-Request-ID`` header
+sent by the Node ``aiService`` (one is generated when it is missing). Code
+records named spans into the current context; the middleware returns them in
+a ``Server-Timing`` header and appends the trace to a local JSONL file from a
+background writer thread.
+
+Spans recorded for every route:
+
+- ``validation``: request start until the endpoint is called (body read,
+  JSON parsing and Pydantic validation)
+- ``serialization``: JSON encoding until the response starts. It begins
+  when the endpoint returns, or earlier when the endpoint builds its own
+  ``FastJSONResponse`` (see ``mark_serialization_start``)
+
+Endpoints add their own spans (feature extraction, each model predict,
+response building). Calls inside a ``/batch`` request run under
+``item_trace`` with the caller's own request ID, so their spans are written
+as separate traces and returned per item.
+
+Trace files are opt-in: set ``AI_TRACE_FILE`` to a path. A file is rotated
+to ``<path>.1`` once it reaches ``AI_TRACE_MAX_BYTES`` (default 100 MB), so
+at most two files are kept.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = b"x-request-id"
+DEFAULT_TRACE_MAX_BYTES = 100 * 1024 * 1024
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    __slots__ = ("request_id", "start", "spans", "endpoint_start", "endpoint_end")
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.start = time.perf_counter()
+        self.spans = []
+        self.endpoint_start = None
+        self.endpoint_end = None
+
+    def add(self, name, start, end):
+        self.spans.append((name, (start - self.start) * 1000, (end - start) * 1000))
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def record_span(name, start, end=None):
+    """Record a span measured with time.perf_counter(); no-op outside a request"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, start, end if end is not None else time.perf_counter())
+
+
+def mark_serialization_start():
+    """Start the ``serialization`` span now for a response rendered inside the endpoint"""
+    trace = _current_trace.get()
+    if trace is not None and trace.endpoint_start is not None and trace.endpoint_end is None:
+        trace.endpoint_end = time.perf_counter()
+
+
+@contextmanager
+def span(name):
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter())
+
+
+def server_timing_header(spans, total_ms):
+    """Format spans as a Server-Timing header; repeated names are summed"""
+    durations = {}
+    for name, _, duration_ms in spans:
+        durations[name] = durations.get(name, 0.0) + duration_ms
+    entries = [f"{name};dur={duration:.2f}" for name, duration in durations.items()]
+    entries.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(entries)
+
+
+def trace_record(trace, method, path, status, **fields):
+    """JSONL record for a finished trace"""
+    return {
+        "request_id": trace.request_id,
+        "service": "ai",
+        "method": method,
+        "path": path,
+        "status": status,
+        "timestamp": time.time(),
+        "total_ms": round((time.perf_counter() - trace.start) * 1000, 3),
+        "spans": [
+            {"name": name, "start_ms": round(start_ms, 3), "duration_ms": round(duration_ms, 3)}
+            for name, start_ms, duration_ms in trace.spans
+        ],
+        **fields
+    }
+
+
+@contextmanager
+def item_trace(request_id, path, writer=None, parent_id=None):
+    """Record spans into a trace of their own, e.g. for one call of a /batch request
+
+    Yields (trace, status_holder); set status_holder[0] to the call's status.
+    """
+    trace = Trace(request_id or uuid.uuid4().hex)
+    token = _current_trace.set(trace)
+    status_holder = [200]
+    try:
+        yield trace, status_holder
+    finally:
+        _current_trace.reset(token)
+        if writer is not None:
+            writer.write(trace_record(trace, "POST", path, status_holder[0], parent_request_id=parent_id))
+
+
+class TraceWriter:
+    """Append finished traces to a JSONL file without blocking requests"""
+
+    def __init__(self, path, max_queue=10000, max_bytes=DEFAULT_TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        while True:
+            records = [self._queue.get()]
+            # Drain whatever else is waiting so bursts become one write
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, 'a') as f:
+                    f.write("".join(json.dumps(record) + "\n" for record in records))
+                    size = f.tell()
+                if size >= self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+            except OSError:
+                logger.exception("Trace write failed")
+
+
+class TracedRoute(APIRoute):
+    """APIRoute that marks when the endpoint starts and returns.
+
+    The gap before the endpoint is recorded as ``validation`` and the gap
+    after it as ``serialization``.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        if asyncio.iscoroutinefunction(endpoint):
+            @wraps(endpoint)
+            async def traced_endpoint(*args, **kw):
+                trace = _mark_endpoint_start()
+                try:
+                    return await endpoint(*args, **kw)
+                finally:
+                    _mark_endpoint_end(trace)
+        else:
+            @wraps(endpoint)
+            def traced_endpoint(*args, **kw):
+                trace = _mark_endpoint_start()
+                try:
+                    return endpoint(*args, **kw)
+                finally:
+                    _mark_endpoint_end(trace)
+
+        super().__init__(path, traced_endpoint, **kwargs)
+
+
+def _mark_endpoint_start():
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.endpoint_start = time.perf_counter()
+    return trace
+
+
+def _mark_endpoint_end(trace):
+    if trace is not None and trace.endpoint_end is None:
+        trace.endpoint_end = time.perf_counter()
+
+
+class TracingMiddleware:
+    """Plain ASGI middleware owning the per-request trace context"""
+
+    def __init__(self, app, writer=None):
+        self.app = app
+        self.writer = writer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        trace = Trace(request_id or uuid.uuid4().hex)
+        token = _current_trace.set(trace)
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                status_holder[0] = message["status"]
+                if trace.endpoint_start is not None:
+                    trace.add("validation", trace.start, trace.endpoint_start)
+                if trace.endpoint_end is not None:
+                    trace.add("serialization", trace.endpoint_end, now)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(trace.spans, (now - trace.start) * 1000).encode()))
+                headers.append((b"x-request-id", trace.request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            if self.writer is not None:
+                self.writer.write(trace_record(trace, scope.get("method"), scope.get("path"), status_holder[0]))
+
+
+def trace_writer_from_env():
+    """Trace file from AI_TRACE_FILE (unset or 'off' disables), rotated at AI_TRACE_MAX_BYTES"""
+    path = os.getenv("AI_TRACE_FILE", "")
+    if not path or path.lower() == "off":
+        return None
+    return TraceWriter(path, max_bytes=int(os.getenv("AI_TRACE_MAX_BYTES", str(DEFAULT_TRACE_MAX_BYTES))))
@@ -2,6 +2,7 @@ import asyncHandler from "../../helpers/asyncHandler.js";
 import ResponseConfig from "../../helpers/responseConfig.js";
 import ErrorConfig from "../../helpers/errorConfig.js";
 import aiService from "../../services/aiService.js";
+import { traceSpan } from "../../utils/tracing.js";
 import fs from "fs";
 import path from "path";
 import { fileURLToPath } from 'url';
@@ -20,8 +21,7 @@ const testStudentPerformance = asyncHandler(async (req, res, next) => {
     const dataPath = path.join(__dirname, "../../../ai_module/ai_training_data.json");
     let trainingData;
     try {
-        const raw = fs.readFileSync(dataPath, "utf-8");
-        trainingData = JSON.parse(raw);
+        trainingData = traceSpan("load_training_data", () => JSON.parse(fs.readFileSync(dataPath, "utf-8")));
     } catch (err) {
         console.error('Error loading training data:', err);
         return next(new ErrorConfig(500, "Failed to load training data"));
@@ -82,25 +82,15 @@ const testStudentPerformance = asyncHandler(async (req, res, next) => {
  */
 const analyzeStudentPerformance = asyncHandler(async (req, res, next) => {
     const { studentId } = req.params;
-    const dataPath = path.join(__dirname, "../../../ai_module/ai_training_data.json");
-    let trainingData;
-    try {
-        const raw = fs.readFileSync(dataPath, "utf-8");
-        trainingData = JSON.parse(raw);
-    } catch (err) {
-        console.error('Error loading training data:', err);
-        return next(new ErrorConfig(500, "Failed to load training data"));
-    }
-    const studentScores = trainingData[studentId];
-    if (!studentScores) {
-        return next(new ErrorConfig(404, "Student scores not found"));
-    }
     try {
-        const analysis = await aiService.analyzeStudentPerformance(studentId, studentScores);
+        const analysis = await aiService.analyzeStoredStudentPerformance(studentId);
         return res.status(200).json(
             new ResponseConfig(200, "Performance analysis completed", analysis)
         );
     } catch (error) {
+        if (error.response?.status === 404) {
+            return next(new ErrorConfig(404, "Student scores not found"));
+        }
         console.error('AI Analysis Error:', error);
         return next(new ErrorConfig(500, "Failed to analyze performance"));
     }
@@ -111,38 +101,17 @@ const analyzeStudentPerformance = asyncHandler(async (req, res, next) => {
  */
 const analyzeClassPerformance = asyncHandler(async (req, res, next) => {
     const { classId } = req.params;
-    
-    // Path to the generated training data
-    const dataPath = path.join(__dirname, "../../../ai_module/ai_training_data.json");
-    let trainingData;
-    try {
-        const raw = fs.readFileSync(dataPath, "utf-8");
-        trainingData = JSON.parse(raw);
-    } catch (err) {
-        console.error('Error loading training data:', err);
-        return next(new ErrorConfig(500, "Failed to load training data"));
-    }
-    
-    // Find all students for this class
-    const classStudents = Object.keys(trainingData).filter(key => key.startsWith(classId + "_"));
-    
-    if (classStudents.length === 0) {
-        return next(new ErrorConfig(404, `No data found for classId: ${classId}`));
-    }
-    
-    // Prepare student scores for AI analysis
-    const classStudentScores = classStudents.map(studentId => ({
-        student_id: studentId,
-        scores: trainingData[studentId]
-    }));
 
     try {
-        const analysis = await aiService.analyzeClassPerformance(classStudentScores);
+        const analysis = await aiService.analyzeClassPerformance(classId);
         
         return res.status(200).json(
             new ResponseConfig(200, "Class performance analysis completed", analysis)
         );
     } catch (error) {
+        if (error.response?.status === 404) {
+            return next(new ErrorConfig(404, `No data found for classId: ${classId}`));
+        }
         console.error('AI Class Analysis Error:', error);
         return next(new ErrorConfig(500, "Failed to analyze class performance"));
     }
@@ -153,33 +122,9 @@ const analyzeClassPerformance = asyncHandler(async (req, res, next) => {
  */
 const getAtRiskStudents = asyncHandler(async (req, res, next) => {
     const { classId } = req.params;
-    
-    // Path to the generated training data
-    const dataPath = path.join(__dirname, "../../../ai_module/ai_training_data.json");
-    let trainingData;
-    try {
-        const raw = fs.readFileSync(dataPath, "utf-8");
-        trainingData = JSON.parse(raw);
-    } catch (err) {
-        console.error('Error loading training data:', err);
-        return next(new ErrorConfig(500, "Failed to load training data"));
-    }
-    
-    // Find all students for this class
-    const classStudents = Object.keys(trainingData).filter(key => key.startsWith(classId + "_"));
-    
-    if (classStudents.length === 0) {
-        return next(new ErrorConfig(404, `No data found for classId: ${classId}`));
-    }
-    
-    // Prepare student scores for AI analysis
-    const classStudentScores = classStudents.map(studentId => ({
-        student_id: studentId,
-        scores: trainingData[studentId]
-    }));
 
     try {
-        const analysis = await aiService.analyzeClassPerformance(classStudentScores);
+        const analysis = await aiService.analyzeClassPerformance(classId);
         
         // Filter at-risk students
         const atRiskStudents = analysis.student_analyses.filter(
@@ -193,6 +138,9 @@ const getAtRiskStudents = asyncHandler(async (req, res, next) => {
             })
         );
     } catch (error) {
+        if (error.response?.status === 404) {
+            return next(new ErrorConfig(404, `No data found for classId: ${classId}`));
+        }
         console.error('At-Risk Students Error:', error);
         return next(new ErrorConfig(500, "Failed to get at-risk students"));
     }
@@ -203,26 +151,9 @@ const getAtRiskStudents = asyncHandler(async (req, res, next) => {
  */
 const getStudentTrends = asyncHandler(async (req, res, next) => {
     const { studentId } = req.params;
-    
-    // Path to the generated training data
-    const dataPath = path.join(__dirname, "../../../ai_module/ai_training_data.json");
-    let trainingData;
-    try {
-        const raw = fs.readFileSync(dataPath, "utf-8");
-        trainingData = JSON.parse(raw);
-    } catch (err) {
-        console.error('Error loading training data:', err);
-        return next(new ErrorConfig(500, "Failed to load training data"));
-    }
-    
-    const studentScores = trainingData[studentId];
-    
-    if (!studentScores) {
-        return next(new ErrorConfig(404, "Student scores not found"));
-    }
 
     try {
-        const analysis = await aiService.analyzeStudentPerformance(studentId, studentScores);
+        const analysis = await aiService.analyzeStoredStudentPerformance(studentId);
         
         return res.status(200).json(
             new ResponseConfig(200, "Student trends retrieved", {
@@ -233,6 +164,9 @@ const getStudentTrends = asyncHandler(async (req, res, next) => {
             })
         );
     } catch (error) {
+        if (error.response?.status === 404) {
+            return next(new ErrorConfig(404, "Student scores not found"));
+        }
         console.error('Student Trends Error:', error);
         return next(new ErrorConfig(500, "Failed to get student trends"));
     }
@@ -273,8 +207,7 @@ const testClassPerformance = asyncHandler(async (req, res, next) => {
     const dataPath = path.join(__dirname, "../../../ai_module/ai_training_data.json");
     let trainingData;
     try {
-        const raw = fs.readFileSync(dataPath, "utf-8");
-        trainingData = JSON.parse(raw);
+        trainingData = traceSpan("load_training_data", () => JSON.parse(fs.readFileSync(dataPath, "utf-8")));
     } catch (err) {
         console.error('Error loading training data:', err);
         return next(new ErrorConfig(500, "Failed to load training data"));
@@ -384,8 +317,7 @@ const testAtRiskStudents = asyncHandler(async (req, res, next) => {
     const dataPath = path.join(__dirname, "../../../ai_module/ai_training_data.json");
     let trainingData;
     try {
-        const raw = fs.readFileSync(dataPath, "utf-8");
-        trainingData = JSON.parse(raw);
+        trainingData = traceSpan("load_training_data", () => JSON.parse(fs.readFileSync(dataPath, "utf-8")));
     } catch (err) {
         console.error('Error loading training data:', err);
         return next(new ErrorConfig(500, "Failed to load training data"));
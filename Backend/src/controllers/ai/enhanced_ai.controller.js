@@ -1,6 +1,7 @@
 import aiService from "../../services/aiService.js";
 import ResponseConfig from "../../helpers/responseConfig.js";
 import ErrorConfig from "../../helpers/errorConfig.js";
+import { traceSpan } from "../../utils/tracing.js";
 import fs from "fs";
 import path from "path";
 import { fileURLToPath } from 'url';
@@ -12,7 +13,7 @@ const __dirname = path.dirname(__filename);
 const getStudentData = (studentId) => {
     try {
         const dataPath = path.join(__dirname, "../../../ai_module/ai_training_data.json");
-        const data = JSON.parse(fs.readFileSync(dataPath, 'utf8'));
+        const data = traceSpan("load_training_data", () => JSON.parse(fs.readFileSync(dataPath, 'utf8')));
         return data[studentId] || [];
     } catch (err) {
         console.error('Error loading training data:', err);
@@ -119,6 +120,30 @@ export const autoGradeAssignment = async (req, res, next) => {
     }
 };
 
+export const autoGradeAssignments = async (req, res, next) => {
+    const { submissions } = req.body;
+
+    if (!Array.isArray(submissions) || submissions.length === 0) {
+        return next(new ErrorConfig(400, "A non-empty submissions array is required"));
+    }
+
+    try {
+        const gradingResult = await aiService.autoGradeAssignments(submissions.map(submission => ({
+            student_id: submission.studentId,
+            topic: submission.topic || "Mathematics",
+            assignment_type: submission.assignmentType || "quiz",
+            max_score: submission.maxScore || 100
+        })));
+        return res.status(200).json(
+            new ResponseConfig(200, "Assignments graded successfully", gradingResult)
+        );
+    } catch (error) {
+        console.error('Batch Auto-Grading Error:', error);
+        const status = error.response?.status === 413 ? 413 : 502;
+        return next(new ErrorConfig(status, error.response?.data?.detail || "AI grading service unavailable"));
+    }
+};
+
 export const optimizeLearningPath = async (req, res, next) => {
     const { studentId } = req.params;
     
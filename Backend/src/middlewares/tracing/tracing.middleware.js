@@ -0,0 +1,40 @@
+import { performance } from "perf_hooks";
+import {
+    traceStorage,
+    createTrace,
+    formatServerTiming,
+    writeTrace
+} from "../../utils/tracing.js";
+
+// Starts a trace for the request, returns its spans in a Server-Timing header
+// and writes the finished trace to the local trace file
+const traceRequest = (req, res, next) => {
+    const trace = createTrace(req.get("X-Request-ID"));
+    const writeHead = res.writeHead;
+
+    res.writeHead = function (...args) {
+        const totalMs = performance.now() - trace.start;
+        if (!res.headersSent) {
+            res.setHeader("Server-Timing", formatServerTiming(trace.spans, totalMs));
+            res.setHeader("X-Request-ID", trace.requestId);
+        }
+        return writeHead.apply(this, args);
+    };
+
+    res.on("finish", () => {
+        writeTrace({
+            request_id: trace.requestId,
+            service: "node",
+            method: req.method,
+            path: req.originalUrl,
+            status: res.statusCode,
+            timestamp: Date.now() / 1000,
+            total_ms: Math.round((performance.now() - trace.start) * 1000) / 1000,
+            spans: trace.spans
+        });
+    });
+
+    traceStorage.run(trace, next);
+};
+
+export { traceRequest };
@@ -2,6 +2,7 @@ import express from "express";
 import {
     getContentRecommendations,
     autoGradeAssignment,
+    autoGradeAssignments,
     optimizeLearningPath,
     analyzeBehavior,
     getPredictiveAnalytics,
@@ -22,6 +23,9 @@ router.route("/content-recommendations/:studentId")
 router.route("/auto-grade")
     .post(authenticateUser, isAuthenticated(["TEACHER", "ADMIN"]), autoGradeAssignment);
 
+router.route("/auto-grade/batch")
+    .post(authenticateUser, isAuthenticated(["TEACHER", "ADMIN"]), autoGradeAssignments);
+
 router.route("/learning-path/:studentId")
     .get(authenticateUser, isAuthenticated(["STUDENT", "TEACHER", "ADMIN"]), optimizeLearningPath);
 
@@ -50,6 +54,9 @@ router.route("/test/content-recommendations/:studentId")
 router.route("/test/auto-grade")
     .post(autoGradeAssignment);
 
+router.route("/test/auto-grade/batch")
+    .post(autoGradeAssignments);
+
 router.route("/test/learning-path/:studentId")
     .get(optimizeLearningPath);
 
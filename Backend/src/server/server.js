@@ -14,6 +14,7 @@ import aiRouter from "../routes/ai.route.js";
 import enhancedAiRouter from "../routes/enhanced_ai.route.js";
 import quizRouter from "../routes/quiz.route.js";
 import studentRouter from "../routes/student.route.js";
+import { traceRequest } from '../middlewares/tracing/tracing.middleware.js';
 
 const app = express();
 app.use(cors());
@@ -27,8 +28,8 @@ app.use("/api/v1/course",courseRouter);
 app.use("/api/v1/admin",adminRouter);
 app.use("/api/v1/assignment", assignmentRouter);
 app.use("/api/v1/attendance", attendanceRouter);
-app.use("/api/v1/ai", aiRouter);
-app.use("/api/v1/enhanced-ai", enhancedAiRouter);
+app.use("/api/v1/ai", traceRequest, aiRouter);
+app.use("/api/v1/enhanced-ai", traceRequest, enhancedAiRouter);
 app.use("/api/v1/quiz", quizRouter);
 app.use("/api/v1/student", studentRouter);
 app.use(errorHandler);
@@ -1,32 +1,298 @@
 import axios from "axios";
+import http from "http";
+import https from "https";
+import { performance } from "perf_hooks";
+import {
+    currentTrace,
+    generateRequestId,
+    recordSpan,
+    parseServerTiming
+} from "../utils/tracing.js";
+import CircuitBreaker from "../utils/circuitBreaker.js";
 
 const AI_BASE_URL = process.env.AI_SERVICE_URL || "http://localhost:8001";
+const COLUMNAR_CONTENT_TYPE = "application/vnd.lms.columnar+json";
+// Histories at least this long are sent as parallel arrays instead of score objects
+const COLUMNAR_MIN_SCORES = parseInt(process.env.AI_COLUMNAR_MIN_SCORES || "200", 10);
+
+// Shared keep-alive agents so AI calls reuse pooled connections instead of opening one each
+const AI_MAX_SOCKETS = parseInt(process.env.AI_MAX_SOCKETS || "32", 10);
+const AI_MAX_FREE_SOCKETS = parseInt(process.env.AI_MAX_FREE_SOCKETS || "8", 10);
+const agentOptions = {
+    keepAlive: true,
+    keepAliveMsecs: 1000,
+    maxSockets: AI_MAX_SOCKETS,
+    maxFreeSockets: AI_MAX_FREE_SOCKETS
+};
+
+// Per-student calls made within AI_BATCH_WINDOW_MS are sent together to /batch
+const AI_BATCH_WINDOW_MS = parseInt(process.env.AI_BATCH_WINDOW_MS || "5", 10);
+const AI_BATCH_MAX_SIZE = parseInt(process.env.AI_BATCH_MAX_SIZE || "50", 10);
+const BATCHABLE_ENDPOINTS = new Set([
+    '/comprehensive-insights',
+    '/behavior-analysis',
+    '/content-recommendations',
+    '/learning-path',
+    '/study-plan',
+    '/auto-grade'
+]);
+
+// Per-endpoint deadlines: callers get a result, a degraded cached result or an error within these
+const AI_DEADLINE_MS = parseInt(process.env.AI_DEADLINE_MS || "5000", 10);
+const ENDPOINT_DEADLINES_MS = {
+    '/health': 1000,
+    '/auto-grade': 2000,
+    '/auto-grade/batch': 10000,
+    '/comprehensive-insights': 4000,
+    '/behavior-analysis': 3000,
+    '/content-recommendations': 3000,
+    '/learning-path': 3000,
+    '/study-plan': 3000,
+    '/batch': 5000
+};
+const PREFIX_DEADLINES_MS = [
+    ['/students/', 4000],
+    ['/classes/', 15000]
+];
+
+// Last good response per student, served (marked degraded) when the AI service is failing
+const AI_LAST_GOOD_MAX = parseInt(process.env.AI_LAST_GOOD_MAX || "1000", 10);
+const AI_LAST_GOOD_TTL_MS = parseInt(process.env.AI_LAST_GOOD_TTL_MS || "3600000", 10);
+
+const deadlineFor = (endpoint) => {
+    if (ENDPOINT_DEADLINES_MS[endpoint]) return ENDPOINT_DEADLINES_MS[endpoint];
+    const prefix = PREFIX_DEADLINES_MS.find(([path]) => endpoint.startsWith(path));
+    return prefix ? prefix[1] : AI_DEADLINE_MS;
+};
+
+const withDeadline = (promise, ms, endpoint) => {
+    let timer;
+    const deadline = new Promise((_, reject) => {
+        timer = setTimeout(() => {
+            const error = new Error(`AI service deadline of ${ms}ms exceeded for ${endpoint}`);
+            error.code = "AI_DEADLINE_EXCEEDED";
+            reject(error);
+        }, ms);
+    });
+    return Promise.race([promise, deadline]).finally(() => clearTimeout(timer));
+};
+
+// Timeouts, network errors and 5xx count against the service; 4xx are the caller's problem
+const isServiceFailure = (error) => !error.response || error.response.status >= 500;
+
+const toColumnarPayload = ({ scores, ...fields }) => ({
+    ...fields,
+    columns: {
+        topic: scores.map(s => s.topic),
+        score: scores.map(s => s.score),
+        max_score: scores.map(s => s.max_score || 100),
+        date: scores.map(s => s.date),
+        assignment_type: scores.map(s => s.assignment_type || "quiz")
+    }
+});
 
 class AIService {
     constructor() {
         this.baseURL = AI_BASE_URL;
+        this.client = axios.create({
+            baseURL: AI_BASE_URL,
+            httpAgent: new http.Agent(agentOptions),
+            httpsAgent: new https.Agent(agentOptions)
+        });
+        // Singleflight: identical concurrent calls share one in-flight request
+        this.inflight = new Map();
+        this.batchQueue = [];
+        this.batchTimer = null;
+        this.breaker = new CircuitBreaker({
+            failureThreshold: parseInt(process.env.AI_BREAKER_FAILURES || "5", 10),
+            cooldownMs: parseInt(process.env.AI_BREAKER_COOLDOWN_MS || "10000", 10)
+        });
+        this.lastGood = new Map();
+    }
+
+    lastGoodKey(endpoint, method, data) {
+        if (endpoint === '/health') return null;
+        if (method === 'GET') return endpoint;
+        return data?.student_id ? `${endpoint} ${data.student_id}` : null;
+    }
+
+    rememberLastGood(key, data) {
+        if (!key) return;
+        // Map keeps insertion order, so re-inserting makes this the most recent entry
+        this.lastGood.delete(key);
+        this.lastGood.set(key, { data, storedAt: Date.now() });
+        if (this.lastGood.size > AI_LAST_GOOD_MAX) {
+            this.lastGood.delete(this.lastGood.keys().next().value);
+        }
+    }
+
+    degradedResponse(key, error) {
+        const cached = key && this.lastGood.get(key);
+        if (!cached || Date.now() - cached.storedAt > AI_LAST_GOOD_TTL_MS) return null;
+        return {
+            ...cached.data,
+            degraded: true,
+            degraded_reason: error.code || error.message,
+            cached_at: new Date(cached.storedAt).toISOString()
+        };
+    }
+
+    encodePayload(data) {
+        if (!data) {
+            return { contentType: 'application/json', payload: null };
+        }
+        if (Array.isArray(data.scores) && data.scores.length >= COLUMNAR_MIN_SCORES) {
+            return { contentType: COLUMNAR_CONTENT_TYPE, payload: toColumnarPayload(data) };
+        }
+        return { contentType: 'application/json', payload: data };
     }
 
     async makeRequest(endpoint, method = 'GET', data = null) {
+        const start = performance.now();
+        const deadlineMs = deadlineFor(endpoint);
+        const lastGoodKey = this.lastGoodKey(endpoint, method, data);
+        let response;
         try {
-            const config = {
-                method,
-                url: `${this.baseURL}${endpoint}`,
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-            };
-
-            if (data) {
-                config.data = data;
-            }
-
-            const response = await axios(config);
+            response = await withDeadline(this.startRequest(endpoint, method, data, deadlineMs), deadlineMs, endpoint);
+            this.rememberLastGood(lastGoodKey, response.data);
             return response.data;
         } catch (error) {
+            response = error.response;
+            const degraded = isServiceFailure(error) ? this.degradedResponse(lastGoodKey, error) : null;
+            if (degraded) {
+                console.warn(`AI Service degraded (${endpoint}): ${error.message}; serving last good response`);
+                return degraded;
+            }
             console.error(`AI Service Error (${endpoint}):`, error.message);
             throw error;
+        } finally {
+            this.recordTimings(start, response);
+        }
+    }
+
+    // Join an identical in-flight call or start a new one if the circuit breaker allows it
+    startRequest(endpoint, method, data, deadlineMs) {
+        const { contentType, payload } = this.encodePayload(data);
+        const body = payload ? JSON.stringify(payload) : undefined;
+        const key = `${method} ${endpoint} ${body || ""}`;
+
+        let request = this.inflight.get(key);
+        if (request) return request;
+
+        if (!this.breaker.allowRequest()) {
+            const error = new Error(`AI service circuit is ${this.breaker.state}`);
+            error.code = "AI_CIRCUIT_OPEN";
+            return Promise.reject(error);
         }
+
+        if (method === 'POST' && BATCHABLE_ENDPOINTS.has(endpoint)) {
+            // flushBatch records the breaker outcome of the upstream call the batch is sent in
+            request = this.enqueueBatch(endpoint, contentType, payload, body, deadlineMs);
+        } else {
+            request = this.recordOutcome(this.sendRequest(endpoint, method, contentType, body, null, deadlineMs));
+        }
+        this.inflight.set(key, request);
+        request.catch(() => {}).finally(() => this.inflight.delete(key));
+        return request;
+    }
+
+    // One breaker outcome per upstream call, however many callers share it
+    recordOutcome(request) {
+        const startedAt = Date.now();
+        request.then(
+            () => this.breaker.recordSuccess(startedAt),
+            (error) => isServiceFailure(error) ? this.breaker.recordFailure(startedAt) : this.breaker.recordSuccess(startedAt)
+        );
+        return request;
+    }
+
+    sendRequest(endpoint, method, contentType, body, requestId = null, timeout = deadlineFor(endpoint)) {
+        const trace = currentTrace();
+        return this.client.request({
+            method,
+            url: endpoint,
+            timeout,
+            headers: {
+                'Content-Type': contentType,
+                // Lets the AI service record its spans under the same request ID
+                'X-Request-ID': requestId || (trace ? trace.requestId : generateRequestId()),
+            },
+            data: body
+        });
+    }
+
+    // Queue a per-student call; resolves with an axios-like response once its batch returns
+    enqueueBatch(endpoint, contentType, payload, body, deadlineMs) {
+        const trace = currentTrace();
+        return new Promise((resolve, reject) => {
+            this.batchQueue.push({
+                endpoint,
+                contentType,
+                payload,
+                body,
+                deadlineMs,
+                requestId: trace ? trace.requestId : null,
+                resolve,
+                reject
+            });
+            if (this.batchQueue.length >= AI_BATCH_MAX_SIZE) {
+                this.flushBatch();
+            } else if (!this.batchTimer) {
+                this.batchTimer = setTimeout(() => this.flushBatch(), AI_BATCH_WINDOW_MS);
+            }
+        });
+    }
+
+    async flushBatch() {
+        clearTimeout(this.batchTimer);
+        this.batchTimer = null;
+        const items = this.batchQueue.splice(0);
+        if (items.length === 0) return;
+
+        // A lone call goes out as a normal request
+        if (items.length === 1) {
+            const [item] = items;
+            this.recordOutcome(this.sendRequest(item.endpoint, 'POST', item.contentType, item.body, item.requestId, item.deadlineMs))
+                .then(item.resolve, item.reject);
+            return;
+        }
+
+        try {
+            // Each call carries its caller's request ID; the AI service traces it under that ID
+            const response = await this.recordOutcome(this.sendRequest('/batch', 'POST', 'application/json', JSON.stringify({
+                requests: items.map(item => ({ endpoint: item.endpoint, body: item.payload, request_id: item.requestId }))
+            }), generateRequestId(), Math.max(...items.map(item => item.deadlineMs))));
+
+            response.data.responses.forEach((result, index) => {
+                const item = items[index];
+                const itemResponse = {
+                    status: result.status,
+                    data: result.body,
+                    headers: {
+                        'server-timing': result.server_timing || `batch_item;dur=${result.duration_ms}`,
+                        'x-request-id': result.request_id
+                    }
+                };
+                if (result.status >= 200 && result.status < 300) {
+                    item.resolve(itemResponse);
+                } else {
+                    const error = new Error(`Request failed with status code ${result.status}`);
+                    error.response = itemResponse;
+                    item.reject(error);
+                }
+            });
+        } catch (error) {
+            items.forEach(item => item.reject(error));
+        }
+    }
+
+    // Record the HTTP hop and the AI service's own Server-Timing spans
+    recordTimings(start, response) {
+        const end = performance.now();
+        recordSpan('ai_http', start, end);
+        parseServerTiming(response?.headers?.['server-timing']).forEach(({ name, duration_ms }) => {
+            recordSpan(`ai_${name}`, start, start + duration_ms);
+        });
     }
 
     // Enhanced AI methods that use real ML models
@@ -54,6 +320,11 @@ class AIService {
         return await this.makeRequest('/auto-grade', 'POST', gradingData);
     }
 
+    // Grades every submission of an assignment in one call; results keep the submission order
+    async autoGradeAssignments(submissions) {
+        return await this.makeRequest('/auto-grade/batch', 'POST', { submissions });
+    }
+
     // Legacy methods for backward compatibility
     async analyzeStudentPerformance(studentId, scores) {
         const requestData = {
@@ -70,8 +341,13 @@ class AIService {
         return await this.makeRequest('/analyze-performance', 'POST', requestData);
     }
 
+    // ID-based methods: the AI service reads the scores from its local score store
+    async analyzeStoredStudentPerformance(studentId) {
+        return await this.makeRequest(`/students/${encodeURIComponent(studentId)}/performance`, 'GET');
+    }
+
     async analyzeClassPerformance(classId) {
-        return await this.makeRequest('/analyze-class-performance', 'POST', { class_id: classId });
+        return await this.makeRequest(`/classes/${encodeURIComponent(classId)}/performance`, 'GET');
     }
 
     async checkHealth() {
@@ -0,0 +1,62 @@
+// Half-open circuit breaker: opens after `failureThreshold` consecutive failures,
+// lets a single probe through once `cooldownMs` has passed, and closes again
+// when that probe succeeds (or re-opens when it fails). Outcomes of requests
+// started before the breaker opened or went half-open are stale and ignored,
+// so a slow request finishing late cannot skip the cool-down or the probe.
+class CircuitBreaker {
+    constructor({ failureThreshold = 5, cooldownMs = 10000 } = {}) {
+        this.failureThreshold = failureThreshold;
+        this.cooldownMs = cooldownMs;
+        this.state = "closed";
+        this.failures = 0;
+        this.openedAt = 0;
+        this.halfOpenedAt = 0;
+        this.probeInFlight = false;
+    }
+
+    allowRequest() {
+        if (this.state === "closed") return true;
+        if (this.state === "open") {
+            if (Date.now() - this.openedAt < this.cooldownMs) return false;
+            this.state = "half_open";
+            this.halfOpenedAt = Date.now();
+            this.probeInFlight = false;
+        }
+        if (this.probeInFlight) return false;
+        this.probeInFlight = true;
+        return true;
+    }
+
+    // Whether a request started at startedAt was let through in the current state
+    isCurrent(startedAt) {
+        if (this.state === "open") return false;
+        return this.state === "closed" || startedAt >= this.halfOpenedAt;
+    }
+
+    recordSuccess(startedAt = Date.now()) {
+        if (!this.isCurrent(startedAt)) return;
+        this.state = "closed";
+        this.failures = 0;
+        this.probeInFlight = false;
+    }
+
+    recordFailure(startedAt = Date.now()) {
+        if (!this.isCurrent(startedAt)) return;
+        this.failures += 1;
+        this.probeInFlight = false;
+        if (this.state === "half_open" || this.failures >= this.failureThreshold) {
+            this.state = "open";
+            this.openedAt = Date.now();
+        }
+    }
+
+    status() {
+        return {
+            state: this.state,
+            consecutive_failures: this.failures,
+            opened_at: this.state === "closed" ? null : new Date(this.openedAt).toISOString()
+        };
+    }
+}
+
+export default CircuitBreaker;
@@ -0,0 +1,102 @@
+import { AsyncLocalStorage } from "async_hooks";
+import crypto from "crypto";
+import fs from "fs";
+import path from "path";
+import { performance } from "perf_hooks";
+
+// Per-request trace context shared by the tracing middleware, controllers and aiService
+const traceStorage = new AsyncLocalStorage();
+
+// Opt-in trace file, e.g. AI_TRACE_FILE=traces/node_traces.jsonl
+const TRACE_FILE = process.env.AI_TRACE_FILE || "";
+const traceFileEnabled = Boolean(TRACE_FILE) && TRACE_FILE.toLowerCase() !== "off";
+
+let pendingLines = [];
+let flushScheduled = false;
+
+const generateRequestId = () => crypto.randomUUID().replace(/-/g, "");
+
+const createTrace = (requestId) => ({
+    requestId: requestId || generateRequestId(),
+    start: performance.now(),
+    spans: []
+});
+
+const currentTrace = () => traceStorage.getStore();
+
+// Record a span measured with performance.now(); no-op outside a traced request
+const recordSpan = (name, start, end = performance.now()) => {
+    const trace = currentTrace();
+    if (!trace) return;
+    trace.spans.push({
+        name,
+        start_ms: Math.round((start - trace.start) * 1000) / 1000,
+        duration_ms: Math.round((end - start) * 1000) / 1000
+    });
+};
+
+// Time a synchronous function as a span
+const traceSpan = (name, fn) => {
+    const start = performance.now();
+    try {
+        return fn();
+    } finally {
+        recordSpan(name, start);
+    }
+};
+
+// Parse "name;dur=1.2, other;dur=3" into [{ name, duration_ms }]
+const parseServerTiming = (header) => {
+    if (!header) return [];
+    return header.split(",").map(entry => {
+        const [name, ...params] = entry.trim().split(";");
+        const dur = params.map(p => p.trim()).find(p => p.startsWith("dur="));
+        return { name: name.trim(), duration_ms: dur ? parseFloat(dur.slice(4)) : 0 };
+    }).filter(entry => entry.name);
+};
+
+// Format spans as a Server-Timing header; repeated names are summed
+const formatServerTiming = (spans, totalMs) => {
+    const durations = new Map();
+    spans.forEach(span => {
+        durations.set(span.name, (durations.get(span.name) || 0) + span.duration_ms);
+    });
+    const entries = [...durations.entries()].map(([name, duration]) => `${name};dur=${duration.toFixed(2)}`);
+    entries.push(`total;dur=${totalMs.toFixed(2)}`);
+    return entries.join(", ");
+};
+
+const flushTraces = () => {
+    flushScheduled = false;
+    const lines = pendingLines.join("");
+    pendingLines = [];
+    fs.appendFile(TRACE_FILE, lines, (err) => {
+        if (err) console.error("Trace write failed:", err.message);
+    });
+};
+
+// Append a finished trace to the local JSONL trace file (batched, non-blocking)
+const writeTrace = (record) => {
+    if (!traceFileEnabled) return;
+    pendingLines.push(JSON.stringify(record) + "\n");
+    if (!flushScheduled) {
+        flushScheduled = true;
+        setTimeout(flushTraces, 100).unref();
+    }
+};
+
+if (traceFileEnabled) {
+    fs.mkdirSync(path.dirname(TRACE_FILE), { recursive: true });
+}
+
+export {
+    traceStorage,
+    createTrace,
+    currentTrace,
+    generateRequestId,
+    recordSpan,
+    traceSpan,
+    parseServerTiming,
+    formatServerTiming,
+    writeTrace
+};
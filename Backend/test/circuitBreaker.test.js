@@ -0,0 +1,61 @@
+import { test } from "node:test";
+import assert from "node:assert/strict";
+
+import CircuitBreaker from "../src/utils/circuitBreaker.js";
+
+const openBreaker = (cooldownMs = 60000) => {
+    const breaker = new CircuitBreaker({ failureThreshold: 2, cooldownMs });
+    breaker.recordFailure();
+    breaker.recordFailure();
+    assert.equal(breaker.state, "open");
+    return breaker;
+};
+
+test("opens after consecutive failures and fails fast during the cool-down", () => {
+    const breaker = openBreaker();
+    assert.equal(breaker.allowRequest(), false);
+});
+
+test("a success from a request started before the breaker opened is ignored", () => {
+    const startedAt = Date.now() - 1000;
+    const breaker = openBreaker();
+
+    breaker.recordSuccess(startedAt);
+
+    assert.equal(breaker.state, "open");
+    assert.equal(breaker.allowRequest(), false);
+});
+
+test("a stale success during the probe neither closes the breaker nor frees the probe", () => {
+    const startedAt = Date.now() - 1000;
+    const breaker = openBreaker(0);
+    assert.equal(breaker.allowRequest(), true);
+    assert.equal(breaker.state, "half_open");
+
+    breaker.recordSuccess(startedAt);
+
+    assert.equal(breaker.state, "half_open");
+    assert.equal(breaker.allowRequest(), false);
+});
+
+test("closes when the probe succeeds and re-opens when it fails", () => {
+    const breaker = openBreaker(0);
+    assert.equal(breaker.allowRequest(), true);
+    breaker.recordSuccess();
+    assert.equal(breaker.state, "closed");
+    assert.equal(breaker.failures, 0);
+
+    breaker.recordFailure();
+    breaker.recordFailure();
+    assert.equal(breaker.allowRequest(), true);
+    breaker.recordFailure();
+    assert.equal(breaker.state, "open");
+});
+
+test("a success while closed resets the failure count", () => {
+    const breaker = new CircuitBreaker({ failureThreshold: 2 });
+    breaker.recordFailure();
+    breaker.recordSuccess();
+    breaker.recordFailure();
+    assert.equal(breaker.state, "closed");
+});